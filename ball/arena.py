@@ -0,0 +1,246 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import pygame
+
+from damage_strategies import STRATEGIES
+from text_cache import text_cache
+from two_balls import BLACK, BLUE, FPS, GREEN, RED, START_HP, WHITE
+
+# Arena mode for two_balls.py: N balls in one box, each with its own damage
+# strategy, under the same rules as the duel: every collision deals each ball
+# the other's current damage and then steps both damage sequences. A ball at
+# 0 HP or less leaves the arena.
+#
+# State is held in numpy arrays. The broad phase is a uniform grid with cells
+# one ball diameter wide, so touching balls always share a cell or sit in
+# neighbouring ones: balls are sorted by cell, and each ball is paired with
+# the rest of its own cell and with four of its eight neighbours (the other
+# four see it from their side). That is O(N) candidate pairs at a fixed
+# density instead of N^2 / 2. Overlapping pairs are pushed apart and, if they
+# are closing, exchange their normal velocities as in check_ball_collision;
+# all pairs of a step are applied at once with np.add.at.
+
+ARENA_RADIUS = 10
+COVERAGE = 0.1   # Fraction of the arena floor covered by balls at the start
+SPEEDS = [-3, -2, 2, 3]
+COLORS = [RED, BLUE, GREEN, (230, 160, 40), (160, 80, 200), (40, 180, 180)]
+
+# Neighbour cells (dx, dy) scanned from each cell; (0, 0) is the cell itself
+NEIGHBOURS = [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]
+
+
+def damage_at(name, hits):
+    # Damage of a ball after `hits` hits, as a float (inf once it overflows)
+    damage = STRATEGIES[name].total(hits + 1) - STRATEGIES[name].total(hits)
+    return float(damage) if damage < 1e300 else math.inf
+
+
+class Arena:
+    def __init__(self, n, strategies=("fib", "double"), radius=ARENA_RADIUS, hp=START_HP,
+                 coverage=COVERAGE, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.radius = radius
+        self.cell = 2 * radius
+        self.size = max(4 * radius, math.sqrt(n * math.pi * radius**2 / coverage))
+        self.names = list(strategies)
+
+        # Jittered lattice, so nobody starts overlapping
+        cols = math.ceil(math.sqrt(n))
+        spacing = self.size / cols
+        index = self.rng.permutation(n)
+        lattice = np.stack([index % cols, index // cols], axis=1) + 0.5
+        jitter = self.rng.uniform(-1, 1, (n, 2)) * max(0.0, spacing / 2 - radius)
+        self.pos = lattice * spacing + jitter
+        self.vel = self.rng.choice(SPEEDS, size=(n, 2)).astype(float)
+
+        self.ids = np.arange(n)
+        self.strategy = np.arange(n) % len(self.names)
+        self.hp = np.full(n, float(hp))
+        self.hits = np.zeros(n, dtype=np.int64)
+        self.damage = np.array([damage_at(self.names[s], 0) for s in self.strategy])
+
+        self.steps = 0
+        self.collisions = 0
+        self.pairs_tested = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def candidate_pairs(self):
+        # Pairs (i, j), i != j, that share a grid cell or sit in neighbouring
+        # cells. Balls are sorted by cell and each cell's run in that order is
+        # looked up in a dense start/end table. One spare row per column keeps
+        # dy = -1 and dy = +1 from wrapping into the next column.
+        cells = (self.pos // self.cell).astype(np.int64)
+        rows = int(self.size // self.cell) + 2
+        key = cells[:, 0] * rows + cells[:, 1]
+        order = np.argsort(key, kind="stable")
+        sorted_key = key[order]
+        counts = np.bincount(key, minlength=int(key.max()) + rows + 2)
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        here = np.arange(len(order))
+
+        firsts, seconds = [], []
+        for dx, dy in NEIGHBOURS:
+            target = sorted_key + dx * rows + dy
+            lo = here + 1 if dx == 0 and dy == 0 else starts[target]
+            pairs = np.maximum(ends[target] - lo, 0)
+            total = int(pairs.sum())
+            if not total:
+                continue
+            offsets = np.arange(total) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+            firsts.append(order[np.repeat(here, pairs)])
+            seconds.append(order[np.repeat(lo, pairs) + offsets])
+        if not firsts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(firsts), np.concatenate(seconds)
+
+    def all_pairs(self):
+        # Brute-force broad phase, for comparison
+        return np.triu_indices(len(self.ids), 1)
+
+    def step(self, brute_force=False):
+        r = self.radius
+        pos, vel = self.pos, self.vel
+        pos += vel
+
+        # Walls
+        out = (pos < r) | (pos > self.size - r)
+        vel[out] *= -1
+        np.clip(pos, r, self.size - r, out=pos)
+
+        # Broad phase, then the exact overlap test
+        i, j = self.all_pairs() if brute_force else self.candidate_pairs()
+        self.pairs_tested += len(i)
+        d = pos[j] - pos[i]
+        dist2 = np.einsum("ij,ij->i", d, d)
+        touching = dist2 < (2 * r) ** 2
+        i, j, d = i[touching], j[touching], d[touching]
+        self.steps += 1
+        if not len(i):
+            return
+
+        dist = np.sqrt(dist2[touching])
+        stacked = dist == 0
+        dist[stacked] = 1.0
+        d[stacked] = (1.0, 0.0)
+        normal = d / dist[:, None]
+
+        # Push overlapping pairs apart, half each
+        push = normal * ((2 * r - dist) / 2)[:, None]
+        np.subtract.at(pos, i, push)
+        np.add.at(pos, j, push)
+
+        # Closing pairs bounce and fight
+        closing = np.einsum("ij,ij->i", vel[i] - vel[j], normal)
+        hit = closing > 0
+        i, j = i[hit], j[hit]
+        impulse = normal[hit] * closing[hit, None]
+        np.subtract.at(vel, i, impulse)
+        np.add.at(vel, j, impulse)
+
+        np.subtract.at(self.hp, i, self.damage[j])
+        np.subtract.at(self.hp, j, self.damage[i])
+        np.add.at(self.hits, i, 1)
+        np.add.at(self.hits, j, 1)
+        self.collisions += len(i)
+        for k in np.unique(np.concatenate([i, j])).tolist():
+            self.damage[k] = damage_at(self.names[self.strategy[k]], int(self.hits[k]))
+
+        alive = self.hp > 0
+        if not alive.all():
+            for name in ("ids", "strategy", "hp", "hits", "damage", "pos", "vel"):
+                setattr(self, name, getattr(self, name)[alive])
+
+    def alive_by_strategy(self):
+        counts = np.bincount(self.strategy, minlength=len(self.names))
+        return dict(zip(self.names, counts.tolist()))
+
+
+def run_arena(arena, window=700):
+    pygame.init()
+    screen = pygame.display.set_mode((window, window + 40))
+    pygame.display.set_caption(f"Arena - {len(arena)} balls")
+    clock = pygame.time.Clock()
+    font = pygame.font.SysFont("Arial", 16)
+    big_font = pygame.font.SysFont("Arial", 40, bold=True)
+    scale = window / arena.size
+    radius = max(1, int(arena.radius * scale))
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        counts = arena.alive_by_strategy()
+        standing = [name for name, count in counts.items() if count]
+        if len(standing) > 1:
+            arena.step()
+
+        screen.fill(WHITE)
+        for (x, y), s in zip((arena.pos * scale).astype(int).tolist(), arena.strategy.tolist()):
+            pygame.draw.circle(screen, COLORS[s % len(COLORS)], (x, y + 40), radius)
+
+        status = "   ".join(f"{name}: {count}" for name, count in counts.items())
+        screen.blit(text_cache.render(font, f"{status}   collisions: {arena.collisions}", BLACK), (10, 10))
+        if len(standing) <= 1:
+            text = f"{standing[0].upper()} WINS!" if standing else "DRAW!"
+            text_surf = text_cache.render(big_font, text, BLACK)
+            screen.blit(text_surf, text_surf.get_rect(center=(window // 2, window // 2 + 40)))
+
+        pygame.display.flip()
+        clock.tick(FPS)
+
+    pygame.quit()
+
+
+def bench(n, steps, strategies, seed, brute_force=False):
+    arena = Arena(n, strategies, hp=math.inf, seed=seed)
+    arena.step(brute_force)   # Warm-up
+    start = time.perf_counter()
+    for _ in range(steps):
+        arena.step(brute_force)
+    elapsed = time.perf_counter() - start
+    return steps / elapsed, arena.pairs_tested / arena.steps, arena.collisions / arena.steps
+
+
+def main():
+    names = sorted(STRATEGIES)
+    parser = argparse.ArgumentParser(description="N-ball arena for the two_balls.py strategies")
+    parser.add_argument("--balls", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--strategies", nargs="+", default=["fib", "double"], choices=names)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--brute-limit", type=int, default=1000,
+                        help="Also time the all-pairs broad phase up to this many balls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--play", type=int, metavar="N", help="Watch an arena of N balls instead")
+    parser.add_argument("--headless", action="store_true", help="Use SDL's dummy video driver")
+    args = parser.parse_args()
+
+    if args.play:
+        if args.headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+        run_arena(Arena(args.play, args.strategies, seed=args.seed))
+        return
+
+    # Benchmarks run with infinite HP so the field does not thin out
+    print(f"{args.steps} steps per run, strategies {', '.join(args.strategies)}\n")
+    print(f"{'Balls':>6} | {'Steps/s':>9} {'Pairs/step':>11} {'All pairs':>11} {'Hits/step':>9} | "
+          f"{'Brute steps/s':>13}")
+    for n in args.balls:
+        rate, pairs, hits = bench(n, args.steps, args.strategies, args.seed)
+        brute = "-"
+        if n <= args.brute_limit:
+            brute = f"{bench(n, args.steps, args.strategies, args.seed, True)[0]:,.0f}"
+        print(f"{n:>6} | {rate:>9,.0f} {pairs:>11,.0f} {n * (n - 1) // 2:>11,} {hits:>9.2f} | "
+              f"{brute:>13}")
+
+
+if __name__ == "__main__":
+    main()
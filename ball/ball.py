@@ -1,15 +1,40 @@
 import pygame
+import argparse
+import copy
 import math
 import random
+from collections import deque
+
+import numpy as np
+
+from engine import Engine, Simulation, lerp
+from profiler import profiler
+from text_cache import text_cache
+from tunnel_ccd import angle_diff, ball_angle, reflect, time_of_impact
+from tunnel_render import TunnelRenderer
 
 # --- Constants ---
-WIDTH, HEIGHT = 900, 600
-CENTER = (WIDTH // 2, HEIGHT // 2)
-FPS = 60
-GAME_DURATION = 60  
-SPAWN_DISTANCE = 25  
-MAX_RADIUS = 500     
-BATCH_SIZE = 10      
+from tunnel_constants import (
+    BALL_RADIUS,
+    BATCH_SIZE,
+    CENTER,
+    CRUISE,
+    FPS,
+    GAME_DURATION,
+    GAP_WIDTH,
+    HEIGHT,
+    MAX_BALL_SPEED,
+    MAX_CONTACTS,
+    MAX_DT,
+    MAX_RADIUS,
+    POP_RADIUS,
+    RING_THICKNESS,
+    SPAWN_DISTANCE,
+    START_RADIUS,
+    SURGE,
+    WIDTH,
+    batch_slots,
+)
 
 # Colors
 BLACK = (10, 10, 10)
@@ -29,6 +54,8 @@ class Slider:
         self.val = initial_val
         self.name = name
         self.dragging = False
+        self.label_text = None
+        self.label_surf = None
         self.update_handle_from_val()
 
     def update_handle_from_val(self):
@@ -52,9 +79,23 @@ class Slider:
         ratio = (x - self.rect.left) / self.rect.width
         self.val = self.min_val + (self.max_val - self.min_val) * ratio
 
+    def panel_rect(self):
+        rect = self.rect.union(self.handle_rect.move(self.rect.x - self.handle_rect.x, 0))
+        rect.width += self.handle_rect.width
+        rect.x -= self.handle_rect.width // 2
+        if self.label_surf is not None:
+            rect.union_ip(self.label_surf.get_rect(topleft=(self.rect.x, self.rect.y - 25)))
+        return rect
+
+    def label(self, font):
+        text = f"{self.name}: {self.val:.2f}"
+        if text != self.label_text:
+            self.label_text = text
+            self.label_surf = text_cache.render(font, text, WHITE)
+        return self.label_surf
+
     def draw(self, screen, font):
-        text_surf = font.render(f"{self.name}: {self.val:.2f}", True, WHITE)
-        screen.blit(text_surf, (self.rect.x, self.rect.y - 25))
+        screen.blit(self.label(font), (self.rect.x, self.rect.y - 25))
         pygame.draw.rect(screen, GRAY, self.rect)
         pygame.draw.rect(screen, NEON_BLUE, self.handle_rect)
 
@@ -65,22 +106,21 @@ class Ball:
         self.y = CENTER[1]
         self.vx = 2
         self.vy = 0
-        self.radius = 8
+        self.radius = BALL_RADIUS
         self.color = NEON_BLUE
 
-    def update(self, gravity):
-        self.vy += gravity
-        self.x += self.vx
-        self.y += self.vy
-
-    def draw(self, screen):
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.radius)
+    def draw(self, screen, offset=(0, 0)):
+        pos = (int(self.x + offset[0]), int(self.y + offset[1]))
+        return pygame.draw.circle(screen, self.color, pos, self.radius)
 
 class Ring:
-    def __init__(self, radius, index):
+    __slots__ = ("radius", "angle", "gap_width", "batch_id", "batch_slot", "direction",
+                 "color", "thickness")
+
+    def __init__(self, radius, index, rng):
         self.radius = radius
-        self.angle = random.uniform(0, math.pi * 2)
-        self.gap_width = 1.2 
+        self.angle = rng.uniform(0, math.pi * 2)
+        self.gap_width = GAP_WIDTH
         
         self.batch_id = index // BATCH_SIZE
         
@@ -90,7 +130,7 @@ class Ring:
             self.direction = -1 
             
         self.color = NEON_RED
-        self.thickness = 4
+        self.thickness = RING_THICKNESS
 
     def update(self, batch_speed_multiplier, base_rot_speed, actual_shrink_amount):
         current_speed = base_rot_speed * batch_speed_multiplier
@@ -98,229 +138,464 @@ class Ring:
         self.radius -= actual_shrink_amount
         self.angle = self.angle % (2 * math.pi)
 
-    def draw(self, screen):
+    def draw(self, screen, center=CENTER):
         if self.radius > 0:
-            rect = pygame.Rect(CENTER[0] - self.radius, CENTER[1] - self.radius, 
+            rect = pygame.Rect(center[0] - self.radius, center[1] - self.radius, 
                                self.radius * 2, self.radius * 2)
             start_angle = self.angle + (self.gap_width / 2)
             end_angle = self.angle - (self.gap_width / 2) + (2 * math.pi)
             pygame.draw.arc(screen, self.color, rect, start_angle, end_angle, self.thickness)
 
-def run_game():
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Tunnel Escape - Distorted Bounce")
-    clock = pygame.time.Clock()
-    
-    font = pygame.font.SysFont("Arial", 16)
-    ui_font = pygame.font.SysFont("Arial", 20, bold=True)
-    large_font = pygame.font.SysFont("Arial", 50, bold=True)
-
-    # --- Sliders ---
-    slider_gravity = Slider(20, 50, 150, 0.0, 0.5, 0.15, "Gravity")
-    slider_rot = Slider(20, 120, 150, 0.0, 0.15, 0.06, "Base Spin") 
-    slider_shrink = Slider(20, 190, 150, 0.0, 3.0, 1.5, "Shrink Speed")
-    slider_bounce = Slider(20, 260, 150, 0.5, 1.5, 1.0, "Bounciness") 
-    
-    sliders = [slider_gravity, slider_rot, slider_shrink, slider_bounce]
-
-    # --- BATCH MANAGER ---
-    batch_speeds = {}       
-    batch_targets = {}      
-    batch_timers = {}       
-    batch_states = {}       
-
-    def update_batch_logic(b_id):
-        if b_id not in batch_speeds:
-            batch_speeds[b_id] = 0.5
-            batch_targets[b_id] = 0.5
-            batch_timers[b_id] = random.randint(60, 180) 
-            batch_states[b_id] = 'CRUISE'
-
-        batch_timers[b_id] -= 1
-
-        if batch_timers[b_id] <= 0:
-            current_state = batch_states[b_id]
-            
-            if current_state == 'CRUISE':
-                if random.random() < 0.4: 
-                    batch_states[b_id] = 'SURGE'
-                    batch_targets[b_id] = random.uniform(2.5, 4.0) 
-                    batch_timers[b_id] = random.randint(90, 120)   
+class BatchManager:
+    # Speed state for every batch that still has rings, in fixed-size arrays
+    # indexed by batch_id % capacity. A batch lives from the spawn of its first
+    # ring until its last ring is retired, so only a handful are ever live and
+    # the arrays never grow. TunnelGame sizes them for its MAX_RADIUS.
+    #
+    # Timers are stored as the frame they expire on, and the easing rate is
+    # fixed when a target is set (easing never overshoots, so "speeding up"
+    # or "slowing down" cannot change until the next target). A frame is then
+    # one vectorized ease plus an integer compare.
+    NEVER = 2**62
+
+    def __init__(self, rng, capacity=8):
+        self.rng = rng
+        self.capacity = capacity
+        self.frame = 0
+        self.next_expiry = self.NEVER
+        self.batch_ids = np.full(capacity, -1, dtype=np.int64)
+        self.ring_counts = np.zeros(capacity, dtype=np.int64)
+        self.speeds = np.zeros(capacity)
+        self.targets = np.zeros(capacity)
+        self.rates = np.zeros(capacity)
+        self.expires = np.full(capacity, self.NEVER, dtype=np.int64)
+        self.states = np.zeros(capacity, dtype=np.int8)
+        self._step = np.zeros(capacity)
+
+    def _set_target(self, slot, state, target, duration, start=None):
+        self.states[slot] = state
+        self.targets[slot] = target
+        self.rates[slot] = 0.05 if target > self.speeds[slot] else 0.03
+        self.expires[slot] = (self.frame if start is None else start) + duration
+
+    def _refresh_expiry(self):
+        live = self.ring_counts > 0
+        self.next_expiry = int(self.expires[live].min()) if live.any() else self.NEVER
+
+    def add_ring(self, b_id):
+        slot = b_id % self.capacity
+        if self.ring_counts[slot] == 0:
+            self.batch_ids[slot] = b_id
+            self.speeds[slot] = 0.5
+            self._set_target(slot, CRUISE, 0.5, self.rng.randint(60, 180))
+            self.next_expiry = min(self.next_expiry, int(self.expires[slot]))
+        elif self.batch_ids[slot] != b_id:
+            raise RuntimeError(f"Batch slot {slot} is still held by batch {self.batch_ids[slot]}")
+        self.ring_counts[slot] += 1
+        return slot
+
+    def remove_ring(self, slot):
+        self.ring_counts[slot] -= 1
+        if self.ring_counts[slot] == 0:
+            # Evict: the slot stops easing and its timer no longer counts
+            self.rates[slot] = 0.0
+            self.expires[slot] = self.NEVER
+            self._refresh_expiry()
+
+    def update(self, dt=1):
+        self.frame += dt
+
+        if self.frame >= self.next_expiry:
+            rng = self.rng
+            for slot in np.flatnonzero(self.expires <= self.frame):
+                # A timer that ran out partway through a step keeps the overshoot
+                expired = int(self.expires[slot])
+                if self.states[slot] == CRUISE:
+                    if rng.random() < 0.4:
+                        self._set_target(slot, SURGE, rng.uniform(2.5, 4.0), rng.randint(90, 120), expired)
+                    else:
+                        self._set_target(slot, CRUISE, rng.uniform(0.2, 0.6), rng.randint(60, 180), expired)
                 else:
-                    batch_states[b_id] = 'CRUISE'
-                    batch_targets[b_id] = random.uniform(0.2, 0.6) 
-                    batch_timers[b_id] = random.randint(60, 180)
-            
-            elif current_state == 'SURGE':
-                batch_states[b_id] = 'CRUISE'
-                batch_targets[b_id] = random.uniform(0.2, 0.5) 
-                batch_timers[b_id] = random.randint(60, 120)
-
-        current = batch_speeds[b_id]
-        target = batch_targets[b_id]
-        
-        lerp_speed = 0.05 if target > current else 0.03
+                    self._set_target(slot, CRUISE, rng.uniform(0.2, 0.5), rng.randint(60, 120), expired)
+            self._refresh_expiry()
 
-        diff = target - current
-        current += diff * lerp_speed
-        
-        batch_speeds[b_id] = current
-        return current
-
-    def reset_game():
-        b = Ball()
-        r = []
-        current_r = 200
-        total_spawned = 0
-        batch_speeds.clear()
-        batch_targets.clear()
-        batch_timers.clear()
-        batch_states.clear()
-        
+        step = np.subtract(self.targets, self.speeds, out=self._step)
+        if dt == 1:
+            step *= self.rates
+        else:
+            # dt frames of easing in one go: the gap shrinks by (1 - rate) per frame
+            step *= 1 - (1 - self.rates) ** dt
+        self.speeds += step
+
+def shrink_distance(inner_radius, shrink_speed, dt):
+    # How far every ring shrinks in dt frames. Shrinking slows down as the
+    # inner ring closes in: proportionally to its radius below 50, then a
+    # crawl below 15. The inner ring is followed through those bands so a
+    # large dt does not skip the slowdown.
+    r = inner_radius
+    if r >= 50:
+        t = dt if shrink_speed <= 0 else min(dt, (r - 50) / shrink_speed)
+        r -= shrink_speed * t
+        dt -= t
+    if dt > 0 and r >= 15:
+        k = shrink_speed * 0.8 / 50
+        t = dt if k <= 0 else min(dt, math.log(r / 15) / k)
+        r *= math.exp(-k * t)
+        dt -= t
+    if dt > 0:
+        r -= 0.05 * dt
+    return inner_radius - r
+
+class StepShrink:
+    # How far the rings have shrunk at each time within one step. The inner
+    # ring sets the rate; once it is passed, the next inner ring sets it from
+    # the following frame on, as it would stepping a frame at a time.
+    def __init__(self, inner_radius, shrink_speed, dt):
+        self.shrink_speed = shrink_speed
+        self.dt = dt
+        self.base = 0.0
+        self.start = 0
+        self.rate = shrink_speed
+        if inner_radius is not None:
+            self.rate = shrink_distance(inner_radius, shrink_speed, dt) / dt
+        self.rerate_at = None
+
+    def at(self, t):
+        return self.base + self.rate * (t - self.start)
+
+    def ring_passed(self, t):
+        self.rerate_at = math.floor(t) + 1
+
+    def reach(self, t, inner_radius):
+        # Called at the end of each frame the ball is swept to, with the
+        # inner ring's radius at the start of the step
+        at = self.rerate_at
+        if at is None or at > t:
+            return
+        self.rerate_at = None
+        if at >= self.dt or inner_radius is None:
+            return
+        self.base = self.at(at)
+        self.start = at
+        left = self.dt - at
+        self.rate = shrink_distance(inner_radius - self.base, self.shrink_speed, left) / left
+
+class TunnelGame:
+    # All game state and rules, with no pygame calls. Every random draw comes
+    # from this game's own seeded RNG, so a seed plus the slider values used
+    # on each frame reproduce a run exactly.
+    #
+    # In endless mode there is no time limit. Rings are kept in a deque and
+    # batch state in a fixed-size BatchManager, so memory stays flat however
+    # long the game runs. Otherwise both modes play by the same rules: the
+    # ball speed cap and the refill of an empty tunnel apply to timed games
+    # too, so timed scores can differ from those of older versions.
+    def __init__(self, seed=None, endless=False):
+        self.endless = endless
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.ball = Ball()
+        self.rings = deque()
+        self.frame = 0
+        self.score = 0
+        self.total_rings_created = 0
+
+        self.batches = BatchManager(self.rng, batch_slots(MAX_RADIUS))
+
+        current_r = START_RADIUS
         while current_r < MAX_RADIUS:
-            r.append(Ring(current_r, total_spawned))
+            self.spawn_ring(current_r)
             current_r += SPAWN_DISTANCE
-            total_spawned += 1
-        return b, r, pygame.time.get_ticks(), 0, total_spawned
-
-    ball, rings, start_ticks, score, total_rings_created = reset_game()
-    
-    running = True
-    game_over = False
-    message = ""
-    sub_message = ""
-
-    while running:
-        screen.fill(BLACK)
-        
-        current_gravity = slider_gravity.val
-        base_rot_speed = slider_rot.val
-        current_shrink_speed = slider_shrink.val
-        current_bounce = slider_bounce.val 
 
-        seconds_passed = (pygame.time.get_ticks() - start_ticks) / 1000
-        time_left = GAME_DURATION - seconds_passed
-        
-        if time_left <= 0 and not game_over:
-            game_over = True
-            message = "TIME'S UP!"
-            sub_message = f"Final Score: {score}"
-            time_left = 0
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            for s in sliders:
-                s.handle_event(event)
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE and game_over:
-                    ball, rings, start_ticks, score, total_rings_created = reset_game()
-                    game_over = False
-
-        if not game_over:
-            ball.update(current_gravity)
-
-            active_batches = set(r.batch_id for r in rings)
-            current_frame_batch_speeds = {} 
-            for b_id in active_batches:
-                current_frame_batch_speeds[b_id] = update_batch_logic(b_id)
-
-            effective_shrink_speed = current_shrink_speed
-            if rings:
-                inner_radius = rings[0].radius
-                if inner_radius < 50:
-                    factor = inner_radius / 50
-                    effective_shrink_speed = current_shrink_speed * factor * 0.8 
-                    if inner_radius < 15:
-                        effective_shrink_speed = 0.05
-            
-            for ring in rings:
-                speed_mult = current_frame_batch_speeds.get(ring.batch_id, 1.0)
-                ring.update(speed_mult, base_rot_speed, effective_shrink_speed)
-
-            if rings and rings[-1].radius < MAX_RADIUS - SPAWN_DISTANCE:
-                rings.append(Ring(MAX_RADIUS, total_rings_created))
-                total_rings_created += 1
-
-            if rings:
-                current_ring = rings[0]
-                
-                if current_ring.radius < 11: 
-                    rings.pop(0)
-                    score += 1
-                
-                elif rings: 
-                    current_ring = rings[0] 
-                    dist_x = ball.x - CENTER[0]
-                    dist_y = ball.y - CENTER[1]
-                    distance = math.sqrt(dist_x**2 + dist_y**2)
-
-                    if distance + ball.radius >= current_ring.radius - (current_ring.thickness / 2):
-                        ball_angle = math.atan2(-dist_y, dist_x)
-                        if ball_angle < 0: ball_angle += 2 * math.pi
-                        
-                        angle_diff = abs(ball_angle - current_ring.angle)
-                        if angle_diff > math.pi: angle_diff = (2 * math.pi) - angle_diff
-
-                        if angle_diff < (current_ring.gap_width / 2):
-                            rings.pop(0) 
-                            score += 1
-                        else:
-                            # --- CALCULATE REFLECTION ---
-                            overlap = distance + ball.radius - (current_ring.radius - current_ring.thickness/2)
-                            ball.x -= (dist_x / distance) * overlap
-                            ball.y -= (dist_y / distance) * overlap
-                            
-                            nx = dist_x / distance
-                            ny = dist_y / distance
-                            dot = ball.vx * nx + ball.vy * ny
-                            
-                            # 1. Standard Bounce Vector (Result X, Result Y)
-                            rx = (ball.vx - 2 * dot * nx) * current_bounce
-                            ry = (ball.vy - 2 * dot * ny) * current_bounce
-                            
-                            # 2. Add DISTORTION Angle (Random +/- 0.18 radians / approx 10 degrees)
-                            # This prevents the ball from getting stuck in a perfect loop
-                            distortion = random.uniform(-0.18, 0.18)
-                            
-                            # 3. Rotate the bounce vector by the distortion angle
-                            # formula: x' = x cos(a) - y sin(a), y' = x sin(a) + y cos(a)
-                            cos_a = math.cos(distortion)
-                            sin_a = math.sin(distortion)
-                            
-                            ball.vx = rx * cos_a - ry * sin_a
-                            ball.vy = rx * sin_a + ry * cos_a
-
-        for ring in reversed(rings):
-            ring.draw(screen)
+    @property
+    def elapsed(self):
+        return self.frame / FPS
+
+    @property
+    def time_left(self):
+        return max(0, GAME_DURATION - self.elapsed)
+
+    @property
+    def finished(self):
+        return not self.endless and self.frame >= GAME_DURATION * FPS
+
+    def snapshot(self):
+        return copy.deepcopy(self.__dict__)
+
+    def restore(self, snapshot):
+        self.__dict__.update(copy.deepcopy(snapshot))
+
+    def spawn_ring(self, radius):
+        ring = Ring(radius, self.total_rings_created, self.rng)
+        ring.batch_slot = self.batches.add_ring(ring.batch_id)
+        self.rings.append(ring)
+        self.total_rings_created += 1
+
+    def retire_ring(self):
+        ring = self.rings.popleft()
+        self.batches.remove_ring(ring.batch_slot)
+        self.score += 1
+
+    def step(self, current_gravity, base_rot_speed, current_shrink_speed, current_bounce, dt=1):
+        # Advances the game by dt frames, where dt may be any fraction of a
+        # frame up to MAX_DT. The ball is swept against the rings over the
+        # whole step, so a fast ball cannot pass through a ring, and near a
+        # ring it is held at each frame's end as a one-frame step would, so a
+        # longer step plays the same game in fewer steps.
+        if dt > MAX_DT:
+            raise ValueError(f"dt must be at most {MAX_DT} frame(s), got {dt}")
+        ball = self.ball
+        rings = self.rings
+        self.frame += dt
+
+        self.batches.update(dt)
+        batch_speeds = self.batches.speeds
+
+        shrink = StepShrink(rings[0].radius if rings else None, current_shrink_speed, dt)
+        self.sweep_ball(dt, current_gravity, base_rot_speed, shrink, current_bounce, batch_speeds)
+        effective_shrink_speed = shrink.rate
+
+        for ring in rings:
+            speed_mult = batch_speeds.item(ring.batch_slot)
+            ring.update(speed_mult, base_rot_speed * dt, shrink.at(dt))
+
+        # An empty tunnel (every ring slipped through while shrinking was off)
+        # starts refilling instead of staying empty for the rest of the game
+        if not rings:
+            self.spawn_ring(MAX_RADIUS)
+        # Every ring that came due during the step is spawned, shrunk by the
+        # whole frames left in the step after it appeared
+        spawn_radius = MAX_RADIUS - SPAWN_DISTANCE
+        while rings[-1].radius < spawn_radius:
+            late = 0
+            if effective_shrink_speed > 0:
+                late = int((spawn_radius - rings[-1].radius) / effective_shrink_speed)
+            self.spawn_ring(MAX_RADIUS - late * effective_shrink_speed)
+
+        while rings and rings[0].radius < POP_RADIUS:
+            self.retire_ring()
+
+    @profiler.timed("physics.sweep")
+    def sweep_ball(self, dt, gravity, base_rot_speed, shrink, bounce, batch_speeds):
+        # Moves the ball through dt frames, stopping at each contact with the
+        # innermost ring: through the gap retires the ring, anything else
+        # bounces. Between contacts the ball follows the chord of its
+        # parabola, so the step lands where the falling ball really is. Near
+        # the ring it goes a frame at a time, since the chord of a longer arc
+        # misses the hops of a ball bouncing on the ring.
+        ball = self.ball
+        rings = self.rings
+        inner_radius = rings[0].radius if rings else None
+        t = 0
+        for _ in range(MAX_CONTACTS * math.ceil(dt)):
+            if not rings:
+                break
+            ring = rings[0]
+            px = ball.x - CENTER[0]
+            py = ball.y - CENTER[1]
+            radius = ring.radius - shrink.at(t)
+            reach = ring.thickness / 2 + ball.radius
+            rest = dt - t
+            piece = rest
+            farthest = math.hypot(px, py) + math.hypot(ball.vx, ball.vy) * rest + abs(gravity) * rest * rest / 2
+            if shrink.rerate_at is not None or farthest >= radius - shrink.rate * rest - reach:
+                piece = min(math.floor(t) + 1, dt) - t
+            chord_vy = ball.vy + gravity * piece / 2
+            hit = time_of_impact(px, py, ball.vx, chord_vy, radius, shrink.rate, reach, piece)
+            if hit is None:
+                if piece == rest:
+                    break
+                t = self.hold_to_frame_end(t, gravity, shrink, inner_radius)
+                continue
+
+            t += hit
+            ball.x += ball.vx * hit
+            ball.y += chord_vy * hit
+            ball.vy += gravity * hit
+            px = ball.x - CENTER[0]
+            py = ball.y - CENTER[1]
+
+            spin = ring.direction * base_rot_speed * batch_speeds.item(ring.batch_slot)
+            if angle_diff(ball_angle(px, py), ring.angle + spin * t) < ring.gap_width / 2:
+                self.retire_ring()
+                shrink.ring_passed(t)
+                continue
+
+            distance = math.hypot(px, py)
+            if distance == 0 or ball.vx * px + ball.vy * py <= 0:
+                # The ring is closing in on a ball that is already heading
+                # inward: it gets pushed along to the end of the frame
+                if math.floor(t) + 1 >= dt:
+                    break
+                t = self.hold_to_frame_end(t, gravity, shrink, inner_radius)
+                continue
+            # Random +/- 0.18 radian distortion keeps the ball out of perfect loops
+            distortion = self.rng.uniform(-0.18, 0.18)
+            ball.vx, ball.vy = reflect(ball.vx, ball.vy, px / distance, py / distance,
+                                       bounce, distortion)
+
+            speed = math.hypot(ball.vx, ball.vy)
+            if speed > MAX_BALL_SPEED:
+                ball.vx *= MAX_BALL_SPEED / speed
+                ball.vy *= MAX_BALL_SPEED / speed
+        else:
+            # Out of contacts: leave the ball where it last touched
+            t = dt
+        shrink.reach(dt, inner_radius)
+
+        rest = dt - t
+        ball.x += ball.vx * rest
+        ball.y += (ball.vy + gravity * rest / 2) * rest
+        ball.vy += gravity * rest
+        self.hold_inside_ring(shrink.at(dt))
+
+    def hold_to_frame_end(self, t, gravity, shrink, inner_radius):
+        # Flies the ball on to the end of its frame and keeps it inside the
+        # ring there, as the end of a one-frame step does
+        ball = self.ball
+        frame_end = math.floor(t) + 1
+        rest = frame_end - t
+        ball.x += ball.vx * rest
+        ball.y += (ball.vy + gravity * rest / 2) * rest
+        ball.vy += gravity * rest
+        shrink.reach(frame_end, inner_radius)
+        self.hold_inside_ring(shrink.at(frame_end))
+        return frame_end
+
+    def hold_inside_ring(self, shrunk):
+        # A ball sliding along the ring drifts outward on a straight path, so
+        # keep it inside the ring's contact radius
+        if self.rings:
+            ball = self.ball
+            ring = self.rings[0]
+            px = ball.x - CENTER[0]
+            py = ball.y - CENTER[1]
+            distance = math.hypot(px, py)
+            limit = ring.radius - shrunk - ring.thickness / 2 - ball.radius
+            if distance > limit > 0:
+                ball.x = CENTER[0] + px * limit / distance
+                ball.y = CENTER[1] + py * limit / distance
+
+class TunnelSession(Simulation):
+    # A TunnelGame played with the sliders: one game frame per tick, with the
+    # slider values of that tick recorded for the replay. Fonts and the
+    # renderer are made on the first render, so a session also runs headless
+    # (at the sliders' starting values).
+    def __init__(self, seed=None, endless=False, record_path=None, legacy_render=False):
+        from tunnel_replay import ReplayRecorder
+
+        self.endless = endless
+        self.record_path = record_path
+        self.legacy_render = legacy_render
+        self.renderer = None
+
+        # --- Sliders ---
+        slider_gravity = Slider(20, 50, 150, 0.0, 0.5, 0.15, "Gravity")
+        slider_rot = Slider(20, 120, 150, 0.0, 0.15, 0.06, "Base Spin") 
+        slider_shrink = Slider(20, 190, 150, 0.0, 3.0, 1.5, "Shrink Speed")
+        slider_bounce = Slider(20, 260, 150, 0.5, 1.5, 1.0, "Bounciness") 
         
-        ball.draw(screen)
+        self.sliders = [slider_gravity, slider_rot, slider_shrink, slider_bounce]
+
+        self.game = TunnelGame(seed, endless)
+        self.recorder = ReplayRecorder(self.game.seed, endless)
         
-        for s in sliders:
-            s.draw(screen, font)
-
-        timer_text = ui_font.render(f"Time: {int(time_left)}", True, WHITE)
-        score_text = ui_font.render(f"Score: {score}", True, GREEN)
-        screen.blit(timer_text, (WIDTH - 120, 20))
-        screen.blit(score_text, (WIDTH - 120, 50))
-
-        if game_over:
-            overlay = pygame.Surface((WIDTH, HEIGHT))
-            overlay.set_alpha(150)
-            overlay.fill(BLACK)
-            screen.blit(overlay, (0,0))
-            msg_surf = large_font.render(message, True, GREEN)
-            sub_surf = ui_font.render(sub_message, True, WHITE)
-            restart_surf = ui_font.render("Press SPACE to Restart", True, WHITE)
-            screen.blit(msg_surf, msg_surf.get_rect(center=(WIDTH//2, HEIGHT//2 - 30)))
-            screen.blit(sub_surf, sub_surf.get_rect(center=(WIDTH//2, HEIGHT//2 + 20)))
-            screen.blit(restart_surf, restart_surf.get_rect(center=(WIDTH//2, HEIGHT//2 + 60)))
-
-        pygame.display.flip()
-        clock.tick(FPS)
+        self.game_over = False
+        self.message = ""
+        self.sub_message = ""
+
+    @property
+    def done(self):
+        return self.game_over
+
+    def handle_event(self, event):
+        from tunnel_replay import ReplayRecorder
+
+        for s in self.sliders:
+            s.handle_event(event)
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE and self.game_over:
+                self.game.reset()
+                self.recorder = ReplayRecorder(self.game.seed, self.endless)
+                self.game_over = False
+                return True
+        return False
+
+    def step(self):
+        game = self.game
+        if self.game_over:
+            return
+        if game.finished:
+            self.game_over = True
+            self.message = "TIME'S UP!"
+            self.sub_message = f"Final Score: {game.score}"
+            if self.record_path:
+                self.recorder.save(self.record_path)
+            return
+
+        slider_values = [s.val for s in self.sliders]
+        self.recorder.record(game.frame, slider_values)
+        game.step(*slider_values)
+
+    def render_state(self):
+        return (self.game.ball.x, self.game.ball.y)
+
+    def render(self, screen, previous, alpha):
+        if self.renderer is None:
+            font = pygame.font.SysFont("Arial", 16)
+            ui_font = pygame.font.SysFont("Arial", 20, bold=True)
+            large_font = pygame.font.SysFont("Arial", 50, bold=True)
+
+            palette = {"background": BLACK, "ring": NEON_RED, "text": WHITE, "score": GREEN, "stats": GRAY}
+            self.renderer = TunnelRenderer(screen, (font, ui_font, large_font), palette, RING_THICKNESS,
+                                           legacy=self.legacy_render)
+
+        # Only the ball is drawn between ticks: rings move a pixel or two a
+        # tick, and their sprites are cached by whole-pixel radius anyway
+        ball = self.game.ball
+        ball_shift = (lerp(previous[0], ball.x, alpha) - ball.x,
+                      lerp(previous[1], ball.y, alpha) - ball.y)
+        return self.renderer.draw(self.game, self.sliders, self.game_over, self.message,
+                                  self.sub_message, CENTER, ball_shift)
+
+    def close(self):
+        if self.record_path and self.endless:
+            self.recorder.save(self.record_path)
+
+def run_game(seed=None, record_path=None, size=(WIDTH, HEIGHT), legacy_render=False,
+             endless=False, max_fps=FPS, render_skip=False, profile_path=None):
+    pygame.init()
+    screen = pygame.display.set_mode(size)
+    pygame.display.set_caption("Tunnel Escape - Distorted Bounce")
+
+    # The game advances FPS frames per second of real time whatever the
+    # frame rate
+    session = TunnelSession(seed, endless, record_path, legacy_render)
+    Engine(session, FPS, max_fps, render_skip, profile_path=profile_path).run(screen)
 
+    session.close()
     pygame.quit()
 
 if __name__ == "__main__":
-    run_game()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Tunnel Escape")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the first game")
+    parser.add_argument("--record", metavar="PATH", help="Save a replay of each finished game to PATH")
+    parser.add_argument("--endless", action="store_true", help="Survival mode with no time limit")
+    parser.add_argument("--size", type=int, nargs=2, default=[WIDTH, HEIGHT], metavar=("W", "H"))
+    parser.add_argument("--max-radius", type=int, default=MAX_RADIUS)
+    parser.add_argument("--legacy-render", action="store_true",
+                        help="Draw rings with pygame.draw.arc every frame, for comparison")
+    parser.add_argument("--fps", type=int, default=FPS, help="Frame rate cap (0 for none)")
+    parser.add_argument("--render-skip", action="store_true",
+                        help="Skip drawing frames while the physics is behind")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Record frame phase timings to PATH (.csv, or .json for a Chrome trace)")
+    args = parser.parse_args()
+    MAX_RADIUS = args.max_radius
+    run_game(args.seed, args.record, tuple(args.size), args.legacy_render, args.endless,
+             args.fps, args.render_skip, args.profile)
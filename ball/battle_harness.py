@@ -0,0 +1,135 @@
+import argparse
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from damage_strategies import STRATEGIES
+from two_balls import FPS, START_HP, Battle
+
+# Headless strategy evaluation for two_balls.py.
+#
+# Every strategy pair plays many battles of the real frame-stepped game, each
+# seeded on its own, which fixes both balls' starting velocities (the
+# random.choice([-3, -2, 2, 3]) draws in Ball) and, with --hp-spread, their
+# starting HP. Battles run in chunks on a process pool; a chunk returns only
+# tallies, at most two chunks per worker are in flight, and the totals are
+# merged as they arrive, so memory stays flat however many rounds run.
+#
+# With equal HP the winner is decided by the damage sequences alone (see
+# battle_solver.py), so the win rates come out at 0 or 1 and only the battle
+# length varies; --hp-spread makes the matchups closer.
+
+
+def wilson(successes, n, z=1.96):
+    # Wilson score interval for a binomial proportion
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def run_chunk(pair, first_seed, count, hp, hp_spread, max_frames):
+    # Tallies for `count` battles: [wins1, wins2, draws, timeouts, frames, frames^2]
+    tally = [0, 0, 0, 0, 0, 0]
+    for seed in range(first_seed, first_seed + count):
+        rng = random.Random(-seed - 1)
+        hps = tuple(round(hp * rng.uniform(1 - hp_spread, 1 + hp_spread)) for _ in range(2))
+        random.seed(seed)   # The velocity draws in Ball
+        battle = Battle(pair, hps)
+        while battle.state == "PLAYING" and battle.frame < max_frames:
+            battle.step()
+        if battle.state == "PLAYING":
+            tally[3] += 1
+            continue
+        tally[(1, 2, 0).index(battle.winner)] += 1
+        tally[4] += battle.frame
+        tally[5] += battle.frame * battle.frame
+    return pair, tally
+
+
+def jobs(pairs, rounds, chunk, seed):
+    # Every pair plays the same seeds, so matchups see the same starts
+    for start in range(0, rounds, chunk):
+        for pair in pairs:
+            yield pair, seed + start, min(chunk, rounds - start)
+
+
+def evaluate(pairs, rounds, chunk, seed, hp, hp_spread, max_frames, workers, progress=True):
+    totals = {pair: [0] * 6 for pair in pairs}
+    pending = set()
+    todo = jobs(pairs, rounds, chunk, seed)
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while len(pending) < 2 * workers:
+                job = next(todo, None)
+                if job is None:
+                    break
+                pending.add(pool.submit(run_chunk, *job, hp, hp_spread, max_frames))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pair, tally = future.result()
+                totals[pair] = [a + b for a, b in zip(totals[pair], tally)]
+                done += sum(tally[:4])
+            if progress:
+                print(f"\r  {done} battles", end="", flush=True)
+    if progress:
+        print()
+    return totals
+
+
+def print_report(totals):
+    print(f"{'Red vs Blue':<18} {'Battles':>7} | {'Red wins':>22} {'Blue wins':>22} "
+          f"{'Draws':>6} {'Timeouts':>8} | {'Length (s)':>14}")
+    for (s1, s2), (wins1, wins2, draws, timeouts, frames, frames2) in totals.items():
+        n = wins1 + wins2 + draws
+        cells = []
+        for wins in (wins1, wins2):
+            lo, hi = wilson(wins, n)
+            cells.append(f"{wins / n if n else 0:>6.1%} [{lo:>5.1%}, {hi:>5.1%}]")
+        if n:
+            mean = frames / n
+            std = math.sqrt(max(0.0, frames2 / n - mean * mean))
+            length = f"{mean / FPS:6.1f} +/- {1.96 * std / math.sqrt(n) / FPS:4.1f}"
+        else:
+            length = "-"
+        print(f"{s1 + ' vs ' + s2:<18} {n + timeouts:>7} | {cells[0]:>22} {cells[1]:>22} "
+              f"{draws:>6} {timeouts:>8} | {length:>14}")
+
+
+def main():
+    names = sorted(STRATEGIES)
+    parser = argparse.ArgumentParser(description="Win rates of the two_balls.py damage strategies")
+    parser.add_argument("--strategies", nargs="+", default=["fib", "double"], choices=names)
+    parser.add_argument("--rounds", type=int, default=500, help="Battles per strategy pair")
+    parser.add_argument("--hp", type=int, default=START_HP)
+    parser.add_argument("--hp-spread", type=float, default=0.0,
+                        help="Starting HP drawn from hp * [1 - s, 1 + s] per ball")
+    parser.add_argument("--max-seconds", type=float, default=600,
+                        help="Battles still running after this much game time are timeouts")
+    parser.add_argument("--chunk", type=int, default=50, help="Battles per job")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    pairs = list(itertools.product(args.strategies, repeat=2))
+    start = time.perf_counter()
+    totals = evaluate(pairs, args.rounds, args.chunk, args.seed, args.hp, args.hp_spread,
+                      int(args.max_seconds * FPS), args.workers)
+    elapsed = time.perf_counter() - start
+    battles = sum(sum(t[:4]) for t in totals.values())
+    print(f"{battles} battles in {elapsed:.1f} s, {args.hp} HP (spread {args.hp_spread:.0%}), "
+          f"95% Wilson intervals\n")
+    print_report(totals)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import math
+import random
+import time
+
+from damage_strategies import STRATEGIES
+from two_balls import BALL_RADIUS, FPS, HEIGHT, START_HP, WIDTH, Ball, Battle, check_ball_collision
+
+# Fast-forward solver for two_balls.py.
+#
+# Both balls hit each other on every collision, so after k collisions ball 1
+# has taken the first k damages of ball 2's strategy and vice versa. The fight
+# ends on the first collision where either total reaches the other ball's HP,
+# which the strategies' prefix sums give directly: no physics is needed to
+# know the winner, only to know when the fight ends.
+#
+# For the timing, the box is replayed with the game's own per-frame
+# arithmetic (Ball.move, Ball.check_wall_collision and check_ball_collision on
+# bare bodies), so collision frames match two_balls exactly; a continuous,
+# event-driven model drifts from the frame-stepped one by tens of percent
+# over a long fight.
+#
+# While the balls are apart, each coordinate moves and bounces off its walls
+# on its own, so the solver jumps from one wall bounce to the next and only
+# plays Battle.step frame by frame around ball contacts. A jump is not a
+# closed form: the game adds a float velocity once per frame, and after the
+# first collision the velocities are not whole numbers, so k additions round
+# differently from one multiply by k. advance() reproduces the repeated
+# additions exactly in one multiply per binade crossed (a handful over the
+# box's width), so the cost is O(wall bounces + frames near contacts), not
+# O(frames). The balls meet every few hundred frames, so those events
+# dominate. If the box comes back to a state it was in since the last
+# collision, the balls never meet again. --check replays the full game to
+# compare.
+
+START = ((100, 200), (300, 200))   # Where main() places the two balls
+
+
+def solve(hp1, hp2, strategy1, strategy2):
+    s1 = STRATEGIES[strategy1]
+    s2 = STRATEGIES[strategy2]
+    collisions = min(s2.hits_to_deal(hp1), s1.hits_to_deal(hp2))
+    left1 = hp1 - s2.total(collisions)
+    left2 = hp2 - s1.total(collisions)
+    if left1 > left2:
+        winner = 1
+    elif left2 > left1:
+        winner = 2
+    else:
+        winner = 0
+    return {"collisions": collisions, "hp": (left1, left2), "winner": winner}
+
+
+class Body:
+    # The moving part of a two_balls Ball: same attributes and methods, so the
+    # game's collision code runs on it unchanged. Damage is 1, so a collision
+    # shows up as a change in hp.
+    radius = BALL_RADIUS
+    move = Ball.move
+    check_wall_collision = Ball.check_wall_collision
+
+    def __init__(self, x, y, dx, dy):
+        self.x, self.y, self.dx, self.dy = x, y, dx, dy
+        self.hp = 0
+        self.damage = 1
+
+    def increase_damage(self):
+        pass
+
+
+def advance(x, v, frames):
+    # Where `frames` repeats of x += v leave x, rounded as the game rounds them.
+    # Whole numbers add exactly, so that is one multiply. Otherwise every sum
+    # inside one binade [2**52, 2**53) * ulp lands on the same grid: v rounds to
+    # round(v / ulp) grid steps, halves going to the even step once x is even,
+    # so a run of repeats up to the binade's end is still one multiply. Leaving
+    # the binade and the first of a run of ties take single additions.
+    if float(x).is_integer() and float(v).is_integer():
+        return x + frames * v
+    while frames > 0:
+        if x > 0:
+            ulp = math.ulp(x)
+            q = v / ulp
+            step = round(q)
+            if abs(q - step) != 0.5 or not (x / ulp) % 2:
+                if step == 0:
+                    return x
+                # Grid steps to the binade's end, all but the last safe to take
+                room = (ulp * 2**53 - x if step > 0 else x - ulp * 2**52) / ulp
+                run = min(frames, int(room - 1) // abs(step))
+                x += run * step * ulp
+                frames -= run
+                if frames == 0:
+                    break
+        # Into the next binade, or the first of a run of ties
+        x += v
+        frames -= 1
+    return x
+
+
+def inside(x, size, radius=BALL_RADIUS):
+    # The test of Ball.check_wall_collision, with its rounding
+    return not (x - radius < 0 or x + radius > size)
+
+
+def apart_frames(x1, y1, vx1, vy1, x2, y2, vx2, vy2):
+    # Frames that surely end with the balls apart, a frame short of the first
+    # possible contact against rounding. A wall bounce moves a ball up to a
+    # step off its line, so the contact distance is stretched by a step.
+    reach = 2 * BALL_RADIUS + max(abs(vx1), abs(vy1), abs(vx2), abs(vy2))
+    dx, dy = x2 - x1, y2 - y1
+    dvx, dvy = vx2 - vx1, vy2 - vy1
+    c = dx * dx + dy * dy - reach * reach
+    if c <= 0:
+        return 0
+    b = dx * dvx + dy * dvy
+    if b >= 0:
+        return math.inf
+    a = dvx * dvx + dvy * dvy
+    disc = b * b - a * c
+    if disc < 0:
+        return math.inf
+    return max(0, math.floor((-b - math.sqrt(disc)) / a) - 1)
+
+
+class Axis:
+    # One coordinate of a ball while the balls are apart. It moves and bounces
+    # off its two walls on its own, as Ball.move and Ball.check_wall_collision
+    # would, so only the axis that bounces needs any work.
+    def __init__(self, x, v, size, frame):
+        self.x, self.v, self.size, self.frame = x, v, size, frame
+        # The last frame that ends inside the walls, and where; the next one
+        # bounces. A collision can push a ball past a wall, to be clamped on
+        # the very next frame.
+        frames, self.end = 0, x
+        if v == 0 and inside(x, size):
+            frames = math.inf
+        elif inside(x + v, size):
+            frames = max(1, math.floor(((size - BALL_RADIUS - x) if v > 0 else (x - BALL_RADIUS)) / abs(v)))
+            self.end = advance(x, v, frames)
+            while frames > 1 and not inside(self.end, size):
+                frames -= 1
+                self.end = advance(x, v, frames)
+            while inside(self.end + v, size):
+                frames += 1
+                self.end += v
+        self.bounce = frame + frames + 1  # The frame that hits a wall
+
+    def at(self, frame):
+        return advance(self.x, self.v, frame - self.frame)
+
+    def near(self, frame):
+        # Within rounding of at(frame), for the contact estimate
+        return self.x + self.v * (frame - self.frame)
+
+    def bounce_off(self):
+        x = self.end + self.v
+        x = BALL_RADIUS if x - BALL_RADIUS < 0 else self.size - BALL_RADIUS
+        self.__init__(x, -self.v, self.size, self.bounce)
+
+
+def collision_frames(velocities, count, max_frames=10**7, start=START):
+    # Frames of the first `count` ball collisions, as Battle.step numbers them.
+    # velocities: ((dx1, dy1), (dx2, dy2)) in pixels per frame
+    b1, b2 = (Body(*p, *v) for p, v in zip(start, velocities))
+    frame = 0
+    frames = []
+    seen = set()  # States since the last collision; a repeat means they never meet
+    while len(frames) < count and frame < max_frames:
+        state = (b1.x, b1.y, b1.dx, b1.dy, b2.x, b2.y, b2.dx, b2.dy)
+        if state in seen:
+            break
+        seen.add(state)
+
+        # Wall bounces up to the last frame that surely keeps the balls apart
+        axes = [Axis(b1.x, b1.dx, WIDTH, frame), Axis(b1.y, b1.dy, HEIGHT, frame),
+                Axis(b2.x, b2.dx, WIDTH, frame), Axis(b2.y, b2.dy, HEIGHT, frame)]
+        while True:
+            x1, y1, x2, y2 = (axis.near(frame) for axis in axes)
+            apart = apart_frames(x1, y1, axes[0].v, axes[1].v, x2, y2, axes[2].v, axes[3].v)
+            last = min(frame + apart, max_frames - 1)
+            axis = min(axes, key=lambda axis: axis.bounce)
+            if axis.bounce > last:
+                break
+            frame = axis.bounce
+            axis.bounce_off()
+            state = tuple((axis.x, axis.v, axis.v and frame - axis.frame) for axis in axes)
+            if state in seen:
+                return frames
+            seen.add(state)
+        frame = last
+        b1.x, b1.dx = axes[0].at(frame), axes[0].v
+        b1.y, b1.dy = axes[1].at(frame), axes[1].v
+        b2.x, b2.dx = axes[2].at(frame), axes[2].v
+        b2.y, b2.dy = axes[3].at(frame), axes[3].v
+
+        # Frames of Battle.step while the balls may touch
+        while True:
+            frame += 1
+            b1.move()
+            b2.move()
+            b1.check_wall_collision()
+            b2.check_wall_collision()
+            hp = b1.hp
+            check_ball_collision(b1, b2)
+            if b1.hp != hp:
+                frames.append(frame)
+                seen.clear()
+            if len(frames) == count or frame == max_frames:
+                break
+            if apart_frames(b1.x, b1.y, b1.dx, b1.dy, b2.x, b2.y, b2.dx, b2.dy):
+                break
+    return frames
+
+
+def initial_velocities(seed):
+    # The same draws as the two Ball() calls in main() after random.seed(seed)
+    rng = random.Random(seed)
+    choices = [-3, -2, 2, 3]
+    return tuple((rng.choice(choices), rng.choice(choices)) for _ in range(2))
+
+
+def fast_forward(hp1, hp2, strategy1, strategy2, velocities):
+    result = solve(hp1, hp2, strategy1, strategy2)
+    frames = collision_frames(velocities, result["collisions"])
+    if len(frames) < result["collisions"]:
+        result["frames"] = None
+    else:
+        result["frames"] = frames[-1] if frames else 0
+    return result
+
+
+def frame_stepped(hp1, hp2, strategy1, strategy2, seed, max_frames=10**7):
+    # The game loop of two_balls.main() without drawing
+    random.seed(seed)
+    battle = Battle((strategy1, strategy2), (hp1, hp2))
+    velocities = ((battle.ball1.dx, battle.ball1.dy), (battle.ball2.dx, battle.ball2.dy))
+    while battle.state == "PLAYING" and battle.frame < max_frames:
+        battle.step()
+    return velocities, battle.collisions, battle.frame, (battle.ball1.hp, battle.ball2.hp)
+
+
+def main():
+    names = sorted(STRATEGIES)
+    parser = argparse.ArgumentParser(description="Solve a two_balls.py battle without playing it")
+    parser.add_argument("--hp", type=int, default=START_HP)
+    parser.add_argument("--hp2", type=int, help="Ball 2's HP (default: the same as ball 1)")
+    parser.add_argument("--strategies", nargs=2, default=["fib", "double"], choices=names,
+                        metavar=("S1", "S2"), help=f"One of {', '.join(names)} for each ball")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the starting velocities")
+    parser.add_argument("--check", action="store_true", help="Also replay the frame-stepped game")
+    parser.add_argument("--table", type=int, metavar="N", help="Solve HP = 10 ... 10^N instead")
+    args = parser.parse_args()
+
+    s1, s2 = args.strategies
+    labels = {0: "draw", 1: f"ball 1 ({s1})", 2: f"ball 2 ({s2})"}
+    velocities = initial_velocities(args.seed)
+
+    if args.table:
+        print(f"{'HP':>16} | {'Hits':>6} {'Winner':<18} {'Battle':>10} {'Solved in':>10}")
+        for power in range(1, args.table + 1):
+            hp = 10**power
+            start = time.perf_counter()
+            result = fast_forward(hp, hp, s1, s2, velocities)
+            elapsed = time.perf_counter() - start
+            battle = "never" if result["frames"] is None else f"{result['frames'] / FPS:.1f} s"
+            print(f"{hp:>16} | {result['collisions']:>6} {labels[result['winner']]:<18} "
+                  f"{battle:>10} {1000 * elapsed:>8.2f} ms")
+        return
+
+    hp2 = args.hp if args.hp2 is None else args.hp2
+    start = time.perf_counter()
+    result = fast_forward(args.hp, hp2, s1, s2, velocities)
+    elapsed = time.perf_counter() - start
+    print(f"{s1} ({args.hp} HP) vs {s2} ({hp2} HP), velocities {velocities}")
+    print(f"  {result['collisions']} collisions, HP left {result['hp'][0]} / {result['hp'][1]}, "
+          f"winner: {labels[result['winner']]}")
+    if result["frames"] is None:
+        print("  the balls stop meeting before the fight ends")
+    else:
+        print(f"  ends on frame {result['frames']:.0f} ({result['frames'] / FPS:.1f} s), "
+              f"solved in {1000 * elapsed:.2f} ms")
+
+    if args.check:
+        start = time.perf_counter()
+        _, collisions, frames, hp = frame_stepped(args.hp, hp2, s1, s2, args.seed)
+        elapsed = time.perf_counter() - start
+        print(f"Frame-stepped: {collisions} collisions, HP left {hp[0]} / {hp[1]}, "
+              f"ends on frame {frames} in {1000 * elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import bisect
+import math
+
+# Damage strategies for two_balls.py.
+#
+# A strategy yields the damage a ball deals on each hit, starting with its
+# damage before any collision. The registered instance also keeps the prefix
+# sums of that sequence, so battle_solver can tell how many hits it takes to
+# deal a given amount of damage without replaying them. Damage must stay
+# positive for that search to end.
+#
+# New strategies plug in with the decorator (the label is what the game
+# shows; it defaults to the name):
+#
+#   @register("triple", "Tripling")
+#   class Triple(Strategy):
+#       def damages(self):
+#           damage = 1
+#           while True:
+#               yield damage
+#               damage *= 3
+
+STRATEGIES = {}
+
+
+def register(name, label=None):
+    def add(cls):
+        cls.name = name
+        cls.label = label or name.title()
+        STRATEGIES[name] = cls()
+        return cls
+    return add
+
+
+class Strategy:
+    name = None
+    label = None
+
+    def __init__(self):
+        self.prefix = [0]
+        self.source = self.damages()
+
+    def damages(self):
+        raise NotImplementedError
+
+    def _extend(self):
+        self.prefix.append(self.prefix[-1] + next(self.source))
+
+    def total(self, hits):
+        # Damage dealt by the first `hits` hits
+        while len(self.prefix) <= hits:
+            self._extend()
+        return self.prefix[hits]
+
+    def hits_to_deal(self, amount):
+        # Fewest hits whose damage adds up to at least `amount`
+        while self.prefix[-1] < amount:
+            self._extend()
+        return bisect.bisect_left(self.prefix, amount)
+
+
+@register("fib", "Fibonacci")
+class Fibonacci(Strategy):
+    def damages(self):
+        # Sequence: 1, 1, 2, 3, 5, 8...
+        prev, curr = 0, 1
+        while True:
+            yield curr
+            prev, curr = curr, prev + curr
+
+
+@register("double", "Double")
+class Doubling(Strategy):
+    def damages(self):
+        # Sequence: 1, 2, 4, 8, 16...
+        damage = 1
+        while True:
+            yield damage
+            damage *= 2
+
+    def total(self, hits):
+        return 2**hits - 1
+
+    def hits_to_deal(self, amount):
+        return max(0, amount).bit_length()
+
+
+@register("linear")
+class Linear(Strategy):
+    # Sequence: 1, 2, 3, 4... Slow enough that a big HP pool takes tens of
+    # thousands of hits, so the sums are closed-form instead of cached
+    def damages(self):
+        damage = 1
+        while True:
+            yield damage
+            damage += 1
+
+    def total(self, hits):
+        return hits * (hits + 1) // 2
+
+    def hits_to_deal(self, amount):
+        if amount <= 0:
+            return 0
+        hits = (math.isqrt(8 * amount + 1) - 1) // 2
+        return hits if self.total(hits) >= amount else hits + 1
@@ -0,0 +1,199 @@
+import argparse
+import time
+
+import pygame
+
+from profiler import ProfileOverlay, profiler
+
+# Fixed-timestep game loop shared by ball.py, racing_balls.py and two_balls.py.
+#
+# The games measure everything in ticks of 1/60 s (speeds are pixels per
+# tick), so the simulation always advances in whole ticks at TICK_RATE per
+# second of real time, however fast frames are drawn. Each frame adds the
+# real time that passed to an accumulator and runs as many ticks as fit in
+# it; the leftover fraction of a tick (alpha) is handed to render(), which
+# draws between the state before the frame's last tick and the state after
+# it. A slow frame therefore runs extra ticks instead of slowing the game
+# down, and a fast display still sees smooth motion.
+#
+# A game plugs in by subclassing Simulation. step() advances exactly one tick
+# and must not look at the clock or at whether anything is drawn, so the
+# same object runs headless (run_headless) as fast as the CPU allows, for
+# tests and tuning.
+#
+# With render_skip, frames are not drawn while the loop is behind real time
+# (up to max_skip in a row), so a slow machine spends its time on ticks.
+#
+# Each frame is timed in phases (events, physics, draw, display) by
+# profiler.py: F3 shows their p50/p99, and a profile path records every
+# frame and writes it out when the window closes.
+
+TICK_RATE = 60
+MAX_STEPS = 10          # Ticks run per frame at most; any further backlog is dropped
+MAX_FRAME_TIME = 0.25   # Seconds; a longer stall (dragging the window) is not caught up
+MAX_SKIP = 5            # Frames skipped in a row at most in render-skip mode
+
+
+def lerp(a, b, alpha):
+    return a + (b - a) * alpha
+
+
+class Simulation:
+    # True once there is nothing left to simulate; run_headless stops there.
+    # The on-screen loop keeps going until the window is closed.
+    done = False
+
+    def step(self):
+        raise NotImplementedError
+
+    def render_state(self):
+        # Whatever render() interpolates from. The engine takes it before the
+        # last tick of each frame and passes it back as `previous`.
+        return None
+
+    def handle_event(self, event):
+        # Returns True if the event moved the state without a tick (a
+        # restart), so the next frame does not interpolate across the jump
+        return False
+
+    def render(self, screen, previous, alpha):
+        # Draws the state `alpha` of a tick on from `previous`. Returns the
+        # rectangles to push to the display, or None for the whole screen.
+        raise NotImplementedError
+
+
+class Engine:
+    def __init__(self, sim, tick_rate=TICK_RATE, max_fps=TICK_RATE, render_skip=False,
+                 max_steps=MAX_STEPS, max_skip=MAX_SKIP, profile_path=None):
+        self.sim = sim
+        self.tick_rate = tick_rate
+        self.max_fps = max_fps   # 0 draws as fast as possible
+        self.render_skip = render_skip
+        self.max_steps = max_steps
+        self.max_skip = max_skip
+        self.ticks = 0
+        self.frames = 0
+        self.skipped = 0
+        self.dropped = 0   # Ticks given up on because the loop fell too far behind
+        self.profile_path = profile_path   # .csv, or .json for a Chrome trace
+        self.overlay = ProfileOverlay(profiler)
+
+    def toggle_overlay(self):
+        self.overlay.toggle()
+        profiler.enabled = self.overlay.visible or profiler.recording
+
+    def run(self, screen):
+        if self.profile_path:
+            profiler.record()
+        try:
+            self._loop(screen)
+        finally:
+            if self.profile_path:
+                profiler.export(self.profile_path)
+
+    def _loop(self, screen):
+        sim = self.sim
+        clock = pygame.time.Clock()
+        tick = 1 / self.tick_rate
+        accumulator = 0.0
+        skipped = 0
+        previous = sim.render_state()
+        last = time.perf_counter()
+
+        while True:
+            now = time.perf_counter()
+            with profiler.phase("events"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        return
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                        self.toggle_overlay()
+                        continue
+                    if sim.handle_event(event):
+                        previous = sim.render_state()
+
+            accumulator += min(now - last, MAX_FRAME_TIME)
+            last = now
+
+            steps = min(int(accumulator / tick), self.max_steps)
+            with profiler.phase("physics"):
+                for i in range(steps):
+                    if i == steps - 1:
+                        previous = sim.render_state()
+                    sim.step()
+            self.ticks += steps
+            accumulator -= steps * tick
+            behind = accumulator >= tick
+            if accumulator > self.max_steps * tick:
+                self.dropped += int(accumulator / tick) - self.max_steps
+                accumulator = self.max_steps * tick
+
+            if self.render_skip and behind and skipped < self.max_skip:
+                skipped += 1
+                self.skipped += 1
+                continue
+            skipped = 0
+
+            with profiler.phase("draw"):
+                uncovered = self.overlay.restore(screen)
+                dirty = sim.render(screen, previous, min(accumulator / tick, 1.0))
+                covered = self.overlay.draw(screen)
+            with profiler.phase("display"):
+                if dirty is None:
+                    pygame.display.flip()
+                else:
+                    pygame.display.update(dirty + uncovered + covered)
+            if profiler.enabled:
+                profiler.add("frame", now, time.perf_counter())
+            self.frames += 1
+            if self.max_fps:
+                clock.tick(self.max_fps)
+
+
+def run_headless(sim, ticks=None):
+    # Steps sim with no clock and no drawing until it is done or `ticks` have
+    # run; returns the number of ticks run
+    count = 0
+    step = sim.step
+    while not sim.done and (ticks is None or count < ticks):
+        step()
+        count += 1
+    return count
+
+
+# --- Benchmark ---
+
+def bench(make_sim, ticks):
+    # Ticks per second over `ticks` ticks, starting a new simulation whenever
+    # one finishes
+    count = 0
+    start = time.perf_counter()
+    while count < ticks:
+        ran = run_headless(make_sim(count), ticks - count)
+        count += max(ran, 1)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    from ball import TunnelSession
+    from racing_balls import Race
+    from two_balls import Battle
+
+    parser = argparse.ArgumentParser(description="Headless tick rates of the ball/ games")
+    parser.add_argument("--ticks", type=int, default=200_000)
+    args = parser.parse_args()
+
+    games = [
+        ("two_balls", lambda seed: Battle()),
+        ("racing_balls", lambda seed: Race(3)),
+        ("ball (tunnel)", lambda seed: TunnelSession(seed)),
+    ]
+    print(f"{args.ticks} ticks per game, {TICK_RATE} ticks per game second\n")
+    print(f"{'Game':<14} | {'Ticks/s':>11} {'x real time':>12}")
+    for name, make_sim in games:
+        rate = bench(make_sim, args.ticks)
+        print(f"{name:<14} | {rate:>11,.0f} {rate / TICK_RATE:>11,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import csv
+import functools
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import pygame
+
+# Frame-phase profiler for the games in ball/.
+#
+# Code marks its phases with `with profiler.phase("draw"):` or the
+# @profiler.timed("physics.sweep") decorator. While the profiler is disabled
+# phase() hands back one shared no-op context and the decorator only checks
+# a flag, so the instrumentation can stay in the hot paths. Enabled, each
+# phase keeps its last PHASE_WINDOW durations for the p50/p99 overlay (F3 in
+# any game run by engine.Engine), and while recording every timing also goes
+# to a bounded trace that export() writes as CSV or, for a .json path, as a
+# Chrome trace (load it in chrome://tracing or ui.perfetto.dev).
+#
+# Phases are not re-entrant: a phase must not contain itself. Dotted names
+# ("draw.rings") are sub-phases of the part before the dot.
+
+PHASE_WINDOW = 600        # Durations kept per phase for the percentiles
+TRACE_LIMIT = 500_000     # Trace events kept for export; older ones are dropped
+OVERLAY_REFRESH = 0.5     # Seconds between overlay updates
+OVERLAY_COLOR = (230, 230, 230)
+OVERLAY_BACKGROUND = (20, 20, 20)
+
+NULL_PHASE = nullcontext()
+
+# The order engine.Engine runs its phases in, for the overlay
+ORDER = {"frame": 0, "events": 1, "physics": 2, "draw": 3, "display": 4}
+
+
+class Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Profiler:
+    def __init__(self, window=PHASE_WINDOW, trace_limit=TRACE_LIMIT):
+        self.enabled = False
+        self.recording = False
+        self.window = window
+        self.phases = {}
+        self.samples = {}
+        self.trace = deque(maxlen=trace_limit)
+        self.origin = time.perf_counter()
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_PHASE
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = Phase(self, name)
+        return phase
+
+    def timed(self, name):
+        def wrap(fn):
+            @functools.wraps(fn)
+            def timed_fn(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.add(name, start, time.perf_counter())
+            return timed_fn
+        return wrap
+
+    def add(self, name, start, end):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(end - start)
+        if self.recording:
+            self.trace.append((name, start, end - start))
+
+    def record(self):
+        self.enabled = self.recording = True
+
+    def percentiles(self, name, qs=(50, 99)):
+        values = sorted(self.samples.get(name, ()))
+        if not values:
+            return [0.0] * len(qs)
+        return [values[min(len(values) - 1, int(q / 100 * len(values)))] for q in qs]
+
+    def summary(self):
+        # (phase, p50 ms, p99 ms, samples) in phase order, sub-phases after their parent
+        def key(name):
+            top = name.split(".")[0]
+            return ORDER.get(top, len(ORDER)), top, name
+
+        rows = []
+        for name in sorted(self.samples, key=key):
+            p50, p99 = self.percentiles(name)
+            rows.append((name, 1000 * p50, 1000 * p99, len(self.samples[name])))
+        return rows
+
+    # --- Export ---
+
+    def export(self, path):
+        if path.endswith(".json"):
+            self.export_trace(path)
+        else:
+            self.export_csv(path)
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["phase", "start_ms", "duration_ms"])
+            for name, start, duration in self.trace:
+                writer.writerow([name, f"{1000 * (start - self.origin):.3f}", f"{1000 * duration:.3f}"])
+
+    def export_trace(self, path):
+        # Chrome trace format: complete ("X") events, times in microseconds
+        events = [{"name": name, "cat": name.split(".")[0], "ph": "X", "pid": 1, "tid": 1,
+                   "ts": round(1e6 * (start - self.origin), 1), "dur": round(1e6 * duration, 1)}
+                  for name, start, duration in self.trace]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class ProfileOverlay:
+    # p50/p99 table in the bottom-right corner. The pixels under it are saved
+    # before it is drawn and put back before the next frame is rendered, so
+    # dirty-rect renderers never see it.
+    def __init__(self, profiler, margin=10):
+        self.profiler = profiler
+        self.margin = margin
+        self.visible = False
+        self.font = None
+        self.surface = None
+        self.refreshed = 0.0
+        self.saved = None
+        self.rect = None
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.refreshed = 0.0
+
+    def restore(self, screen):
+        # Puts back what the overlay covered; returns the rects to update
+        if self.saved is None:
+            return []
+        screen.blit(self.saved, self.rect)
+        self.saved = None
+        return [self.rect]
+
+    def _build(self):
+        if self.font is None:
+            self.font = pygame.font.SysFont("Courier New", 14, bold=True)
+        lines = [f"{'phase':<14}{'p50 ms':>8}{'p99 ms':>8}"]
+        for name, p50, p99, _ in self.profiler.summary():
+            label = "  " + name.split(".", 1)[1] if "." in name else name
+            lines.append(f"{label:<14}{p50:>8.2f}{p99:>8.2f}")
+        # Straight font.render: these strings change every refresh and would
+        # only push the games' labels out of the text cache
+        surfs = [self.font.render(line, True, OVERLAY_COLOR) for line in lines]
+        pad = 6
+        height = self.font.get_linesize()
+        surface = pygame.Surface((max(s.get_width() for s in surfs) + 2 * pad,
+                                  height * len(surfs) + 2 * pad))
+        surface.fill(OVERLAY_BACKGROUND)
+        for i, s in enumerate(surfs):
+            surface.blit(s, (pad, pad + i * height))
+        self.surface = surface
+
+    def draw(self, screen):
+        if not self.visible:
+            return []
+        now = time.perf_counter()
+        if self.surface is None or now - self.refreshed > OVERLAY_REFRESH:
+            self._build()
+            self.refreshed = now
+        screen_rect = screen.get_rect()
+        self.rect = self.surface.get_rect(bottomright=(screen_rect.right - self.margin,
+                                                       screen_rect.bottom - self.margin))
+        self.rect = self.rect.clip(screen_rect)
+        self.saved = screen.subsurface(self.rect).copy()
+        screen.blit(self.surface, self.rect)
+        return [self.rect]
+
+
+profiler = Profiler()
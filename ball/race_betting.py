@@ -0,0 +1,201 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from race_sim import exact_win_probabilities, lap_frames
+from racing_balls import MAX_LAPS, MIN_LAPS, RACER_CONFIG
+
+# Betting for racing_balls.py.
+#
+# OddsTable holds the win probability of every (lane_index, total_laps) for
+# 1-20 laps. One racer simulation records every lap, so the whole table
+# costs a single pass; it can be built on a background thread and lookups
+# are a dict access. Two books price bets from it:
+#   FixedOddsBook  - the odds are fixed from the table when the bet is placed
+#   PariMutuelPool - all stakes share one pool, split among the winners
+
+
+class OddsTable:
+    def __init__(self, n_lanes=len(RACER_CONFIG), max_laps=MAX_LAPS, samples=100_000, seed=0):
+        self.n_lanes = n_lanes
+        self.max_laps = max_laps
+        self.samples = samples
+        self.seed = seed
+        self.probabilities = None
+        self.thread = None
+
+    def build(self):
+        frames = lap_frames(self.samples, self.max_laps, self.seed)
+        probabilities = {}
+        for laps in range(MIN_LAPS, self.max_laps + 1):
+            win = exact_win_probabilities(frames[:, laps - 1], self.n_lanes)
+            for lane in range(self.n_lanes):
+                probabilities[(lane, laps)] = float(win[lane])
+        self.probabilities = probabilities
+        return self
+
+    def build_in_background(self):
+        self.thread = threading.Thread(target=self.build, daemon=True)
+        self.thread.start()
+        return self
+
+    @property
+    def ready(self):
+        return self.probabilities is not None
+
+    def win_probability(self, lane, laps):
+        # None until the table has been built
+        if self.probabilities is None:
+            return None
+        return self.probabilities[(lane, laps)]
+
+
+class Bettor:
+    def __init__(self, name, bankroll):
+        self.name = name
+        self.bankroll = bankroll
+
+    def stake(self, amount):
+        if amount <= 0:
+            raise ValueError(f"Stake must be positive, got {amount}")
+        if amount > self.bankroll:
+            raise ValueError(f"{self.name} cannot stake {amount} with a bankroll of {self.bankroll}")
+        self.bankroll -= amount
+
+
+class FixedOddsBook:
+    # Pays stake * odds on a win. margin is the house edge: 0 gives fair odds.
+    def __init__(self, table, laps, margin=0.0):
+        self.table = table
+        self.laps = laps
+        self.margin = margin
+        self.bets = []
+
+    def odds(self, lane):
+        chance = self.table.win_probability(lane, self.laps)
+        if chance is None:
+            return None
+        return (1 - self.margin) / chance
+
+    def place(self, bettor, lane, amount):
+        odds = self.odds(lane)
+        if odds is None:
+            raise RuntimeError("Odds are not ready yet")
+        bettor.stake(amount)
+        self.bets.append((bettor, lane, amount, odds))
+
+    def settle(self, winner):
+        payouts = {}
+        for bettor, lane, amount, odds in self.bets:
+            win = amount * odds if lane == winner else 0.0
+            bettor.bankroll += win
+            payouts[bettor.name] = payouts.get(bettor.name, 0.0) + win
+        self.bets = []
+        return payouts
+
+
+class PariMutuelPool:
+    # Every stake goes into one pool. After the house take, the pool is shared
+    # among the bets on the winner in proportion to their stakes. If nobody
+    # backed the winner, every stake is refunded.
+    def __init__(self, n_lanes, take=0.1):
+        self.take = take
+        self.totals = [0.0] * n_lanes
+        self.bets = []
+
+    def odds(self, lane):
+        # What a unit stake on this lane would return if betting closed now
+        if not self.totals[lane]:
+            return None
+        return sum(self.totals) * (1 - self.take) / self.totals[lane]
+
+    def place(self, bettor, lane, amount):
+        bettor.stake(amount)
+        self.totals[lane] += amount
+        self.bets.append((bettor, lane, amount))
+
+    def settle(self, winner):
+        pool = sum(self.totals)
+        backed = self.totals[winner]
+        payouts = {}
+        for bettor, lane, amount in self.bets:
+            if not backed:
+                win = amount
+            elif lane == winner:
+                win = pool * (1 - self.take) * amount / backed
+            else:
+                win = 0.0
+            bettor.bankroll += win
+            payouts[bettor.name] = payouts.get(bettor.name, 0.0) + win
+        self.totals = [0.0] * len(self.totals)
+        self.bets = []
+        return payouts
+
+
+def place_ai_bets(book, bettors, table, laps, rng, stake=10, noise=0.5):
+    # Each computer bettor stakes a flat amount on one lane, picked in
+    # proportion to its win probability distorted by a personal hunch
+    chances = np.array([table.win_probability(lane, laps) for lane in range(table.n_lanes)])
+    for bettor in bettors:
+        amount = min(stake, bettor.bankroll)
+        if amount <= 0:
+            continue
+        hunch = chances * rng.lognormal(0.0, noise, len(chances))
+        lane = int(rng.choice(len(chances), p=hunch / hunch.sum()))
+        book.place(bettor, lane, amount)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate betting rounds on Ultimate Python Racing")
+    parser.add_argument("--rounds", type=int, default=10_000)
+    parser.add_argument("--bettors", type=int, default=5)
+    parser.add_argument("--bankroll", type=float, default=1000.0)
+    parser.add_argument("--stake", type=float, default=10.0)
+    parser.add_argument("--pricing", choices=["fixed", "pool"], default="fixed")
+    parser.add_argument("--margin", type=float, default=0.0, help="House edge for fixed odds")
+    parser.add_argument("--take", type=float, default=0.1, help="House take for the pool")
+    parser.add_argument("--samples", type=int, default=100_000, help="Racers simulated for the odds table")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = OddsTable(samples=args.samples, seed=args.seed).build()
+    print(f"Odds table for {MIN_LAPS}-{MAX_LAPS} laps built in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        table.win_probability(3, 7)
+    print(f"Lookup: {(time.perf_counter() - start) * 1e4:.0f} ns")
+
+    # Races are drawn from an independent racer simulation, not the one the
+    # table was built from
+    rng = np.random.default_rng(args.seed + 1)
+    frames = lap_frames(args.samples, MAX_LAPS, args.seed + 1)
+    n_lanes = table.n_lanes
+    bettors = [Bettor(f"Bettor {i + 1}", args.bankroll) for i in range(args.bettors)]
+    start_total = sum(b.bankroll for b in bettors)
+    staked = 0.0
+
+    for _ in range(args.rounds):
+        laps = int(rng.integers(MIN_LAPS, MAX_LAPS + 1))
+        if args.pricing == "fixed":
+            book = FixedOddsBook(table, laps, args.margin)
+        else:
+            book = PariMutuelPool(n_lanes, args.take)
+        before = sum(b.bankroll for b in bettors)
+        place_ai_bets(book, bettors, table, laps, rng, args.stake)
+        staked += before - sum(b.bankroll for b in bettors)
+        finish = frames[rng.integers(0, len(frames), n_lanes), laps - 1]
+        book.settle(int(np.argmin(finish)))
+
+    print(f"\n{args.rounds} rounds, {args.pricing} pricing")
+    for bettor in bettors:
+        print(f"  {bettor.name:<10} {bettor.bankroll:>10.2f}")
+    house = start_total - sum(b.bankroll for b in bettors)
+    print(f"  House P&L  {house:>10.2f} ({house / staked:+.2%} of {staked:.0f} staked)")
+
+
+if __name__ == "__main__":
+    main()
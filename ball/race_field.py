@@ -0,0 +1,261 @@
+import argparse
+import colorsys
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pygame
+
+from racing_balls import (ACCEL_MAX, ACCEL_MIN, FPS, HEIGHT, LANE_WIDTH, MAX_SPEED, MIN_SPEED,
+                          RACER_CONFIG, TRACK_CENTER, TRACK_RADIUS_X, TRACK_RADIUS_Y, WIDTH)
+
+# Large-field mode for racing_balls.py: 100-1000 racers from a JSON config.
+#
+# Racer state lives in numpy arrays (one entry per racer) and a frame is a
+# handful of vectorized operations, using the same speed walk as
+# Racer.update. The field is spread over `lanes` lanes between the curbs;
+# racers sharing a lane start on a staggered grid behind the line, and every
+# racer covers exactly `laps` full laps from its own grid slot, so nobody
+# gains from the draw.
+#
+# Config file:
+#   {"laps": 3, "lanes": 12,
+#    "racers": [{"name": "Red", "color": [255, 0, 0]}, ...],
+#    "generate": {"count": 494, "colors": 24}}
+# "racers" and "generate" are both optional; generated racers are named
+# "Racer N" and take their colour from a palette of "colors" hues, so the
+# renderer needs one sprite per hue rather than per racer.
+
+LAP = 360.0
+BOARD_SIZE = 8
+
+# Lanes sit between the outer curb and the infield drawn by draw_track_background
+OUTER_LANE = TRACK_RADIUS_X - 20
+INNER_LANE = TRACK_RADIUS_X - len(RACER_CONFIG) * LANE_WIDTH - 20
+
+
+def generate_racers(count, colors=24, first=1):
+    hues = [colorsys.hsv_to_rgb(i / colors, 0.85, 1.0) for i in range(colors)]
+    palette = [tuple(int(255 * c) for c in rgb) for rgb in hues]
+    return [{"name": f"Racer {first + i}", "color": palette[i % colors]} for i in range(count)]
+
+
+def load_config(path):
+    # The config with "generate" expanded into the "racers" list
+    with open(path) as f:
+        config = json.load(f)
+    racers = list(config.get("racers", []))
+    generate = config.get("generate")
+    if generate:
+        racers += generate_racers(generate["count"], generate.get("colors", 24), len(racers) + 1)
+    if not racers:
+        raise ValueError(f"{path} defines no racers")
+    config["racers"] = racers
+    return config
+
+
+def load_field(path, seed=None):
+    config = load_config(path)
+    return Field(config["racers"], config.get("laps", 3), config.get("lanes", 12), seed)
+
+
+class Field:
+    def __init__(self, racers, laps=3, lanes=12, seed=None):
+        self.names = [r["name"] for r in racers]
+        self.n = len(racers)
+        colors = [tuple(r["color"]) for r in racers]
+        self.palette = list(dict.fromkeys(colors))
+        lookup = {color: i for i, color in enumerate(self.palette)}
+        self.color_index = np.array([lookup[c] for c in colors])
+
+        # Lane radii, at most LANE_WIDTH apart as in the six-lane race
+        lanes = max(1, min(lanes, self.n))
+        lane_width = min(LANE_WIDTH, (OUTER_LANE - INNER_LANE) / max(lanes - 1, 1))
+        self.ball_radius = max(2, min(12, int(lane_width / 2) - 1))
+        index = np.arange(self.n)
+        lane = index % lanes
+        self.radius_x = OUTER_LANE - lane * lane_width
+        self.radius_y = self.radius_x - (TRACK_RADIUS_X - TRACK_RADIUS_Y)
+
+        # Grid slots behind the line, one ball and a gap apart on the
+        # innermost lane, alternate lanes offset by half a slot
+        slot = math.degrees((2 * self.ball_radius + 2) / (OUTER_LANE - (lanes - 1) * lane_width))
+        self.start_angle = 90 - (index // lanes + (lane % 2) / 2) * slot
+
+        self.reset(laps, seed)
+
+    def reset(self, laps=None, seed=None):
+        if laps is not None:
+            self.laps = laps
+        self.total = self.laps * LAP
+        self.rng = np.random.default_rng(seed)
+        self.speed = np.zeros(self.n)
+        self.distance = np.zeros(self.n)
+        self.finish_frame = np.full(self.n, -1)
+        self.frame = 0
+        self.finished_count = 0
+        self.winner = None
+
+    def update(self):
+        if self.finished_count == self.n:
+            return
+        self.frame += 1
+        running = self.finish_frame < 0
+        self.speed += self.rng.uniform(ACCEL_MIN, ACCEL_MAX, self.n)
+        np.clip(self.speed, MIN_SPEED, MAX_SPEED, out=self.speed)
+        self.distance += self.speed * running
+
+        done = np.flatnonzero(running & (self.distance >= self.total))
+        if len(done):
+            self.finish_frame[done] = self.frame
+            self.finished_count += len(done)
+            if self.winner is None:
+                # Ties go to the lower index, as they do to the lower lane
+                self.winner = int(done[0])
+
+    def positions(self):
+        rad = np.radians(self.start_angle + self.distance)
+        x = TRACK_CENTER[0] + self.radius_x * np.cos(rad)
+        y = TRACK_CENTER[1] + self.radius_y * np.sin(rad)
+        return x.astype(int), y.astype(int)
+
+    def leader_laps(self):
+        return min(int(self.distance.max() // LAP), self.laps)
+
+    def standings(self):
+        # Larger is further ahead. Finished racers rank by finish frame, then
+        # index; the rest by distance covered.
+        finished = self.total + 1e6 - self.finish_frame - np.arange(self.n) * 1e-6
+        return np.where(self.finish_frame >= 0, finished, self.distance)
+
+
+class Leaderboard:
+    # Racer indices ordered by position. Between two frames only a few racers
+    # overtake, so last frame's order is nearly sorted and insertion sort
+    # fixes it with one comparison per racer plus one shift per place gained,
+    # instead of a full sort every frame.
+    def __init__(self, n):
+        self.order = list(range(n))
+        self.shifts = 0
+
+    def update(self, keys):
+        order = self.order
+        keys = keys.tolist()
+        for i in range(1, len(order)):
+            item = order[i]
+            key = keys[item]
+            if keys[order[i - 1]] >= key:
+                continue
+            j = i - 1
+            while j >= 0 and keys[order[j]] < key:
+                order[j + 1] = order[j]
+                j -= 1
+                self.shifts += 1
+            order[j + 1] = item
+
+    def top(self, k=BOARD_SIZE):
+        return self.order[:k]
+
+
+def board_lines(field, board):
+    lines = []
+    for place, i in enumerate(board.top(), 1):
+        if field.finish_frame[i] >= 0:
+            status = f"{field.finish_frame[i] / FPS:.2f}s"
+        else:
+            status = f"lap {min(int(field.distance[i] // LAP) + 1, field.laps)}"
+        lines.append(f"{place}. {field.names[i]}  {status}")
+    return lines
+
+
+def run_field(field):
+    from race_render import RaceRenderer
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(f"Ultimate Python Racing - {field.n} racers")
+    clock = pygame.time.Clock()
+    fonts = (pygame.font.SysFont("Impact", 50), pygame.font.SysFont("Arial", 30, bold=True),
+             pygame.font.SysFont("Arial", 40, bold=True), pygame.font.SysFont("Arial", 18, bold=True))
+    renderer = RaceRenderer(screen, fonts)
+    board = Leaderboard(field.n)
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.MOUSEBUTTONDOWN and field.finished_count == field.n:
+                field.reset()
+                board = Leaderboard(field.n)
+
+        if field.finished_count < field.n:
+            field.update()
+            board.update(field.standings())
+            lap = min(field.leader_laps() + 1, field.laps)
+            dirty = renderer.draw_race(field, f"{field.n} racers  {renderer.timer.fps:.0f} FPS",
+                                       f"Lap: {lap} / {field.laps}", board_lines(field, board))
+        else:
+            winner = field.names[field.winner]
+            time_text = f"{field.finish_frame[field.winner] / FPS:.2f} s"
+            dirty = renderer.draw_results(field, winner, time_text, (255, 215, 0))
+
+        pygame.display.update(dirty)
+        clock.tick(FPS)
+
+    pygame.quit()
+
+
+def main():
+    # Headless frame-time benchmark of the large-field mode
+    parser = argparse.ArgumentParser(description="Frame times of the large-field race")
+    parser.add_argument("config", nargs="?", help="Field config (JSON); default: generated racers")
+    parser.add_argument("--racers", type=int, nargs="+", default=[100, 300, 1000],
+                        help="Field sizes to generate when no config is given")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--headless", action="store_true", help="Use SDL's dummy video driver")
+    args = parser.parse_args()
+
+    from race_render import RaceRenderer
+
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    fonts = (pygame.font.SysFont("Impact", 50), pygame.font.SysFont("Arial", 30, bold=True),
+             pygame.font.SysFont("Arial", 40, bold=True), pygame.font.SysFont("Arial", 18, bold=True))
+
+    if args.config:
+        fields = [load_field(args.config, seed=0)]
+    else:
+        fields = [Field(generate_racers(n), seed=0) for n in args.racers]
+
+    print(f"{args.frames} frames, ms per frame (budget {1000 / FPS:.1f} ms at {FPS} FPS)\n")
+    print(f"{'Racers':>6} {'Lanes':>5} | {'Update':>7} {'Board':>7} {'Render':>7} {'Total':>7} "
+          f"{'Shifts':>7}")
+    for field in fields:
+        renderer = RaceRenderer(screen, fonts)
+        board = Leaderboard(field.n)
+        times = np.zeros(3)
+        for _ in range(args.frames):
+            t0 = time.perf_counter()
+            field.update()
+            t1 = time.perf_counter()
+            board.update(field.standings())
+            lines = board_lines(field, board)
+            t2 = time.perf_counter()
+            dirty = renderer.draw_race(field, f"{field.n} racers", f"Lap: {field.leader_laps() + 1}",
+                                       lines)
+            pygame.display.update(dirty)
+            times += (t1 - t0, t2 - t1, time.perf_counter() - t2)
+        update, sort, render = 1000 * times / args.frames
+        lanes = len(set(field.radius_x.tolist()))
+        print(f"{field.n:>6} {lanes:>5} | {update:>7.3f} {sort:>7.3f} {render:>7.3f} "
+              f"{update + sort + render:>7.3f} {board.shifts / args.frames:>7.1f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+import argparse
+import os
+import random
+import time
+
+import pygame
+
+from racing_balls import (BLACK, FPS, RACER_CONFIG, WHITE, HEIGHT, WIDTH, Racer,
+                          draw_track_background)
+from profiler import profiler
+from text_cache import text_cache
+from tunnel_render import FrameTimer, TextLayer
+
+# Layered rendering for racing_balls.py.
+#
+# The track is rasterized once into a cached surface, and the betting screen
+# (track, dimming overlay and the static titles) into a second one. Each
+# racer colour gets a colour-keyed ball sprite. A frame then restores last
+# frame's sprites and labels from the cached layer, blits the new ones, and
+# only those rectangles are pushed to the display. Switching screens redraws
+# the whole layer once.
+#
+# legacy=True keeps the old path (track, overlay and text rebuilt every
+# frame) for comparing frame times; run this module to benchmark both.
+
+BALL_RADIUS = 12
+SUB_COLOR = (200, 200, 200)
+MAX_RECTS = 64   # Past this many sprites, restore and push their bounding box
+
+
+def build_ball_sprite(color, radius=BALL_RADIUS):
+    size = 2 * radius + 2
+    center = (radius + 1, radius + 1)
+    offset = round(radius / 4)
+    colorkey = (255, 0, 255)
+    surf = pygame.Surface((size, size)).convert()
+    surf.fill(colorkey)
+    pygame.draw.circle(surf, color, center, radius)
+    pygame.draw.circle(surf, WHITE, (center[0] - offset, center[1] - offset), max(1, round(radius / 3))) # Shine
+    pygame.draw.circle(surf, BLACK, center, radius, 1) # Outline
+    surf.set_colorkey(colorkey, pygame.RLEACCEL)
+    return surf
+
+
+class RaceRenderer:
+    def __init__(self, screen, fonts, legacy=False):
+        self.screen = screen
+        self.title_font, self.msg_font, self.lap_font, self.odds_font = fonts
+        self.legacy = legacy
+        self.timer = FrameTimer()
+
+        # Built on first use
+        self.track = None
+        self.betting = None
+        self.sprites = {}
+        self.texts = {}
+
+        self.scene = None
+        self.drawn = []
+        self.previous = []
+        self.full = True
+
+    # --- Cached layers ---
+
+    def track_layer(self):
+        if self.track is None:
+            self.track = pygame.Surface(self.screen.get_size()).convert()
+            draw_track_background(self.track)
+        return self.track
+
+    def betting_layer(self):
+        if self.betting is None:
+            self.betting = self.track_layer().copy()
+            overlay = pygame.Surface(self.betting.get_size())
+            overlay.set_alpha(150)
+            overlay.fill(BLACK)
+            self.betting.blit(overlay, (0, 0))
+            title = self.title_font.render("RACE SETTINGS", True, WHITE)
+            self.betting.blit(title, title.get_rect(center=(WIDTH//2, HEIGHT//2 - 120)))
+            sub = self.msg_font.render("Choose a racer to start:", True, SUB_COLOR)
+            self.betting.blit(sub, sub.get_rect(center=(WIDTH//2, HEIGHT - 160)))
+        return self.betting
+
+    def sprite(self, color, radius=BALL_RADIUS):
+        surf = self.sprites.get((color, radius))
+        if surf is None:
+            surf = build_ball_sprite(color, radius)
+            self.sprites[(color, radius)] = surf
+        return surf
+
+    def text(self, key, font, text, color=WHITE):
+        layer = self.texts.get(key)
+        if layer is None:
+            layer = TextLayer(font, color)
+            self.texts[key] = layer
+        return layer.render(text)
+
+    # --- Frame bookkeeping ---
+
+    def _begin(self, scene, layer):
+        self.timer.start()
+        self.previous = self.drawn
+        self.drawn = []
+        self.full = self.legacy or scene != self.scene
+        self.scene = scene
+        if self.full:
+            self.screen.blit(layer, (0, 0))
+            self.previous = []
+        elif len(self.previous) > MAX_RECTS:
+            self.previous = [self.previous[0].unionall(self.previous)]
+            self.screen.blit(layer, self.previous[0], self.previous[0])
+        else:
+            for rect in self.previous:
+                self.screen.blit(layer, rect, rect)
+
+    def _blit(self, surf, rect):
+        self.screen.blit(surf, rect)
+        self.drawn.append(rect)
+
+    def _end(self):
+        self.timer.stop()
+        if self.full:
+            return [self.screen.get_rect()]
+        if len(self.drawn) > MAX_RECTS:
+            return [self.drawn[0].unionall(self.drawn[1:] + self.previous)]
+        return self.previous + self.drawn
+
+    @profiler.timed("draw.racers")
+    def _draw_racers(self, racers, angles=None):
+        if hasattr(racers, "positions"):
+            # A race_field.Field: positions come as arrays, blitted in one batch
+            radius = racers.ball_radius
+            sprites = [self.sprite(color, radius) for color in racers.palette]
+            xs, ys = racers.positions()
+            xs -= radius + 1
+            ys -= radius + 1
+            blits = [(sprites[c], (x, y)) for c, x, y in
+                     zip(racers.color_index.tolist(), xs.tolist(), ys.tolist())]
+            self.drawn.extend(self.screen.blits(blits))
+            return
+        for i, r in enumerate(racers):
+            surf = self.sprite(r.color)
+            x, y = r.position(None if angles is None else angles[i])
+            self._blit(surf, surf.get_rect(center=(int(x), int(y))))
+
+    # --- Screens ---
+    # Each returns the list of rectangles to pass to pygame.display.update
+
+    def draw_betting(self, buttons, lap_buttons, laps, odds_labels, bank_label):
+        if self.legacy:
+            return self._legacy_betting(buttons, lap_buttons, laps, odds_labels, bank_label)
+        self._begin("betting", self.betting_layer())
+
+        lap_text = self.text("laps", self.lap_font, f"LAPS: {laps}")
+        self._blit(lap_text, lap_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 45)))
+        for btn in lap_buttons:
+            btn.draw(self.screen)
+            self.drawn.append(btn.rect)
+
+        for lane, (btn, label) in enumerate(zip(buttons, odds_labels)):
+            btn.draw(self.screen)
+            self.drawn.append(btn.rect)
+            odds_text = self.text(("odds", lane), self.odds_font, label)
+            self._blit(odds_text, odds_text.get_rect(midtop=(btn.rect.centerx, btn.rect.bottom + 6)))
+
+        bank_text = self.text("bank", self.msg_font, bank_label)
+        self._blit(bank_text, bank_text.get_rect(topleft=(20, 20)))
+        return self._end()
+
+    def draw_race(self, racers, bet_label, lap_label, board=(), angles=None):
+        # board: leaderboard lines listed under the bet label
+        # angles: interpolated racer angles to draw at instead of their own
+        if self.legacy:
+            return self._legacy_race(racers, bet_label, lap_label)
+        self._begin("racing", self.track_layer())
+        self._draw_racers(racers, angles)
+
+        # HUD (Heads Up Display)
+        bet_text = self.text("bet", self.msg_font, bet_label)
+        self._blit(bet_text, bet_text.get_rect(topleft=(20, 20)))
+        lap_info = self.text("lap", self.msg_font, lap_label)
+        self._blit(lap_info, lap_info.get_rect(topleft=(WIDTH - 200, 20)))
+        for i, line in enumerate(board):
+            row = self.text(("board", i), self.odds_font, line)
+            self._blit(row, row.get_rect(topleft=(20, 60 + 22 * i)))
+        return self._end()
+
+    def draw_results(self, racers, winner, message, color):
+        # Nothing moves on the results screen, so it is drawn once on entry
+        if self.scene == "results" and not self.legacy:
+            return []
+        self._begin("results", self.track_layer())
+        self._draw_racers(racers)
+
+        panel_rect = pygame.Rect(WIDTH//2 - 200, HEIGHT//2 - 100, 400, 200)
+        pygame.draw.rect(self.screen, BLACK, panel_rect, border_radius=15)
+        pygame.draw.rect(self.screen, WHITE, panel_rect, 4, border_radius=15)
+
+        win_text = text_cache.render(self.title_font, f"Winner: {winner}", WHITE)
+        res_text = text_cache.render(self.title_font, message, color)
+        retry_text = text_cache.render(self.msg_font, "Click to Race Again", SUB_COLOR)
+        self.screen.blit(win_text, win_text.get_rect(center=(WIDTH//2, HEIGHT//2 - 40)))
+        self.screen.blit(res_text, res_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 20)))
+        self.screen.blit(retry_text, retry_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 70)))
+        return self._end()
+
+    # --- Uncached path, kept for comparing frame times ---
+
+    def _legacy_betting(self, buttons, lap_buttons, laps, odds_labels, bank_label):
+        self.timer.start()
+        screen = self.screen
+        draw_track_background(screen)
+        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 150))
+        screen.blit(overlay, (0, 0))
+
+        title = self.title_font.render("RACE SETTINGS", True, WHITE)
+        screen.blit(title, title.get_rect(center=(WIDTH//2, HEIGHT//2 - 120)))
+        lap_text = self.lap_font.render(f"LAPS: {laps}", True, WHITE)
+        screen.blit(lap_text, lap_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 45)))
+        for btn in lap_buttons:
+            btn.draw(screen, cached=False)
+        sub = self.msg_font.render("Choose a racer to start:", True, SUB_COLOR)
+        screen.blit(sub, sub.get_rect(center=(WIDTH//2, HEIGHT - 160)))
+        for btn, label in zip(buttons, odds_labels):
+            btn.draw(screen, cached=False)
+            odds_text = self.odds_font.render(label, True, WHITE)
+            screen.blit(odds_text, odds_text.get_rect(midtop=(btn.rect.centerx, btn.rect.bottom + 6)))
+        bank_text = self.msg_font.render(bank_label, True, WHITE)
+        screen.blit(bank_text, (20, 20))
+
+        self.scene = "betting"
+        self.timer.stop()
+        return [screen.get_rect()]
+
+    def _legacy_race(self, racers, bet_label, lap_label):
+        self.timer.start()
+        screen = self.screen
+        draw_track_background(screen)
+        for r in racers:
+            r.draw(screen)
+        screen.blit(self.msg_font.render(bet_label, True, WHITE), (20, 20))
+        screen.blit(self.msg_font.render(lap_label, True, WHITE), (WIDTH - 200, 20))
+
+        self.scene = "racing"
+        self.timer.stop()
+        return [screen.get_rect()]
+
+
+# --- Benchmark ---
+
+def make_field(n_racers, laps, seed=0):
+    # More racers than lanes share the six lanes, spread around the track
+    rng = random.Random(seed)
+    racers = []
+    for i in range(n_racers):
+        lane = i % len(RACER_CONFIG)
+        r = Racer(RACER_CONFIG[lane], lane, laps)
+        r.angle += rng.uniform(0, 360)
+        racers.append(r)
+    return racers
+
+
+def bench(renderer, scene, racers, frames, buttons, lap_buttons):
+    odds_labels = ["6.00x"] * len(buttons)
+    renderer.scene = None
+    start = time.perf_counter()
+    for frame in range(frames):
+        if scene == "betting":
+            dirty = renderer.draw_betting(buttons, lap_buttons, 3, odds_labels,
+                                          f"Bankroll: {frame}  Stake: 10")
+        else:
+            for r in racers:
+                r.update()
+            dirty = renderer.draw_race(racers, "Bet: Red", f"Lap: {frame // 600 + 1} / 3")
+        pygame.display.update(dirty)
+    return 1000 * (time.perf_counter() - start) / frames
+
+
+def main():
+    from racing_balls import Button, BUTTON_COLOR
+
+    parser = argparse.ArgumentParser(description="Frame times of the old and layered race renderers")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--racers", type=int, nargs="+", default=[6, 60])
+    parser.add_argument("--headless", action="store_true", help="Use SDL's dummy video driver")
+    args = parser.parse_args()
+
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    fonts = (pygame.font.SysFont("Impact", 50), pygame.font.SysFont("Arial", 30, bold=True),
+             pygame.font.SysFont("Arial", 40, bold=True), pygame.font.SysFont("Arial", 18, bold=True))
+    start_x = (WIDTH - (len(RACER_CONFIG) * 110)) // 2
+    buttons = [Button(start_x + i * 110, HEIGHT - 100, 100, 50, data["color"], data["name"])
+               for i, data in enumerate(RACER_CONFIG)]
+    lap_buttons = [Button(WIDTH//2 - 100, HEIGHT//2 + 20, 50, 50, BUTTON_COLOR, "-", WHITE),
+                   Button(WIDTH//2 + 50, HEIGHT//2 + 20, 50, 50, BUTTON_COLOR, "+", WHITE)]
+
+    print(f"{args.frames} frames per run, ms per frame (budget {1000 / FPS:.1f} ms at {FPS} FPS)\n")
+    print(f"{'Screen':<8} {'Racers':>6} | {'Old':>7} {'Layered':>8} {'Speedup':>8}")
+    rows = [("betting", 0)] + [("racing", n) for n in args.racers]
+    for scene, n in rows:
+        times = []
+        for legacy in (True, False):
+            renderer = RaceRenderer(screen, fonts, legacy)
+            times.append(bench(renderer, scene, make_field(n, 3), args.frames, buttons, lap_buttons))
+        old, new = times
+        print(f"{scene:<8} {n if n else '-':>6} | {old:>7.3f} {new:>8.3f} {old / new:>7.1f}x")
+    print(f"\n{text_cache.stats()}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
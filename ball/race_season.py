@@ -0,0 +1,278 @@
+import argparse
+import math
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from race_field import generate_racers, load_config
+from race_sim import lap_frames
+from racing_balls import RACER_CONFIG
+
+# Tournament seasons for racing_balls.py, raced without a display.
+#
+# A tournament shuffles the roster into heats of up to HEAT_SIZE lanes; the
+# top half of every heat goes through to the next round until one final
+# remains. Entrants are dealt round-robin over the heats, so heat sizes differ
+# by at most one, and each heat keeps the tie rule of the game (lower lane
+# wins). Whole batches of tournaments run round by round as numpy arrays, one
+# batch per job on a process pool. A batch is seeded by the season position
+# of its first tournament, so the results do not depend on the number of
+# workers, and running a season again continues it with new tournaments
+# instead of repeating the stored ones.
+#
+# Results stream into SQLite as each batch finishes. The race log (races and
+# results) is append-only, enforced by triggers; the standings table holds
+# per-racer totals that are bumped in the same transaction, so standings
+# never rescan the log.
+
+HEAT_SIZE = len(RACER_CONFIG)
+NO_FINISH = np.iinfo(np.int32).max   # Empty lanes sort last
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS racers (
+    season TEXT, racer INTEGER, name TEXT,
+    PRIMARY KEY (season, racer));
+CREATE TABLE IF NOT EXISTS races (
+    race INTEGER PRIMARY KEY, season TEXT, tournament INTEGER,
+    round INTEGER, heat INTEGER, final INTEGER, laps INTEGER);
+CREATE TABLE IF NOT EXISTS results (
+    race INTEGER, lane INTEGER, racer INTEGER, finish_frame INTEGER, place INTEGER,
+    PRIMARY KEY (race, lane)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_racer ON results (racer);
+CREATE INDEX IF NOT EXISTS races_by_season ON races (season, tournament);
+CREATE TABLE IF NOT EXISTS standings (
+    season TEXT, racer INTEGER, starts INTEGER, wins INTEGER, podiums INTEGER,
+    finals INTEGER, titles INTEGER, place_sum INTEGER,
+    PRIMARY KEY (season, racer));
+CREATE TRIGGER IF NOT EXISTS races_no_update BEFORE UPDATE ON races
+    BEGIN SELECT RAISE(ABORT, 'the race log is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS races_no_delete BEFORE DELETE ON races
+    BEGIN SELECT RAISE(ABORT, 'the race log is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS results_no_update BEFORE UPDATE ON results
+    BEGIN SELECT RAISE(ABORT, 'the race log is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS results_no_delete BEFORE DELETE ON results
+    BEGIN SELECT RAISE(ABORT, 'the race log is append-only'); END;
+"""
+
+
+def plan(entrants, heat_size=HEAT_SIZE):
+    # Heats per round, ending with the final
+    advance = heat_size // 2
+    rounds = []
+    while entrants > heat_size:
+        heats = math.ceil(entrants / heat_size)
+        rounds.append(heats)
+        entrants = heats * advance
+    rounds.append(1)
+    return rounds
+
+
+def run_round(rng, entrants, heats, laps, heat_size):
+    # entrants: (T, n) racer ids in seeding order, one row per tournament.
+    # Returns the heat grid (T, heats, lanes), finish frames and places, and
+    # the advancing racers in seeding order (every heat winner, then every
+    # runner-up, ...).
+    t, n = entrants.shape
+    grid = np.full((t, heat_size * heats), -1)
+    grid[:, :n] = entrants
+    grid = grid.reshape(t, heat_size, heats).transpose(0, 2, 1)
+
+    present = grid >= 0
+    frames = np.full(grid.shape, NO_FINISH, dtype=np.int32)
+    frames[present] = lap_frames(int(present.sum()), laps, int(rng.integers(2**32)))[:, -1]
+
+    # Stable sort: on a tie the lower lane finishes first
+    order = np.argsort(frames, axis=2, kind="stable")
+    places = np.empty_like(order)
+    np.put_along_axis(places, order, np.arange(1, heat_size + 1), axis=2)
+    ranked = np.take_along_axis(grid, order, axis=2)
+    advancing = ranked[:, :, :heat_size // 2].transpose(0, 2, 1).reshape(t, -1)
+    return grid, frames, places, advancing
+
+
+def run_batch(first, tournaments, roster, laps, final_laps, seed, heat_size=HEAT_SIZE):
+    # Races every round of `tournaments` tournaments, the first of which is
+    # tournament number `first` of the season. Returns the races as an int
+    # array of (tournament, round, heat, final, laps) rows and the results as
+    # (race, lane, racer, finish_frame, place) rows, with races numbered from
+    # 0 within the batch in (tournament, round, heat) order.
+    rng = np.random.default_rng([seed, first])
+    rounds = plan(roster, heat_size)
+    per_tournament = sum(rounds)
+    entrants = rng.permuted(np.tile(np.arange(roster), (tournaments, 1)), axis=1)
+
+    races = []
+    results = []
+    first_heat = 0
+    tournament = np.arange(tournaments)
+    for round_, heats in enumerate(rounds):
+        final = round_ == len(rounds) - 1
+        round_laps = final_laps if final else laps
+        grid, frames, places, entrants = run_round(rng, entrants, heats, round_laps, heat_size)
+
+        heat = np.arange(heats)
+        race = tournament[:, None] * per_tournament + first_heat + heat[None, :]
+        races.append(np.stack(np.broadcast_arrays(
+            tournament[:, None], round_, heat[None, :], int(final), round_laps), axis=-1).reshape(-1, 5))
+
+        t_idx, h_idx, lane = np.nonzero(grid >= 0)
+        results.append(np.stack([race[t_idx, h_idx], lane, grid[t_idx, h_idx, lane],
+                                 frames[t_idx, h_idx, lane], places[t_idx, h_idx, lane]], axis=1))
+        first_heat += heats
+
+    races = np.concatenate(races)
+    races = races[np.lexsort((races[:, 2], races[:, 1], races[:, 0]))]
+    return first, races, np.concatenate(results)
+
+
+class SeasonStore:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def next_ids(self):
+        race, tournament = self.db.execute(
+            "SELECT COALESCE(MAX(race), -1) + 1, COALESCE(MAX(tournament), -1) + 1 FROM races"
+        ).fetchone()
+        return race, tournament
+
+    def played(self, season):
+        # Tournaments already stored for the season
+        return self.db.execute(
+            "SELECT COUNT(DISTINCT tournament) FROM races WHERE season = ?", (season,)
+        ).fetchone()[0]
+
+    def register(self, season, names):
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO racers VALUES (?, ?, ?)",
+                                [(season, i, name) for i, name in enumerate(names)])
+            self.db.executemany("INSERT OR IGNORE INTO standings VALUES (?, ?, 0, 0, 0, 0, 0, 0)",
+                                [(season, i) for i in range(len(names))])
+
+    def append(self, season, races, results, first_race, first_tournament):
+        # One transaction per batch: the log rows and the standings bump
+        # commit together
+        n = len(races)
+        race_ids = first_race + np.arange(n)
+        final = races[:, 3].astype(bool)
+        is_final = final[results[:, 0]]
+        racer = results[:, 2]
+        place = results[:, 4]
+        roster = int(racer.max()) + 1
+        totals = np.stack([
+            np.bincount(racer, minlength=roster),
+            np.bincount(racer, place == 1, minlength=roster),
+            np.bincount(racer, place <= 3, minlength=roster),
+            np.bincount(racer, is_final, minlength=roster),
+            np.bincount(racer, is_final & (place == 1), minlength=roster),
+            np.bincount(racer, place, minlength=roster),
+        ], axis=1).astype(np.int64)
+
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO races VALUES (?, ?, ?, ?, ?, ?, ?)",
+                zip(race_ids.tolist(), [season] * n, (races[:, 0] + first_tournament).tolist(),
+                    *(races[:, i].tolist() for i in range(1, 5))))
+            rows = results.copy()
+            rows[:, 0] += first_race
+            self.db.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?)", rows.tolist())
+            self.db.executemany(
+                "UPDATE standings SET starts = starts + ?, wins = wins + ?, podiums = podiums + ?,"
+                " finals = finals + ?, titles = titles + ?, place_sum = place_sum + ?"
+                " WHERE season = ? AND racer = ?",
+                [(*row, season, i) for i, row in enumerate(totals.tolist()) if row[0]])
+
+    def standings(self, season, limit=10):
+        return self.db.execute(
+            "SELECT name, starts, wins, podiums, finals, titles, 1.0 * place_sum / starts"
+            " FROM standings JOIN racers USING (season, racer)"
+            " WHERE season = ? AND starts > 0"
+            " ORDER BY titles DESC, wins DESC, place_sum * 1.0 / starts LIMIT ?",
+            (season, limit),
+        ).fetchall()
+
+    def close(self):
+        self.db.close()
+
+
+def run_season(store, season, names, n_races, laps, final_laps, seed, workers, batch_races):
+    rounds = plan(len(names))
+    per_tournament = sum(rounds)
+    n_tournaments = math.ceil(n_races / per_tournament)
+    per_batch = max(1, batch_races // per_tournament)
+    batches = [min(per_batch, n_tournaments - start) for start in range(0, n_tournaments, per_batch)]
+
+    store.register(season, names)
+    played = store.played(season)
+    first_race, first_tournament = store.next_ids()
+    print(f"{n_tournaments} tournaments of {per_tournament} races ({' + '.join(map(str, rounds))} "
+          f"heats per round), {len(batches)} batches")
+
+    start = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        firsts = played + np.cumsum([0] + batches[:-1])
+        jobs = [pool.submit(run_batch, int(first), size, len(names), laps, final_laps, seed)
+                for first, size in zip(firsts, batches)]
+        # Appended in batch order, so race ids follow the schedule
+        for size, job in zip(batches, jobs):
+            _, races, results = job.result()
+            store.append(season, races, results, first_race, first_tournament)
+            first_race += len(races)
+            first_tournament += size
+            done += len(races)
+            print(f"\r  {done} races stored", end="", flush=True)
+    elapsed = time.perf_counter() - start
+    print(f" in {elapsed:.1f} s ({done / elapsed:,.0f} races/s)")
+
+
+def print_standings(store, season, limit):
+    print(f"\nSeason {season!r}")
+    print(f"{'':>3} {'Racer':<12} {'Starts':>7} {'Wins':>6} {'Podiums':>8} {'Finals':>7} "
+          f"{'Titles':>7} {'Avg place':>9}")
+    for i, (name, starts, wins, podiums, finals, titles, avg) in enumerate(
+            store.standings(season, limit), 1):
+        print(f"{i:>3} {name:<12} {starts:>7} {wins:>6} {podiums:>8} {finals:>7} {titles:>7} {avg:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Race a season of tournaments without a display")
+    parser.add_argument("--season", default="1", help="Season name; running it again adds races")
+    parser.add_argument("--races", type=int, default=100_000)
+    parser.add_argument("--racers", type=int, default=36,
+                        help="Roster size: the six named racers plus generated ones")
+    parser.add_argument("--field", metavar="PATH", help="Take the roster from a race_field config")
+    parser.add_argument("--laps", type=int, default=3, help="Laps in a heat")
+    parser.add_argument("--final-laps", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch", type=int, default=5000, help="Races per job")
+    parser.add_argument("--db", default="race_season.sqlite")
+    parser.add_argument("--standings", type=int, default=10, metavar="N",
+                        help="Print the top N racers")
+    parser.add_argument("--report", action="store_true", help="Only print the standings")
+    args = parser.parse_args()
+
+    if args.field:
+        roster = load_config(args.field)["racers"]
+    else:
+        roster = RACER_CONFIG + generate_racers(max(0, args.racers - len(RACER_CONFIG)),
+                                                first=len(RACER_CONFIG) + 1)
+    store = SeasonStore(args.db)
+    if not args.report:
+        run_season(store, args.season, [r["name"] for r in roster], args.races, args.laps,
+                   args.final_laps, args.seed, args.workers, args.batch)
+
+    start = time.perf_counter()
+    print_standings(store, args.season, args.standings)
+    print(f"\nStandings query: {1000 * (time.perf_counter() - start):.1f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
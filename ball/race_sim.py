@@ -0,0 +1,135 @@
+import argparse
+import time
+
+import numpy as np
+
+from racing_balls import ACCEL_MAX, ACCEL_MIN, FPS, MAX_SPEED, MIN_SPEED, RACER_CONFIG
+
+# Vectorized Monte Carlo for racing_balls.py.
+#
+# Racer.update is a clamped random walk on speed, and a lap is 360 degrees
+# of travel whatever the lane, so every racer's finish frame is independent
+# and identically distributed. The engine therefore simulates racers rather
+# than races: one pass records the frame each lap is completed, which covers
+# every lap count up to max_laps at once. Races are built by drawing
+# n_racers finish frames each, and win probabilities are computed exactly
+# from the finish-frame distribution. Ties go to the lower lane, as in
+# main(), where racers are updated in lane order.
+
+LAP = 360.0
+
+
+def lap_frames(n, max_laps, seed=None, chunk=100_000):
+    # Frame on which each of n racers completes each lap: int array (n, max_laps)
+    rng = np.random.default_rng(seed)
+    out = np.empty((n, max_laps), dtype=np.int32)
+    for start in range(0, n, chunk):
+        m = min(chunk, n - start)
+        block = out[start:start + m]
+        speed = np.zeros(m, dtype=np.float32)
+        distance = np.zeros(m, dtype=np.float32)
+        next_lap = np.full(m, LAP, dtype=np.float32)
+        laps = np.zeros(m, dtype=np.int64)
+        accel = np.empty(m, dtype=np.float32)
+
+        frame = 0
+        remaining = m
+        while remaining:
+            frame += 1
+            rng.random(out=accel, dtype=np.float32)
+            accel *= ACCEL_MAX - ACCEL_MIN
+            accel += ACCEL_MIN
+            speed += accel
+            np.clip(speed, MIN_SPEED, MAX_SPEED, out=speed)
+            distance += speed
+
+            # At most 2.5 degrees a frame, so at most one lap per frame
+            crossed = np.flatnonzero(distance >= next_lap)
+            if len(crossed):
+                lap = laps[crossed]
+                keep = lap < max_laps
+                block[crossed[keep], lap[keep]] = frame
+                laps[crossed] += 1
+                next_lap[crossed] += LAP
+                remaining -= np.count_nonzero(lap == max_laps - 1)
+    return out
+
+
+def exact_win_probabilities(finish, n_racers):
+    # finish: sample of single-racer finish frames. With P(T = t) = p(t) and
+    # S(t) = P(T > t), lane i wins at frame t if every lower lane finishes
+    # later and every higher lane no earlier:
+    #   P(lane i wins) = sum_t p(t) S(t)^i S(t - 1)^(n - 1 - i)
+    counts = np.bincount(finish - finish.min())
+    p = counts / counts.sum()
+    after = np.clip(1.0 - np.cumsum(p), 0.0, 1.0)
+    at_or_after = np.concatenate(([1.0], after[:-1]))
+    return np.array([(p * after**i * at_or_after**(n_racers - 1 - i)).sum()
+                     for i in range(n_racers)])
+
+
+def finish_stats(finish):
+    seconds = finish / FPS
+    p10, p50, p90 = np.percentile(seconds, [10, 50, 90])
+    return {"mean": float(seconds.mean()), "std": float(seconds.std()),
+            "min": float(seconds.min()), "p10": float(p10), "p50": float(p50),
+            "p90": float(p90), "max": float(seconds.max())}
+
+
+def simulate_races(n_races, n_racers=len(RACER_CONFIG), total_laps=3, seed=None, pool=200_000):
+    # Finish frames (n_races, n_racers). Racers are i.i.d., so a pool of
+    # simulated racers is enough: each race draws its racers from the pool.
+    # Pass pool >= n_races * n_racers for fully independent races.
+    rng = np.random.default_rng(seed)
+    size = min(pool, n_races * n_racers)
+    finish = lap_frames(size, total_laps, rng.integers(2**32))[:, -1]
+    if size == n_races * n_racers:
+        return finish.reshape(n_races, n_racers)
+    return rng.choice(finish, size=(n_races, n_racers))
+
+
+def race_winners(finish):
+    # argmin returns the first minimum, i.e. the lowest lane on a tie
+    return np.argmin(finish, axis=1)
+
+
+def race_odds(total_laps, n_racers=len(RACER_CONFIG), samples=20_000, seed=0):
+    # Win probability of every lane plus the finish-time distribution, fast
+    # enough to call when the player changes the lap count
+    finish = lap_frames(samples, total_laps, seed)[:, -1]
+    return {"win": exact_win_probabilities(finish, n_racers), "finish": finish_stats(finish)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo odds for Ultimate Python Racing")
+    parser.add_argument("--races", type=int, default=1_000_000)
+    parser.add_argument("--laps", type=int, default=3)
+    parser.add_argument("--pool", type=int, default=200_000, help="Simulated racers to draw races from")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n_racers = len(RACER_CONFIG)
+    start = time.perf_counter()
+    finish = simulate_races(args.races, n_racers, args.laps, args.seed, args.pool)
+    winners = race_winners(finish)
+    elapsed = time.perf_counter() - start
+
+    simulated = np.bincount(winners, minlength=n_racers) / args.races
+    exact = exact_win_probabilities(finish.ravel(), n_racers)
+    stats = finish_stats(finish.ravel())
+
+    print(f"{args.races} races of {args.laps} laps in {elapsed:.2f} s\n")
+    print(f"{'Lane':>4} {'Racer':<8} | {'Simulated':>9} {'Exact':>7} {'Odds':>6}")
+    for i, config in enumerate(RACER_CONFIG):
+        print(f"{i:>4} {config['name']:<8} | {simulated[i]:>9.2%} {exact[i]:>7.2%} "
+              f"{1 / exact[i]:>5.2f}x")
+
+    print(f"\nFinish time: {stats['mean']:.2f} s +/- {stats['std']:.2f} "
+          f"(p10 {stats['p10']:.2f}, p50 {stats['p50']:.2f}, p90 {stats['p90']:.2f}, "
+          f"range {stats['min']:.2f}-{stats['max']:.2f})")
+    winning = finish.min(axis=1) / FPS
+    print(f"Winning time: {winning.mean():.2f} s +/- {winning.std():.2f}")
+
+
+if __name__ == "__main__":
+    main()
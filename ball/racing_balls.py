@@ -1,8 +1,12 @@
+import argparse
 import pygame
 import math
 import random
 import sys
 
+from engine import Engine, Simulation, lerp
+from text_cache import text_cache
+
 # --- Constants & Configuration ---
 WIDTH, HEIGHT = 1000, 700
 FPS = 60
@@ -11,6 +15,18 @@ TRACK_RADIUS_X = 400
 TRACK_RADIUS_Y = 280
 LANE_WIDTH = 30
 
+# Racer physics (per frame)
+ACCEL_MIN = -0.05
+ACCEL_MAX = 0.08
+MIN_SPEED = 0.5
+MAX_SPEED = 2.5
+
+# Race settings and betting
+MIN_LAPS = 1
+MAX_LAPS = 20
+STARTING_BANKROLL = 100
+STAKE = 10
+
 # Colors
 GRASS_COLOR = (30, 160, 30)
 TRACK_COLOR = (60, 60, 60)       # Dark Asphalt
@@ -41,7 +57,7 @@ class Button:
         self.font = pygame.font.SysFont("Arial", 20, bold=True)
         self.clicked = False
 
-    def draw(self, screen):
+    def draw(self, screen, cached=True):
         # Check hover for visual effect
         mouse_pos = pygame.mouse.get_pos()
         draw_color = self.base_color
@@ -56,7 +72,10 @@ class Button:
         pygame.draw.rect(screen, draw_color, self.rect, border_radius=8)
         pygame.draw.rect(screen, WHITE, self.rect, 2, border_radius=8) # Border
 
-        text_surf = self.font.render(self.text, True, self.text_color)
+        if cached:
+            text_surf = text_cache.render(self.font, self.text, self.text_color)
+        else:
+            text_surf = self.font.render(self.text, True, self.text_color)
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
 
@@ -89,9 +108,9 @@ class Racer:
             return
 
         # Physics: Acceleration and max speed
-        acceleration = random.uniform(-0.05, 0.08)
+        acceleration = random.uniform(ACCEL_MIN, ACCEL_MAX)
         self.speed += acceleration
-        self.speed = max(0.5, min(self.speed, 2.5)) # Speed limits
+        self.speed = max(MIN_SPEED, min(self.speed, MAX_SPEED)) # Speed limits
         
         self.angle += self.speed
 
@@ -103,12 +122,17 @@ class Racer:
             if self.laps_completed >= self.total_laps:
                 self.finished = True
 
-    def draw(self, screen):
-        rad = math.radians(self.angle)
+    def position(self, angle=None):
+        # angle: where to place the racer, if not at its own angle (interpolated)
+        rad = math.radians(self.angle if angle is None else angle)
         
         # Ellipse parametric equation
         x = TRACK_CENTER[0] + self.radius_x * math.cos(rad)
         y = TRACK_CENTER[1] + self.radius_y * math.sin(rad)
+        return x, y
+
+    def draw(self, screen):
+        x, y = self.position()
         
         # Draw Ball
         pygame.draw.circle(screen, self.color, (int(x), int(y)), 12)
@@ -154,155 +178,191 @@ def draw_track_background(screen):
             color = WHITE if (y // check_size) % 2 == i else BLACK
             pygame.draw.rect(screen, color, (TRACK_CENTER[0] + x_off, y, check_size, check_size))
 
-def main():
+class Race(Simulation):
+    # One race, one tick per step(). The winner is the first racer home,
+    # the lowest lane on a tie.
+    def __init__(self, laps, configs=RACER_CONFIG):
+        self.laps = laps
+        self.racers = [Racer(data, i, laps) for i, data in enumerate(configs)]
+        self.winner = None # Lane of the winner
+        self.finished_count = 0
+        self.leader_laps = 0
+
+    @property
+    def done(self):
+        return self.finished_count == len(self.racers)
+
+    def step(self):
+        finished_count = 0
+        for lane, r in enumerate(self.racers):
+            r.update()
+            if r.finished:
+                finished_count += 1
+                if self.winner is None:
+                    self.winner = lane
+
+            # Track the leader's lap for UI
+            if r.laps_completed > self.leader_laps:
+                self.leader_laps = r.laps_completed
+        self.finished_count = finished_count
+
+    def render_state(self):
+        return [r.angle for r in self.racers]
+
+    def angles(self, previous, alpha):
+        # Each racer's angle alpha of a tick on from previous
+        angles = []
+        for prev, r in zip(previous, self.racers):
+            if prev > r.angle: # Crossed the line and wrapped
+                prev -= 360
+            angles.append(lerp(prev, r.angle, alpha))
+        return angles
+
+class RaceGame(Simulation):
+    # The betting, racing and results screens. Only the race itself moves
+    # with the ticks; everything else reacts to events.
+    def __init__(self, screen, legacy_render=False):
+        from race_betting import Bettor, OddsTable
+        from race_render import RaceRenderer
+
+        # Fonts
+        title_font = pygame.font.SysFont("Impact", 50)
+        msg_font = pygame.font.SysFont("Arial", 30, bold=True)
+        lap_font = pygame.font.SysFont("Arial", 40, bold=True)
+        odds_font = pygame.font.SysFont("Arial", 18, bold=True)
+        self.renderer = RaceRenderer(screen, (title_font, msg_font, lap_font, odds_font), legacy_render)
+
+        # --- Setup UI Elements ---
+
+        # Racer Buttons
+        self.racer_buttons = []
+        btn_w, btn_h = 100, 50
+        start_x = (WIDTH - (len(RACER_CONFIG) * (btn_w + 10))) // 2
+        for i, data in enumerate(RACER_CONFIG):
+            btn = Button(start_x + i * (btn_w + 10), HEIGHT - 100, btn_w, btn_h, data["color"], data["name"])
+            self.racer_buttons.append(btn)
+
+        # Lap Control Buttons
+        self.btn_minus = Button(WIDTH//2 - 100, HEIGHT//2 + 20, 50, 50, BUTTON_COLOR, "-", WHITE)
+        self.btn_plus = Button(WIDTH//2 + 50, HEIGHT//2 + 20, 50, 50, BUTTON_COLOR, "+", WHITE)
+
+        # Game Loop Variables
+        self.state = "BETTING"
+        self.user_bet = None
+        self.race = None
+
+        # Default Laps
+        self.current_laps_setting = 3
+
+        # Odds for every lap count, simulated once on a background thread
+        self.odds_table = OddsTable().build_in_background()
+        self.player = Bettor("You", STARTING_BANKROLL)
+        self.book = None
+        self.payout = 0
+
+    def handle_event(self, event):
+        from race_betting import FixedOddsBook
+
+        if self.state == "BETTING":
+            # Handle Lap Changer
+            if self.btn_minus.is_clicked(event):
+                if self.current_laps_setting > MIN_LAPS:
+                    self.current_laps_setting -= 1
+            if self.btn_plus.is_clicked(event):
+                if self.current_laps_setting < MAX_LAPS:
+                    self.current_laps_setting += 1
+
+            # Handle Racer Selection (once the odds are in)
+            for lane, btn in enumerate(self.racer_buttons):
+                if btn.is_clicked(event) and self.odds_table.ready:
+                    self.user_bet = btn.text
+                    self.book = FixedOddsBook(self.odds_table, self.current_laps_setting)
+                    self.book.place(self.player, lane, min(STAKE, self.player.bankroll))
+                    # Start Race with selected laps
+                    self.race = Race(self.current_laps_setting)
+                    self.state = "RACING"
+                    return True
+
+        elif self.state == "GAMEOVER":
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                self.state = "BETTING"
+                self.user_bet = None
+                if self.player.bankroll <= 0:
+                    self.player.bankroll = STARTING_BANKROLL
+        return False
+
+    def step(self):
+        if self.state != "RACING":
+            return
+        race = self.race
+        had_winner = race.winner is not None
+        race.step()
+        if not had_winner and race.winner is not None:
+            self.payout = self.book.settle(race.winner).get(self.player.name, 0)
+        if race.done:
+            self.state = "GAMEOVER"
+
+    def render_state(self):
+        return self.race.render_state() if self.state == "RACING" else None
+
+    def render(self, screen, previous, alpha):
+        renderer = self.renderer
+        if self.state == "BETTING":
+            # Decimal odds of each racer winning
+            odds_labels = []
+            for lane in range(len(self.racer_buttons)):
+                chance = self.odds_table.win_probability(lane, self.current_laps_setting)
+                odds_labels.append("..." if chance is None else f"{1 / chance:.2f}x")
+            stake = min(STAKE, self.player.bankroll)
+            bank_label = f"Bankroll: {self.player.bankroll:.0f}  Stake: {stake:.0f}"
+            return renderer.draw_betting(self.racer_buttons, (self.btn_minus, self.btn_plus),
+                                         self.current_laps_setting, odds_labels, bank_label)
+
+        race = self.race
+        if self.state == "RACING":
+            angles = None
+            if previous is not None:
+                angles = race.angles(previous, alpha)
+            # Show Lap Progress (capped at max laps)
+            display_lap = min(race.leader_laps + 1, race.laps)
+            return renderer.draw_race(race.racers, f"Bet: {self.user_bet}",
+                                      f"Lap: {display_lap} / {race.laps}", angles=angles)
+
+        winner = race.racers[race.winner].name
+        if self.user_bet == winner:
+            res_color = (0, 255, 0)
+            res_msg = f"YOU WON {self.payout:.0f}!"
+        else:
+            res_color = (255, 50, 50)
+            res_msg = "YOU LOST..."
+        return renderer.draw_results(race.racers, winner, res_msg, res_color)
+
+def main(legacy_render=False, max_fps=FPS, render_skip=False, profile_path=None):
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Ultimate Python Racing")
-    clock = pygame.time.Clock()
-    
-    # Fonts
-    title_font = pygame.font.SysFont("Impact", 50)
-    msg_font = pygame.font.SysFont("Arial", 30, bold=True)
-    lap_font = pygame.font.SysFont("Arial", 40, bold=True)
-
-    # --- Setup UI Elements ---
-    
-    # Racer Buttons
-    racer_buttons = []
-    btn_w, btn_h = 100, 50
-    start_x = (WIDTH - (len(RACER_CONFIG) * (btn_w + 10))) // 2
-    for i, data in enumerate(RACER_CONFIG):
-        btn = Button(start_x + i * (btn_w + 10), HEIGHT - 100, btn_w, btn_h, data["color"], data["name"])
-        racer_buttons.append(btn)
-
-    # Lap Control Buttons
-    btn_minus = Button(WIDTH//2 - 100, HEIGHT//2 + 20, 50, 50, BUTTON_COLOR, "-", WHITE)
-    btn_plus = Button(WIDTH//2 + 50, HEIGHT//2 + 20, 50, 50, BUTTON_COLOR, "+", WHITE)
-
-    # Game Loop Variables
-    state = "BETTING"
-    user_bet = None
-    winner = None
-    racers = []
-    
-    # Default Laps
-    current_laps_setting = 3 
-
-    running = True
-    while running:
-        # Event Handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            
-            if state == "BETTING":
-                # Handle Lap Changer
-                if btn_minus.is_clicked(event):
-                    if current_laps_setting > 1:
-                        current_laps_setting -= 1
-                if btn_plus.is_clicked(event):
-                    if current_laps_setting < 20: # Max 20 laps
-                        current_laps_setting += 1
-
-                # Handle Racer Selection
-                for btn in racer_buttons:
-                    if btn.is_clicked(event):
-                        user_bet = btn.text
-                        # Start Race with selected laps
-                        racers = [Racer(data, i, current_laps_setting) for i, data in enumerate(RACER_CONFIG)]
-                        state = "RACING"
-            
-            if state == "GAMEOVER":
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    state = "BETTING"
-                    user_bet = None
-                    winner = None
-
-        # --- Drawing ---
-        draw_track_background(screen)
-
-        if state == "BETTING":
-            # Semi-transparent overlay
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            screen.blit(overlay, (0, 0))
-
-            # Title
-            title = title_font.render("RACE SETTINGS", True, WHITE)
-            screen.blit(title, title.get_rect(center=(WIDTH//2, HEIGHT//2 - 120)))
-
-            # Lap Counter UI
-            lap_text = lap_font.render(f"LAPS: {current_laps_setting}", True, WHITE)
-            screen.blit(lap_text, lap_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 45)))
-            
-            btn_minus.draw(screen)
-            btn_plus.draw(screen)
-
-            # "Choose your racer" text
-            sub = msg_font.render("Choose a racer to start:", True, (200, 200, 200))
-            screen.blit(sub, sub.get_rect(center=(WIDTH//2, HEIGHT - 160)))
-
-            # Racer Buttons
-            for btn in racer_buttons:
-                btn.draw(screen)
-
-        elif state == "RACING":
-            finished_count = 0
-            leader_laps = 0
-            
-            for r in racers:
-                r.update()
-                r.draw(screen)
-                if r.finished:
-                    finished_count += 1
-                    if winner is None:
-                        winner = r.name
-                
-                # Track the leader's lap for UI
-                if r.laps_completed > leader_laps:
-                    leader_laps = r.laps_completed
-
-            # HUD (Heads Up Display)
-            bet_text = msg_font.render(f"Bet: {user_bet}", True, WHITE)
-            screen.blit(bet_text, (20, 20))
-            
-            # Show Lap Progress (capped at max laps)
-            display_lap = min(leader_laps + 1, current_laps_setting)
-            lap_info = msg_font.render(f"Lap: {display_lap} / {current_laps_setting}", True, WHITE)
-            screen.blit(lap_info, (WIDTH - 200, 20))
-
-            if finished_count == len(racers):
-                state = "GAMEOVER"
-
-        elif state == "GAMEOVER":
-            for r in racers:
-                r.draw(screen)
-
-            # Results Box
-            panel_rect = pygame.Rect(WIDTH//2 - 200, HEIGHT//2 - 100, 400, 200)
-            pygame.draw.rect(screen, BLACK, panel_rect, border_radius=15)
-            pygame.draw.rect(screen, WHITE, panel_rect, 4, border_radius=15)
-
-            if user_bet == winner:
-                res_color = (0, 255, 0)
-                res_msg = "YOU WON!"
-            else:
-                res_color = (255, 50, 50)
-                res_msg = "YOU LOST..."
-
-            win_text = title_font.render(f"Winner: {winner}", True, WHITE)
-            res_text = title_font.render(res_msg, True, res_color)
-            retry_text = msg_font.render("Click to Race Again", True, (200, 200, 200))
-
-            screen.blit(win_text, win_text.get_rect(center=(WIDTH//2, HEIGHT//2 - 40)))
-            screen.blit(res_text, res_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 20)))
-            screen.blit(retry_text, retry_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 70)))
 
-        pygame.display.flip()
-        clock.tick(FPS)
+    # Racers move FPS ticks per second whatever the frame rate
+    game = RaceGame(screen, legacy_render)
+    Engine(game, FPS, max_fps, render_skip, profile_path=profile_path).run(screen)
 
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ultimate Python Racing")
+    parser.add_argument("--legacy-render", action="store_true",
+                        help="Redraw the whole track every frame, for comparison")
+    parser.add_argument("--fps", type=int, default=FPS, help="Frame rate cap (0 for none)")
+    parser.add_argument("--render-skip", action="store_true",
+                        help="Skip drawing frames while the physics is behind")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Record frame phase timings to PATH (.csv, or .json for a Chrome trace)")
+    parser.add_argument("--field", metavar="PATH",
+                        help="Watch a large field of racers loaded from a JSON config (see race_field.json)")
+    args = parser.parse_args()
+    if args.field:
+        from race_field import load_field, run_field
+        run_field(load_field(args.field))
+    else:
+        main(args.legacy_render, args.fps, args.render_skip, args.profile)
\ No newline at end of file
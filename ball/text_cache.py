@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+# Shared cache of rendered text surfaces for the pygame games in ball/.
+#
+# Surfaces are keyed by (font, text, colour, antialias) and kept in
+# least-recently-used order, so labels drawn every frame stay cached while
+# one-off strings (a changing FPS readout, old HP values) are evicted first
+# once the cache is full. Font objects are keyed by identity: keep creating
+# fonts once, outside the frame loop.
+
+
+class TextCache:
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surf
+
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surf
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return (f"text cache: {self.hit_rate:.1%} hits ({self.hits} hits, {self.misses} misses, "
+                f"{self.evictions} evictions, {len(self.surfaces)}/{self.max_size} entries)")
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+text_cache = TextCache()
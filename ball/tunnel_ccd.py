@@ -0,0 +1,116 @@
+import math
+
+import numpy as np
+
+# Continuous collision between the ball and a shrinking, rotating ring.
+#
+# Within a substep the ball moves in a straight line, p(t) = p + v t, and the
+# ring's inner contact radius shrinks linearly, c(t) = c0 - s t, where
+# c0 = ring radius - (ring thickness / 2 + ball radius). Contact is the first
+# t with |p(t)| = c(t), i.e. the first root of
+#
+#   f(t) = (v.v - s^2) t^2 + 2 (p.v + c0 s) t + (p.p - c0^2)
+#
+# crossing from below. Positions are relative to the tunnel centre.
+#
+# time_of_impact works on one ball for TunnelGame; times_of_impact is the
+# same solve over arrays of balls for tunnel_sim.
+
+TWO_PI = 2 * math.pi
+
+
+def _roots(a, b, c):
+    if abs(a) < 1e-12:
+        if abs(b) < 1e-12:
+            return ()
+        return (-c / b,)
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return ()
+    # Numerically stable form: avoids cancellation when b^2 >> 4ac
+    q = -0.5 * (b + math.copysign(math.sqrt(disc), b))
+    r1 = q / a
+    r2 = c / q if q != 0 else r1
+    return (min(r1, r2), max(r1, r2))
+
+
+def time_of_impact(px, py, vx, vy, radius, shrink, reach, t_max):
+    # Earliest t in [0, t_max] at which the ball touches the ring, or None
+    c0 = radius - reach
+    if c0 <= 0:
+        return 0.0
+
+    a = vx * vx + vy * vy - shrink * shrink
+    b = 2 * (px * vx + py * vy + c0 * shrink)
+    c = px * px + py * py - c0 * c0
+
+    if c >= 0 and px * vx + py * vy + shrink * math.sqrt(px * px + py * py) >= 0:
+        # Already touching and not moving inward faster than the ring
+        return 0.0
+
+    for t in _roots(a, b, c):
+        if t < 0 or t > t_max:
+            continue
+        # f must be rising through zero, not falling back inside
+        if 2 * a * t + b < 0:
+            continue
+        # The squared equation also admits |p(t)| = -c(t) once the ring has
+        # collapsed past the ball; clamp to the moment it closes on the ball
+        if shrink > 0 and t > c0 / shrink:
+            return c0 / shrink
+        return t
+
+    if shrink > 0 and c0 / shrink <= t_max and c < 0:
+        return c0 / shrink
+    return None
+
+
+def times_of_impact(px, py, vx, vy, radius, shrink, reach, t_max):
+    # Array version of time_of_impact, with np.inf where there is no contact
+    c0 = radius - reach
+    a = vx * vx + vy * vy - shrink * shrink
+    b = 2 * (px * vx + py * vy + c0 * shrink)
+    c = px * px + py * py - c0 * c0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        disc = b * b - 4 * a * c
+        q = -0.5 * (b + np.copysign(np.sqrt(np.maximum(disc, 0)), b))
+        linear = np.abs(a) < 1e-12
+        r1 = np.where(linear, -c / b, q / a)
+        r2 = np.where(linear, r1, c / q)
+        collapse = np.where(shrink > 0, c0 / shrink, np.inf)
+
+    result = np.full(np.shape(c), np.inf)
+    real = linear | (disc >= 0)
+    for t in (np.minimum(r1, r2), np.maximum(r1, r2)):
+        ok = real & np.isinf(result) & (t >= 0) & (t <= t_max) & (2 * a * t + b >= 0)
+        result = np.where(ok, t, result)
+
+    result = np.where(np.isfinite(result) & (result > collapse), collapse, result)
+    result = np.where(np.isinf(result) & (c < 0) & (collapse <= t_max), collapse, result)
+    touching = (c >= 0) & (px * vx + py * vy + shrink * np.sqrt(px * px + py * py) >= 0)
+    return np.where(touching | (c0 <= 0), 0.0, result)
+
+
+def angle_diff(a, b):
+    # Smallest absolute difference between two angles, in [0, pi]
+    d = (a - b) % TWO_PI
+    return TWO_PI - d if d > math.pi else d
+
+
+def ball_angle(px, py):
+    # Angle of the ball around the centre, measured the way pygame.draw.arc
+    # measures ring angles (counter-clockwise, y axis pointing up)
+    return math.atan2(-py, px) % TWO_PI
+
+
+def reflect(vx, vy, nx, ny, bounce, distortion):
+    # Mirror the velocity in the ring normal (nx, ny), scale by bounciness and
+    # rotate by the distortion angle
+    dot = vx * nx + vy * ny
+    rx = (vx - 2 * dot * nx) * bounce
+    ry = (vy - 2 * dot * ny) * bounce
+
+    cos_a = math.cos(distortion)
+    sin_a = math.sin(distortion)
+    return rx * cos_a - ry * sin_a, rx * sin_a + ry * cos_a
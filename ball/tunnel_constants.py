@@ -0,0 +1,38 @@
+# Rules and sizes of Tunnel Escape, shared by the game (ball.py) and the
+# headless simulator (tunnel_sim.py, tunnel_sweep.py). Nothing here needs
+# pygame, so the simulator runs without it.
+
+import math
+
+WIDTH, HEIGHT = 900, 600
+CENTER = (WIDTH // 2, HEIGHT // 2)
+FPS = 60
+GAME_DURATION = 60
+SPAWN_DISTANCE = 25
+MAX_RADIUS = 500
+BATCH_SIZE = 10
+START_RADIUS = 200
+POP_RADIUS = 11      # Rings smaller than this are retired
+GAP_WIDTH = 1.2      # Radians
+RING_THICKNESS = 4
+BALL_RADIUS = 8
+MAX_BALL_SPEED = 40      # px/frame in every mode; bounciness > 1 would otherwise grow the speed without bound
+MAX_CONTACTS = 16        # Ring contacts resolved per frame of a step
+MAX_DT = 4               # Frames per step; near a ring the sweep still goes a frame at a time
+
+# Batch states
+CRUISE = 0
+SURGE = 1
+
+
+def max_rings(max_radius=MAX_RADIUS):
+    # Rings alive at once. They stay SPAWN_DISTANCE apart between POP_RADIUS
+    # and max_radius, plus one just spawned and one shrunk past POP_RADIUS
+    # but not yet retired within the same step.
+    return math.ceil((max_radius - POP_RADIUS) / SPAWN_DISTANCE) + 2
+
+
+def batch_slots(max_radius=MAX_RADIUS):
+    # Batches alive at once: max_rings consecutive rings span at most this
+    # many runs of BATCH_SIZE
+    return (max_rings(max_radius) - 2) // BATCH_SIZE + 2
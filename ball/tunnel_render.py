@@ -0,0 +1,288 @@
+import math
+import time
+from collections import deque
+
+import pygame
+
+from profiler import profiler
+from text_cache import text_cache
+
+# Cached rendering for Tunnel Escape.
+#
+# A ring is drawn as a cached annulus sprite for its (rounded) radius, then
+# the gap is cut out with a small wedge in the background colour. The sprites
+# are colour-keyed with RLE acceleration, so blitting one only touches the
+# ring's own pixels and SDL keeps just the run-length data in memory.
+# Rotating sprites was measured slower than pygame.draw.arc, so the gap
+# wedge is the only per-frame rasterization left.
+#
+# Instead of clearing the whole screen, last frame's rings, ball and panels
+# are painted over with the background and drawn again, and only what
+# changed is pushed to the display: the ball's old and new bounds, the gap
+# wedges that moved, any panel whose content or position changed, and the
+# square of the largest ring whose sprite changed. The rings are concentric,
+# so that square holds every smaller changed ring. While the tunnel shrinks,
+# the outer ring changes size every few frames and its square covers nearly
+# all of a 900x600 screen. With the spin on but shrinking off, the moving
+# gaps come to about half the screen. With both off, only the ball's bounds
+# are pushed.
+
+
+class FrameTimer:
+    def __init__(self, window=120):
+        self.render_times = deque(maxlen=window)
+        self.frame_times = deque(maxlen=window)
+        self.last_frame = None
+        self.start_time = 0
+
+    def start(self):
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.frame_times.append(now - self.last_frame)
+        self.last_frame = now
+        self.start_time = now
+
+    def stop(self):
+        self.render_times.append(time.perf_counter() - self.start_time)
+
+    @property
+    def fps(self):
+        if not self.frame_times:
+            return 0.0
+        return len(self.frame_times) / sum(self.frame_times)
+
+    @property
+    def render_ms(self):
+        if not self.render_times:
+            return 0.0
+        return 1000 * sum(self.render_times) / len(self.render_times)
+
+
+class RingSpriteCache:
+    def __init__(self, color, thickness, background):
+        self.color = color
+        self.thickness = thickness
+        self.background = background
+        self.sprites = {}
+        self.erasers = {}
+        self.wedges = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _build(self, key, color, colorkey):
+        size = 2 * key + 2
+        surf = pygame.Surface((size, size)).convert()
+        surf.fill(colorkey)
+        pygame.draw.circle(surf, color, (key + 1, key + 1), key, self.thickness)
+        surf.set_colorkey(colorkey, pygame.RLEACCEL)
+        return surf
+
+    def sprite(self, radius):
+        key = int(round(radius))
+        surf = self.sprites.get(key)
+        if surf is not None:
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        surf = self._build(key, self.color, self.background)
+        self.sprites[key] = surf
+        return surf
+
+    def erase(self, screen, center, key):
+        # Paint the background over a ring drawn last frame at radius `key`
+        surf = self.erasers.get(key)
+        if surf is None:
+            colorkey = (255, 0, 255) if self.background != (255, 0, 255) else (0, 255, 0)
+            surf = self._build(key, self.background, colorkey)
+            self.erasers[key] = surf
+        screen.blit(surf, (center[0] - key - 1, center[1] - key - 1))
+
+    def wedge(self, gap_width):
+        # Unit-circle outline of a gap centred on angle 0, reused for every
+        # ring with the same gap width
+        key = round(gap_width, 3)
+        points = self.wedges.get(key)
+        if points is None:
+            steps = 6
+            angles = [gap_width * (i / steps - 0.5) for i in range(steps + 1)]
+            points = [(math.cos(a), math.sin(a)) for a in angles]
+            self.wedges[key] = points
+        return points
+
+    def draw(self, screen, center, radius, angle, gap_width):
+        # Returns the sprite key drawn and the gap wedge's bounds, or None
+        if radius <= 0:
+            return None
+        surf = self.sprite(radius)
+        half = surf.get_width() // 2
+        screen.blit(surf, (center[0] - half, center[1] - half))
+
+        # Cut the gap: a wedge slightly wider than the ring band, rotated to
+        # the ring angle (pygame's y axis points down)
+        key = int(round(radius))
+        outer = key + 2
+        inner = max(0, key - self.thickness - 2)
+        cos_a = math.cos(angle)
+        sin_a = math.sin(angle)
+        template = self.wedge(gap_width)
+        polygon = []
+        for r, points in ((outer, template), (inner, reversed(template))):
+            for x, y in points:
+                rx = x * cos_a - y * sin_a
+                ry = x * sin_a + y * cos_a
+                polygon.append((center[0] + r * rx, center[1] - r * ry))
+        wedge_rect = pygame.draw.polygon(screen, self.background, polygon)
+        return key, wedge_rect
+
+    def bounds(self, center, key):
+        # The square a sprite of radius `key` is blitted to
+        return pygame.Rect(center[0] - key - 1, center[1] - key - 1, 2 * key + 2, 2 * key + 2)
+
+
+class TextLayer:
+    # A text slot with a fixed font and colour, rendered through the shared
+    # text cache
+    def __init__(self, font, color):
+        self.font = font
+        self.color = color
+        self.text = None
+        self.surface = None
+
+    def render(self, text):
+        self.text = text
+        self.surface = text_cache.render(self.font, text, self.color)
+        return self.surface
+
+
+class TunnelRenderer:
+    def __init__(self, screen, fonts, palette, ring_thickness, legacy=False):
+        # palette: dict with "background", "ring", "text", "score" and "stats" colours
+        self.screen = screen
+        self.font, self.ui_font, self.large_font = fonts
+        self.palette = palette
+        self.background = palette["background"]
+        self.legacy = legacy
+        self.rings = RingSpriteCache(palette["ring"], ring_thickness, self.background)
+        self.timer = FrameTimer()
+
+        self.center = screen.get_rect().center
+
+        self.timer_text = TextLayer(self.ui_font, palette["text"])
+        self.score_text = TextLayer(self.ui_font, palette["score"])
+        self.stats_text = TextLayer(self.font, palette["stats"])
+        self.overlay = None
+        self.panels = {}
+        self.ring_keys = []
+        self.wedges = {}
+        self.ball_rect = None
+        self.full_redraw = True
+
+    def _panel(self, name, rect, version, dirty):
+        # Panels are redrawn from cached surfaces every frame, but only pushed
+        # to the display when their content or position changes
+        previous = self.panels.get(name)
+        self.panels[name] = (rect, version)
+        if previous == (rect, version):
+            return
+        if previous is not None:
+            dirty.append(previous[0])
+        dirty.append(rect)
+
+    def draw(self, game, sliders, game_over, message, sub_message, world_center, ball_shift=(0, 0)):
+        # ball_shift: offset of the drawn ball from where it is (interpolation)
+        self.timer.start()
+        screen = self.screen
+        center = self.center
+        cx, cy = center
+        full = self.legacy or self.full_redraw
+
+        # --- Erase last frame ---
+        if full:
+            screen.fill(self.background)
+        else:
+            for key in self.ring_keys:
+                self.rings.erase(screen, center, key)
+            if self.ball_rect is not None:
+                screen.fill(self.background, self.ball_rect)
+            for rect, _ in self.panels.values():
+                screen.fill(self.background, rect)
+
+        # --- Play area ---
+        old_keys = self.ring_keys
+        old_wedges = self.wedges
+        self.ring_keys = []
+        self.wedges = {}
+        with profiler.phase("draw.rings"):
+            for ring in reversed(game.rings):
+                if self.legacy:
+                    # Uncached path, kept for comparing frame times
+                    ring.draw(screen, center)
+                    continue
+                drawn = self.rings.draw(screen, center, ring.radius, ring.angle, ring.gap_width)
+                if drawn is not None:
+                    key, wedge_rect = drawn
+                    self.ring_keys.append(key)
+                    self.wedges[key] = (ring.angle, ring.gap_width, wedge_rect)
+
+        old_ball = self.ball_rect
+        self.ball_rect = game.ball.draw(screen, (cx - world_center[0] + ball_shift[0],
+                                                 cy - world_center[1] + ball_shift[1]))
+
+        moved = [rect for rect in (old_ball, self.ball_rect) if rect is not None]
+        for key in old_wedges.keys() | self.wedges.keys():
+            # One rect over a ring's old and new gap, if the gap moved
+            old, new = old_wedges.get(key), self.wedges.get(key)
+            if old != new:
+                rects = [wedge[2] for wedge in (old, new) if wedge is not None]
+                moved.append(rects[0].unionall(rects[1:]))
+        changed = set(old_keys).symmetric_difference(self.ring_keys)
+        if changed:
+            # Concentric, so the largest changed square covers the others
+            square = self.rings.bounds(center, max(changed)).clip(screen.get_rect())
+            dirty = [square] + [rect for rect in moved if not square.contains(rect)]
+        else:
+            dirty = moved
+
+        # --- Panels ---
+        for s in sliders:
+            s.label(self.font)
+            self._panel(s.name, s.panel_rect(), (s.label_text, s.handle_rect.x), dirty)
+            s.draw(screen, self.font)
+
+        width = screen.get_width()
+        seconds = game.elapsed if game.endless else game.time_left
+        panels = (
+            ("timer", self.timer_text, f"Time: {int(seconds)}", (width - 120, 20)),
+            ("score", self.score_text, f"Score: {game.score}", (width - 120, 50)),
+            ("stats", self.stats_text,
+             f"{self.timer.fps:5.1f} FPS  render {self.timer.render_ms:5.2f} ms  "
+             f"text cache {text_cache.hit_rate:4.0%}",
+             (20, screen.get_height() - 25)),
+        )
+        for name, layer, text, pos in panels:
+            surf = layer.render(text)
+            rect = surf.get_rect(topleft=pos)
+            self._panel(name, rect, text, dirty)
+            screen.blit(surf, rect)
+
+        self.full_redraw = False
+        if game_over:
+            if self.overlay is None or self.overlay.get_size() != screen.get_size():
+                self.overlay = pygame.Surface(screen.get_size())
+                self.overlay.set_alpha(150)
+                self.overlay.fill(self.background)
+            screen.blit(self.overlay, (0, 0))
+            msg_surf = text_cache.render(self.large_font, message, self.palette["score"])
+            sub_surf = text_cache.render(self.ui_font, sub_message, self.palette["text"])
+            restart_surf = text_cache.render(self.ui_font, "Press SPACE to Restart", self.palette["text"])
+            screen.blit(msg_surf, msg_surf.get_rect(center=(cx, cy - 30)))
+            screen.blit(sub_surf, sub_surf.get_rect(center=(cx, cy + 20)))
+            screen.blit(restart_surf, restart_surf.get_rect(center=(cx, cy + 60)))
+            self.full_redraw = True
+
+        if full or game_over:
+            dirty = [screen.get_rect()]
+
+        self.timer.stop()
+        return dirty
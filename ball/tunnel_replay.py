@@ -0,0 +1,156 @@
+import argparse
+import struct
+import time
+
+from ball import FPS, GAME_DURATION, TunnelGame
+
+# --- Replay format ---
+# Header: magic, version, seed, frame count, flags (bit 0: endless mode),
+# then the four slider values (gravity, base spin, shrink speed, bounciness)
+# used on frame 0.
+# Body: one record per slider change: frame, slider index, new value.
+# Values are stored as doubles so playback feeds the game bit-identical inputs.
+MAGIC = b"TNLR"
+VERSION = 4
+HEADER = struct.Struct("<4sHQIB4d")
+ENDLESS = 0x01
+EVENT = struct.Struct("<IBd")
+
+SNAPSHOT_INTERVAL = FPS * 5
+
+
+class Replay:
+    def __init__(self, seed, initial_values, events, frames, endless=False):
+        self.seed = seed
+        self.endless = endless
+        self.initial_values = list(initial_values)
+        self.events = events      # [(frame, slider_index, value), ...] sorted by frame
+        self.frames = frames
+
+    def to_bytes(self):
+        flags = ENDLESS if self.endless else 0
+        parts = [HEADER.pack(MAGIC, VERSION, self.seed, self.frames, flags, *self.initial_values)]
+        parts.extend(EVENT.pack(*event) for event in self.events)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, frames, flags, *initial_values = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a Tunnel Escape replay")
+        if version != VERSION:
+            raise ValueError(f"Unsupported replay version {version}")
+        events = list(EVENT.iter_unpack(data[HEADER.size:]))
+        return cls(seed, initial_values, events, frames, bool(flags & ENDLESS))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    def __init__(self, seed, endless=False):
+        self.seed = seed
+        self.endless = endless
+        self.initial_values = None
+        self.last_values = None
+        self.events = []
+        self.frames = 0
+
+    def record(self, frame, values):
+        # Called once per simulated frame with the slider values fed to step()
+        if self.initial_values is None:
+            self.initial_values = list(values)
+        else:
+            for i, (old, new) in enumerate(zip(self.last_values, values)):
+                if new != old:
+                    self.events.append((frame, i, new))
+        self.last_values = list(values)
+        self.frames = frame + 1
+
+    def replay(self):
+        return Replay(self.seed, self.initial_values or [0.0] * 4, self.events, self.frames,
+                      self.endless)
+
+    def save(self, path):
+        self.replay().save(path)
+
+
+class ReplayPlayer:
+    # Re-simulates a replay with no rendering or frame limiting. A snapshot of
+    # the game is kept every SNAPSHOT_INTERVAL frames, so seeking only has to
+    # re-simulate from the nearest earlier snapshot.
+    def __init__(self, replay, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.replay = replay
+        self.snapshot_interval = snapshot_interval
+        self.game = TunnelGame(replay.seed, replay.endless)
+        self.values = list(replay.initial_values)
+        self.next_event = 0
+        self.snapshots = {0: self._capture()}
+
+    def _capture(self):
+        return self.game.snapshot(), list(self.values), self.next_event
+
+    def _step(self):
+        frame = self.game.frame
+        events = self.replay.events
+        while self.next_event < len(events) and events[self.next_event][0] == frame:
+            _, index, value = events[self.next_event]
+            self.values[index] = value
+            self.next_event += 1
+        self.game.step(*self.values)
+        if self.game.frame % self.snapshot_interval == 0:
+            self.snapshots.setdefault(self.game.frame, self._capture())
+
+    def seek(self, frame):
+        # Leaves self.game in the state after `frame` simulated frames
+        frame = max(0, min(frame, self.replay.frames))
+        if not self.game.frame <= frame < self.game.frame + self.snapshot_interval:
+            start = frame - frame % self.snapshot_interval
+            while start not in self.snapshots:
+                start -= self.snapshot_interval
+            snapshot, values, next_event = self.snapshots[start]
+            self.game.restore(snapshot)
+            self.values = list(values)
+            self.next_event = next_event
+        while self.game.frame < frame:
+            self._step()
+        return self.game
+
+    def run(self):
+        return self.seek(self.replay.frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast-forward playback of a Tunnel Escape replay")
+    parser.add_argument("replay")
+    parser.add_argument("--frame", type=int, action="append", default=[],
+                        help="Report the game state at this frame (repeatable)")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    player = ReplayPlayer(replay)
+    length = "endless" if replay.endless else f"of {GAME_DURATION} s"
+    print(f"Seed {replay.seed}, {replay.frames} frames "
+          f"({replay.frames / FPS:.1f} s {length}), {len(replay.events)} slider changes")
+
+    start = time.perf_counter()
+    game = player.run()
+    elapsed = time.perf_counter() - start
+    print(f"Final score: {game.score} (re-simulated in {elapsed * 1000:.0f} ms)")
+
+    for frame in args.frame:
+        start = time.perf_counter()
+        game = player.seek(frame)
+        elapsed = time.perf_counter() - start
+        print(f"Frame {game.frame}: score {game.score}, ball ({game.ball.x:.1f}, {game.ball.y:.1f}) "
+              f"[{elapsed * 1000:.1f} ms]")
+
+
+if __name__ == "__main__":
+    main()
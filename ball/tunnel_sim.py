@@ -0,0 +1,416 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+from tunnel_ccd import times_of_impact
+from tunnel_constants import (
+    BALL_RADIUS,
+    BATCH_SIZE,
+    CRUISE,
+    FPS,
+    GAME_DURATION,
+    GAP_WIDTH,
+    MAX_BALL_SPEED,
+    MAX_CONTACTS,
+    MAX_DT,
+    MAX_RADIUS,
+    POP_RADIUS,
+    RING_THICKNESS,
+    SPAWN_DISTANCE,
+    START_RADIUS,
+    SURGE,
+    batch_slots,
+    max_rings,
+)
+
+# Headless, vectorized copy of the Tunnel Escape rules in ball.py.
+# Every game is one row; rings live in a circular buffer per row so
+# spawning and retiring a ring is just moving a head/count index.
+# Positions are relative to the tunnel centre.
+#
+# All rings of a game shrink by the same amount each frame, and all rings
+# of a batch turn by the same amount, so rings are stored relative to a
+# per-game shrink total and a per-batch rotation phase. A frame then only
+# touches O(games) values instead of O(games * rings).
+#
+# A step covers dt frames, at most MAX_DT. The ball is swept against the
+# innermost ring with the same continuous collision as TunnelGame.step. Far
+# from the ring a ball flies the whole step in one piece; near it, it goes a
+# frame at a time so a ball resting on the ring still bounces every frame,
+# and passing a ring re-rates the shrink from the next frame on. Mean scores
+# up to MAX_DT agree with dt=1 within sampling noise.
+
+MAX_RINGS = max_rings()       # Ring buffer length per game
+BATCH_SLOTS = batch_slots()   # Enough for the batches MAX_RINGS rings can span
+
+TWO_PI = 2 * math.pi
+
+
+def _init_batches(rng, speed, target, timer, state, bid, phase, rows, batch_ids):
+    slots = batch_ids % BATCH_SLOTS
+    phase[rows, slots] = 0.0
+    speed[rows, slots] = 0.5
+    target[rows, slots] = 0.5
+    timer[rows, slots] = rng.integers(60, 181, size=len(rows))
+    state[rows, slots] = CRUISE
+    bid[rows, slots] = batch_ids
+
+
+def _update_batches(rng, speed, target, timer, state, bid, lo, hi, dt):
+    # Same schedule as BatchManager.update in ball.py, for every live batch of every game
+    active = (bid >= lo[:, None]) & (bid <= hi[:, None])
+    timer -= active * dt
+
+    rows, slots = np.nonzero(active & (timer <= 0))
+    if len(rows):
+        cruising = state[rows, slots] == CRUISE
+        surge = cruising & (rng.random(len(rows)) < 0.4)
+        calm = cruising & ~surge
+        settle = ~cruising
+
+        new_target = np.empty(len(rows))
+        new_timer = np.empty(len(rows), dtype=np.int64)
+
+        new_target[surge] = rng.uniform(2.5, 4.0, surge.sum())
+        new_timer[surge] = rng.integers(90, 121, surge.sum())
+        new_target[calm] = rng.uniform(0.2, 0.6, calm.sum())
+        new_timer[calm] = rng.integers(60, 181, calm.sum())
+        new_target[settle] = rng.uniform(0.2, 0.5, settle.sum())
+        new_timer[settle] = rng.integers(60, 121, settle.sum())
+
+        state[rows, slots] = np.where(surge, SURGE, CRUISE)
+        target[rows, slots] = new_target
+        # A timer that ran out partway through a step keeps the overshoot
+        timer[rows, slots] = new_timer + timer[rows, slots]
+
+    lerp = np.where(target > speed, 0.05, 0.03)
+    if dt != 1:
+        lerp = 1 - (1 - lerp) ** dt
+    speed += (target - speed) * lerp * active
+
+
+def _shrink_distance(inner, shrink_speed, dt):
+    # Same as shrink_distance in ball.py, for every game
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = inner.copy()
+        left = np.zeros(len(r)) + dt
+
+        band = r >= 50
+        t = np.where(shrink_speed > 0, np.minimum(left, (r - 50) / shrink_speed), left)
+        t = np.where(band, t, 0.0)
+        r -= shrink_speed * t
+        left -= t
+
+        band = (left > 0) & (r >= 15)
+        k = shrink_speed * 0.8 / 50
+        t = np.where(k > 0, np.minimum(left, np.log(np.maximum(r, 15) / 15) / k), left)
+        t = np.where(band, t, 0.0)
+        r *= np.exp(-k * t)
+        left -= t
+
+        r -= 0.05 * np.maximum(left, 0)
+    return inner - r
+
+
+def simulate(n_games, gravity=0.15, base_spin=0.06, shrink_speed=1.5, bounciness=1.0,
+             frames=GAME_DURATION * FPS, seed=None, dt=1):
+    # Slider values may be scalars or arrays of length n_games, so one call
+    # can cover several parameter sets. Returns the final score of every game.
+    if dt > MAX_DT:
+        raise ValueError(f"dt must be at most {MAX_DT} frame(s), got {dt}")
+    rng = np.random.default_rng(seed)
+    n = n_games
+    rows = np.arange(n)
+
+    gravity = np.broadcast_to(np.asarray(gravity, dtype=float), (n,))
+    base_spin = np.broadcast_to(np.asarray(base_spin, dtype=float), (n,))
+    shrink_speed = np.broadcast_to(np.asarray(shrink_speed, dtype=float), (n,))
+    bounciness = np.broadcast_to(np.asarray(bounciness, dtype=float), (n,))
+
+    # --- Ball ---
+    bx = np.zeros(n)
+    by = np.zeros(n)
+    bvx = np.full(n, 2.0)
+    bvy = np.zeros(n)
+
+    # --- Rings ---
+    # radius = ring_r0 - shrunk_total, angle = ring_a0 + ring_dir * phase[slot]
+    ring_r0 = np.zeros((n, MAX_RINGS))
+    ring_a0 = np.zeros((n, MAX_RINGS))
+    ring_dir = np.zeros((n, MAX_RINGS))
+    ring_slot = np.zeros((n, MAX_RINGS), dtype=np.int64)
+    ring_idx = np.zeros((n, MAX_RINGS), dtype=np.int64)
+    shrunk_total = np.zeros(n)
+    head = np.zeros(n, dtype=np.int64)
+    count = np.zeros(n, dtype=np.int64)
+    created = np.zeros(n, dtype=np.int64)
+    score = np.zeros(n, dtype=np.int64)
+
+    # --- Batches ---
+    b_speed = np.zeros((n, BATCH_SLOTS))
+    b_target = np.zeros((n, BATCH_SLOTS))
+    b_timer = np.zeros((n, BATCH_SLOTS))
+    b_state = np.zeros((n, BATCH_SLOTS), dtype=np.int8)
+    b_id = np.full((n, BATCH_SLOTS), -1, dtype=np.int64)
+    b_phase = np.zeros((n, BATCH_SLOTS))
+
+    def spawn(rows, slot, radius, new_idx):
+        batch_ids = new_idx // BATCH_SIZE
+        fresh = new_idx % BATCH_SIZE == 0
+        if fresh.any():
+            _init_batches(rng, b_speed, b_target, b_timer, b_state, b_id, b_phase,
+                          rows[fresh], batch_ids[fresh])
+        b_slot = batch_ids % BATCH_SLOTS
+        direction = np.where(batch_ids % 2 == 0, 1.0, -1.0)
+        ring_r0[rows, slot] = radius + shrunk_total[rows]
+        ring_a0[rows, slot] = rng.uniform(0, TWO_PI, len(rows)) - direction * b_phase[rows, b_slot]
+        ring_dir[rows, slot] = direction
+        ring_slot[rows, slot] = b_slot
+        ring_idx[rows, slot] = new_idx
+        count[rows] += 1
+        created[rows] += 1
+        # A fuller buffer would overwrite live rings and alias batch slots
+        assert count.max() <= MAX_RINGS, "ring buffer overflow"
+
+    def shrunk_by(rows, at):
+        # How far these games' rings have shrunk at time `at` within the step
+        return shrink_base[rows] + effective_shrink[rows] * (at - rate_from[rows])
+
+    def rerate(rows):
+        # From the frame after a ring is passed, the rings shrink at the rate
+        # the new inner ring sets, as they would stepping a frame at a time
+        rows = rows[(rerate_at[rows] < step) & (count[rows] > 0)]
+        at = rerate_at[rows]
+        shrink_base[rows] = shrunk_by(rows, at)
+        rate_from[rows] = at
+        inner = ring_r0[rows, head[rows]] - shrunk_total[rows] - shrink_base[rows]
+        effective_shrink[rows] = _shrink_distance(inner, shrink_speed[rows], step - at) / (step - at)
+        rerate_at[rows] = np.inf
+
+    def hold_to_frame_end(rows):
+        # Flies the balls on to the end of the frame they are in and keeps them
+        # inside the ring there, as the end of a step does, then sweeps on.
+        # Balls whose frame ends the step are left to the end of the step.
+        frame_end = np.minimum(np.floor(t[rows]) + 1, step)
+        ending = frame_end >= step
+        sweeping[rows[ending]] = False
+        rows, frame_end = rows[~ending], frame_end[~ending]
+        rest = frame_end - t[rows]
+        t[rows] = frame_end
+        bx[rows] += bvx[rows] * rest
+        by[rows] += (bvy[rows] + gravity[rows] * rest / 2) * rest
+        bvy[rows] += gravity[rows] * rest
+        rerate(rows[rerate_at[rows] <= frame_end])
+        limit = ring_r0[rows, head[rows]] - shrunk_total[rows] - shrunk_by(rows, frame_end) - contact
+        distance = np.hypot(bx[rows], by[rows])
+        outside = (distance > limit) & (limit > 0)
+        bx[rows[outside]] *= limit[outside] / distance[outside]
+        by[rows[outside]] *= limit[outside] / distance[outside]
+
+    radius = START_RADIUS
+    while radius < MAX_RADIUS:
+        spawn(rows, created.copy(), radius, created.copy())
+        radius += SPAWN_DISTANCE
+
+    contact = RING_THICKNESS / 2 + BALL_RADIUS
+
+    elapsed = 0
+    while elapsed < frames:
+        step = min(dt, frames - elapsed)
+        elapsed += step
+        has = count > 0
+
+        lo = np.where(has, ring_idx[rows, head] // BATCH_SIZE, 0)
+        hi = np.where(has, (created - 1) // BATCH_SIZE, -1)
+        _update_batches(rng, b_speed, b_target, b_timer, b_state, b_id, lo, hi, step)
+
+        inner = ring_r0[rows, head] - shrunk_total
+        effective_shrink = np.where(has, _shrink_distance(inner, shrink_speed, step) / step, 0.0)
+        # Shrinking within the step: shrink_base by rate_from, then effective_shrink
+        shrink_base = np.zeros(n)
+        rate_from = np.zeros(n)
+        rerate_at = np.full(n, np.inf)
+
+        # --- Sweep the ball against the innermost ring ---
+        t = np.zeros(n)
+        sweeping = has.copy()
+        for _ in range(MAX_CONTACTS * math.ceil(step)):
+            r = np.nonzero(sweeping)[0]
+            if not len(r):
+                break
+            rest = step - t[r]
+            radius_now = ring_r0[r, head[r]] - shrunk_total[r] - shrunk_by(r, t[r])
+            # A ball that cannot reach the ring before the step ends flies it
+            # in one piece; near the ring it goes a frame at a time, since the
+            # chord of a longer arc misses the hops of a ball bouncing on it
+            reach = np.hypot(bx[r], by[r]) + np.hypot(bvx[r], bvy[r]) * rest + np.abs(gravity[r]) * rest * rest / 2
+            far = (reach < radius_now - effective_shrink[r] * rest - contact) & np.isinf(rerate_at[r])
+            piece = np.where(far, rest, np.minimum(np.floor(t[r]) + 1, step) - t[r])
+            chord_vy = bvy[r] + gravity[r] * piece / 2
+            hit = times_of_impact(bx[r], by[r], bvx[r], chord_vy, radius_now,
+                                  effective_shrink[r], contact, piece)
+
+            missed = np.isinf(hit)
+            sweeping[r[missed & far]] = False
+            hold_to_frame_end(r[missed & ~far])
+            r = r[~missed]
+            hit = hit[~missed]
+            chord_vy = chord_vy[~missed]
+
+            t[r] += hit
+            bx[r] += bvx[r] * hit
+            by[r] += chord_vy * hit
+            bvy[r] += gravity[r] * hit
+
+            h = head[r]
+            slot = ring_slot[r, h]
+            ring_angle = ring_a0[r, h] + ring_dir[r, h] * (b_phase[r, slot]
+                                                         + base_spin[r] * b_speed[r, slot] * t[r])
+            ball_angle = np.arctan2(-by[r], bx[r])
+            angle_diff = np.abs(np.remainder(ball_angle - ring_angle + math.pi, TWO_PI) - math.pi)
+            through_gap = angle_diff < GAP_WIDTH / 2
+            popped = r[through_gap]
+            head[popped] = (head[popped] + 1) % MAX_RINGS
+            count[popped] -= 1
+            score[popped] += 1
+            rerate_at[popped] = np.floor(t[popped]) + 1
+            sweeping[popped[count[popped] == 0]] = False
+
+            r = r[~through_gap]
+            d = np.hypot(bx[r], by[r])
+            nx = bx[r] / np.where(d > 0, d, 1)
+            ny = by[r] / np.where(d > 0, d, 1)
+            dot = bvx[r] * nx + bvy[r] * ny
+            # A ring closing in on a ball already heading inward pushes it along
+            carried = (d == 0) | (dot <= 0)
+            hold_to_frame_end(r[carried])
+
+            bounce = ~carried
+            r, nx, ny, dot = r[bounce], nx[bounce], ny[bounce], dot[bounce]
+            if len(r):
+                rx = (bvx[r] - 2 * dot * nx) * bounciness[r]
+                ry = (bvy[r] - 2 * dot * ny) * bounciness[r]
+
+                distortion = rng.uniform(-0.18, 0.18, len(r))
+                cos_a = np.cos(distortion)
+                sin_a = np.sin(distortion)
+                vx = rx * cos_a - ry * sin_a
+                vy = rx * sin_a + ry * cos_a
+                speed = np.hypot(vx, vy)
+                scale = np.where(speed > MAX_BALL_SPEED, MAX_BALL_SPEED / np.maximum(speed, 1e-12), 1.0)
+                bvx[r] = vx * scale
+                bvy[r] = vy * scale
+        # Out of contacts: the ball stays where it last touched
+        t[sweeping] = step
+        rerate(rows)
+
+        rest = step - t
+        bx += bvx * rest
+        by += (bvy + gravity * rest / 2) * rest
+        bvy += gravity * rest
+
+        # Keep a ball sliding along the ring inside its contact radius
+        has = count > 0
+        limit = ring_r0[rows, head] - shrunk_total - shrunk_by(rows, step) - contact
+        distance = np.hypot(bx, by)
+        outside = has & (distance > limit) & (limit > 0)
+        bx[outside] *= limit[outside] / distance[outside]
+        by[outside] *= limit[outside] / distance[outside]
+
+        b_phase += base_spin[:, None] * b_speed * step
+        shrunk_total += shrunk_by(rows, step)
+
+        # --- Spawn every ring that came due during the step ---
+        spawn_radius = MAX_RADIUS - SPAWN_DISTANCE
+        while True:
+            last = (head + count - 1) % MAX_RINGS
+            last_r = ring_r0[rows, last] - shrunk_total
+            due = (count == 0) | (last_r < spawn_radius)
+            srows = np.nonzero(due)[0]
+            if not len(srows):
+                break
+            with np.errstate(divide="ignore", invalid="ignore"):
+                late = np.where((count[srows] > 0) & (effective_shrink[srows] > 0),
+                                np.floor((spawn_radius - last_r[srows]) / effective_shrink[srows]), 0)
+            spawn(srows, (head[srows] + count[srows]) % MAX_RINGS,
+                  MAX_RADIUS - late * effective_shrink[srows], created[srows])
+
+        # --- Retire rings that shrank past POP_RADIUS ---
+        while True:
+            popped = (count > 0) & (ring_r0[rows, head] - shrunk_total < POP_RADIUS)
+            if not popped.any():
+                break
+            head = np.where(popped, (head + 1) % MAX_RINGS, head)
+            count -= popped
+            score += popped
+
+    return score
+
+
+def score_distribution(param_sets, n_games=1000, frames=GAME_DURATION * FPS, seed=0, dt=1):
+    # param_sets: list of dicts with any of gravity/base_spin/shrink_speed/bounciness.
+    # All sets are run together in a single vectorized simulation.
+    columns = {key: [] for key in ("gravity", "base_spin", "shrink_speed", "bounciness")}
+    defaults = {"gravity": 0.15, "base_spin": 0.06, "shrink_speed": 1.5, "bounciness": 1.0}
+    for params in param_sets:
+        for key in columns:
+            columns[key].append(params.get(key, defaults[key]))
+
+    arrays = {key: np.repeat(values, n_games) for key, values in columns.items()}
+    scores = simulate(n_games * len(param_sets), frames=frames, seed=seed, dt=dt, **arrays)
+
+    results = []
+    for i, params in enumerate(param_sets):
+        s = scores[i * n_games:(i + 1) * n_games]
+        p10, p50, p90 = np.percentile(s, [10, 50, 90])
+        results.append({
+            **{key: columns[key][i] for key in columns},
+            "mean": float(s.mean()),
+            "std": float(s.std()),
+            "min": int(s.min()),
+            "p10": float(p10),
+            "p50": float(p50),
+            "p90": float(p90),
+            "max": int(s.max()),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Tunnel Escape score simulator")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=GAME_DURATION)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gravity", type=float, nargs="+", default=[0.15])
+    parser.add_argument("--spin", type=float, nargs="+", default=[0.06])
+    parser.add_argument("--shrink", type=float, nargs="+", default=[1.5])
+    parser.add_argument("--bounce", type=float, nargs="+", default=[1.0])
+    parser.add_argument("--dt", type=float, default=1.0, help=f"Frames per simulation step, at most {MAX_DT}")
+    args = parser.parse_args()
+
+    param_sets = [
+        {"gravity": g, "base_spin": r, "shrink_speed": s, "bounciness": b}
+        for g in args.gravity for r in args.spin for s in args.shrink for b in args.bounce
+    ]
+    frames = int(args.seconds * FPS)
+
+    start = time.perf_counter()
+    results = score_distribution(param_sets, args.games, frames, args.seed, args.dt)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'Gravity':>8} {'Spin':>6} {'Shrink':>7} {'Bounce':>7} | "
+          f"{'Mean':>7} {'Std':>6} {'P10':>6} {'P50':>6} {'P90':>6}")
+    for r in results:
+        print(f"{r['gravity']:>8.3f} {r['base_spin']:>6.3f} {r['shrink_speed']:>7.2f} "
+              f"{r['bounciness']:>7.2f} | {r['mean']:>7.2f} {r['std']:>6.2f} "
+              f"{r['p10']:>6.1f} {r['p50']:>6.1f} {r['p90']:>6.1f}")
+
+    simulated = len(param_sets) * args.games * args.seconds
+    print(f"\nSimulated {simulated:.0f} s of play in {elapsed:.2f} s "
+          f"({simulated / elapsed:.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import gc
+import random
+import resource
+import sys
+import time
+
+from ball import FPS, TunnelGame
+
+# Soak test for endless mode: runs the headless game loop for millions of
+# frames and fails if memory or per-frame time keeps growing once warmed up.
+
+SLIDER_RANGES = [(0.0, 0.5), (0.0, 0.15), (0.0, 3.0), (0.5, 1.5)]
+DEFAULT_VALUES = [0.15, 0.06, 1.5, 1.0]
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        # No /proc (macOS): fall back to peak RSS, which still catches growth
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def soak(frames, window, seed=0, vary_every=0):
+    game = TunnelGame(seed, endless=True)
+    rng = random.Random(seed)
+    values = list(DEFAULT_VALUES)
+    samples = []
+
+    gc.collect()
+    for start in range(0, frames, window):
+        t0 = time.perf_counter()
+        for frame in range(start, min(start + window, frames)):
+            if vary_every and frame % vary_every == 0:
+                values = [rng.uniform(lo, hi) for lo, hi in SLIDER_RANGES]
+            game.step(*values)
+        elapsed = time.perf_counter() - t0
+        gc.collect()
+        samples.append({
+            "frame": game.frame,
+            "frame_us": 1e6 * elapsed / (game.frame - start),
+            "rss_mb": rss_mb(),
+            "rings": len(game.rings),
+            "live_batches": int((game.batches.ring_counts > 0).sum()),
+            "score": game.score,
+        })
+        s = samples[-1]
+        print(f"{s['frame']:>10} frames ({s['frame'] / FPS / 3600:6.2f} h) | "
+              f"{s['frame_us']:7.2f} us/frame | {s['rss_mb']:7.1f} MB | "
+              f"{s['rings']:3} rings | {s['live_batches']} batches | score {s['score']}")
+    return game, samples
+
+
+def check(game, samples, rss_tolerance_mb, time_tolerance):
+    failures = []
+    if sum(game.batches.ring_counts) != len(game.rings):
+        failures.append("batch ring counts do not match the live rings")
+
+    # Skip the first window: imports, caches and the allocator settle there
+    steady = samples[1:] if len(samples) > 2 else samples
+    baseline = steady[0]
+    final = steady[-1]
+
+    growth = final["rss_mb"] - baseline["rss_mb"]
+    if growth > rss_tolerance_mb:
+        failures.append(f"RSS grew by {growth:.1f} MB (limit {rss_tolerance_mb} MB)")
+
+    # Compare the slowest of the first half with the fastest of the second, so
+    # scheduler noise in a single window cannot fail the run on its own
+    half = max(1, len(steady) // 2)
+    early = max(s["frame_us"] for s in steady[:half])
+    late = min(s["frame_us"] for s in steady[half:] or steady[-1:])
+    if late > early * (1 + time_tolerance):
+        failures.append(f"frame time grew from {early:.2f} to {late:.2f} us")
+
+    max_rings = max(s["rings"] for s in samples)
+    if max_rings > 64:
+        failures.append(f"{max_rings} live rings")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endless-mode soak test for Tunnel Escape")
+    parser.add_argument("--frames", type=int, default=2_000_000)
+    parser.add_argument("--window", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vary-every", type=int, default=FPS * 10,
+                        help="Pick new random slider values every N frames (0 = keep defaults)")
+    parser.add_argument("--rss-tolerance", type=float, default=2.0, help="MB")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="Fraction")
+    args = parser.parse_args()
+
+    game, samples = soak(args.frames, args.window, args.seed, args.vary_every)
+    failures = check(game, samples, args.rss_tolerance, args.time_tolerance)
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK: memory and frame time stayed flat")
+
+
+if __name__ == "__main__":
+    main()
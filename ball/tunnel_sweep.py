@@ -0,0 +1,204 @@
+import argparse
+import csv
+import itertools
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tunnel_constants import FPS, GAME_DURATION, MAX_DT
+from tunnel_sim import simulate
+
+# Parameter sweep over the four Tunnel Escape sliders.
+#
+# Every point is simulated on its own with tunnel_sim (same seed for every
+# point, so neighbouring points see the same random rings and the surface
+# stays smooth), fanned out over a process pool. Results are cached in
+# SQLite keyed by the slider values, seed, games, frames and dt, so a rerun
+# only simulates points it has not seen. After the grid, --refine rounds
+# zoom in on the point closest to the target score with a finer grid.
+
+SLIDERS = {
+    # name: (label, low, high), the same ranges as the sliders in ball.py
+    "gravity": ("Gravity", 0.0, 0.5),
+    "base_spin": ("Spin", 0.0, 0.15),
+    "shrink_speed": ("Shrink", 0.0, 3.0),
+    "bounciness": ("Bounce", 0.5, 1.5),
+}
+STATS = ("mean", "std", "p10", "p50", "p90")
+
+CACHE_VERSION = 1   # Bump when the simulation rules change
+
+
+class SweepCache:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " version INTEGER, gravity REAL, base_spin REAL, shrink_speed REAL, bounciness REAL,"
+            " seed INTEGER, games INTEGER, frames INTEGER, dt REAL,"
+            " mean REAL, std REAL, p10 REAL, p50 REAL, p90 REAL,"
+            " PRIMARY KEY (version, gravity, base_spin, shrink_speed, bounciness,"
+            "              seed, games, frames, dt))"
+        )
+
+    def get(self, point, run):
+        row = self.db.execute(
+            "SELECT mean, std, p10, p50, p90 FROM results WHERE version = ? AND gravity = ?"
+            " AND base_spin = ? AND shrink_speed = ? AND bounciness = ? AND seed = ?"
+            " AND games = ? AND frames = ? AND dt = ?",
+            (CACHE_VERSION, *point, *run),
+        ).fetchone()
+        return dict(zip(STATS, row)) if row else None
+
+    def put(self, point, run, stats):
+        self.db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (CACHE_VERSION, *point, *run, *(stats[key] for key in STATS)),
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def run_point(point, seed, games, frames, dt):
+    gravity, base_spin, shrink_speed, bounciness = point
+    scores = simulate(games, gravity, base_spin, shrink_speed, bounciness, frames, seed, dt)
+    p10, p50, p90 = np.percentile(scores, [10, 50, 90])
+    return {"mean": float(scores.mean()), "std": float(scores.std()),
+            "p10": float(p10), "p50": float(p50), "p90": float(p90)}
+
+
+def grid(ranges, levels):
+    # ranges: [(low, high), ...] in SLIDERS order; a fixed slider has low == high
+    axes = [np.linspace(lo, hi, levels) if hi > lo else [lo] for lo, hi in ranges]
+    return [tuple(round(float(v), 6) for v in p) for p in itertools.product(*axes)]
+
+
+def sweep(points, cache, run, workers):
+    # Returns {point: stats}, simulating only the points missing from the cache
+    results = {}
+    todo = []
+    for point in dict.fromkeys(points):
+        stats = cache.get(point, run)
+        if stats is None:
+            todo.append(point)
+        else:
+            results[point] = stats
+
+    if todo:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = [pool.submit(run_point, point, *run) for point in todo]
+            for i, (point, job) in enumerate(zip(todo, jobs), 1):
+                results[point] = job.result()
+                cache.put(point, run, results[point])
+                print(f"\r  simulated {i}/{len(todo)} points", end="", flush=True)
+        print(f" in {time.perf_counter() - start:.1f} s")
+    print(f"  {len(results) - len(todo)} cached, {len(todo)} new")
+    return results
+
+
+def closest(results, target):
+    return min(results, key=lambda point: abs(results[point]["mean"] - target))
+
+
+def refine(ranges, best, levels):
+    # A grid of the same size, spanning one step of the old grid either side
+    # of the best point and clipped to the slider ranges
+    new_ranges = []
+    for (lo, hi), value, (_, low, high) in zip(ranges, best, SLIDERS.values()):
+        if hi == lo:
+            new_ranges.append((lo, hi))
+            continue
+        step = (hi - lo) / (levels - 1)
+        new_ranges.append((max(low, value - step), min(high, value + step)))
+    return new_ranges
+
+
+def print_surface(results, best, rows, cols):
+    # Mean score over two sliders, with the other two held at the best point
+    names = list(SLIDERS)
+    r, c = names.index(rows), names.index(cols)
+    fixed = [i for i in range(4) if i not in (r, c)]
+    slice_ = {p: s for p, s in results.items() if all(p[i] == best[i] for i in fixed)}
+    row_values = sorted({p[r] for p in slice_})
+    col_values = sorted({p[c] for p in slice_})
+
+    held = ", ".join(f"{SLIDERS[names[i]][0]} {best[i]:g}" for i in fixed)
+    print(f"\nMean score by {SLIDERS[rows][0]} (rows) and {SLIDERS[cols][0]} (columns), {held}")
+    print(f"{'':>8} |" + "".join(f"{v:>8.3f}" for v in col_values))
+    print("-" * (10 + 8 * len(col_values)))
+    for rv in row_values:
+        cells = []
+        for cv in col_values:
+            point = list(best)
+            point[r], point[c] = rv, cv
+            stats = slice_.get(tuple(point))
+            cells.append(f"{stats['mean']:>8.1f}" if stats else f"{'':>8}")
+        print(f"{rv:>8.3f} |" + "".join(cells))
+
+
+def write_csv(path, results):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([*SLIDERS, *STATS])
+        for point in sorted(results):
+            writer.writerow([*point, *(results[point][key] for key in STATS)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep the Tunnel Escape sliders for a target score")
+    for name, (label, lo, hi) in SLIDERS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, nargs=2, default=[lo, hi],
+                            metavar=("LOW", "HIGH"), help=f"{label} range (equal values fix it)")
+    parser.add_argument("--levels", type=int, default=4, help="Grid points per slider")
+    parser.add_argument("--refine", type=int, default=1, help="Zoom-in rounds around the best point")
+    parser.add_argument("--target", type=float, default=60, help="Target mean score")
+    parser.add_argument("--games", type=int, default=200, help="Games per point")
+    parser.add_argument("--seconds", type=float, default=GAME_DURATION)
+    parser.add_argument("--dt", type=float, default=1.0,
+                        help=f"Frames per simulation step, at most {MAX_DT}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--cache", default="tunnel_sweep.sqlite")
+    parser.add_argument("--surface", nargs=2, default=["gravity", "bounciness"],
+                        choices=list(SLIDERS), metavar=("ROWS", "COLS"))
+    parser.add_argument("--csv", help="Write every point to this CSV file")
+    args = parser.parse_args()
+    if not 0 < args.dt <= MAX_DT:
+        parser.error(f"--dt must be above 0 and at most {MAX_DT}")
+
+    ranges = [tuple(getattr(args, name)) for name in SLIDERS]
+    run = (args.seed, args.games, int(args.seconds * FPS), args.dt)
+    cache = SweepCache(args.cache)
+
+    print(f"Grid: {args.levels} levels per slider")
+    results = sweep(grid(ranges, args.levels), cache, run, args.workers)
+    first_grid = dict(results)
+    best = closest(results, args.target)
+
+    for round_ in range(1, args.refine + 1):
+        ranges = refine(ranges, best, args.levels)
+        print(f"Refine {round_}: around {best}")
+        results.update(sweep(grid(ranges, args.levels), cache, run, args.workers))
+        best = closest(results, args.target)
+    cache.close()
+
+    print_surface(first_grid, closest(first_grid, args.target), *args.surface)
+    if args.csv:
+        write_csv(args.csv, results)
+
+    stats = results[best]
+    print(f"\nClosest to a mean score of {args.target:g} ({len(results)} points):")
+    for (name, (label, _, _)), value in zip(SLIDERS.items(), best):
+        print(f"  {label:<7} {value:.4f}")
+    print(f"  score   {stats['mean']:.1f} +/- {stats['std']:.1f} "
+          f"(p10 {stats['p10']:.0f}, p90 {stats['p90']:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
 import pygame
+import argparse
 import math
 import random
 
+from damage_strategies import STRATEGIES
+from engine import Engine, Simulation, lerp
+from text_cache import text_cache
+
 # --- Constants ---
 WIDTH, HEIGHT = 400, 400
 FPS = 60
 BALL_RADIUS = 50 
+START_HP = 100000
 
 # Colors
 WHITE = (255, 255, 255)
@@ -15,7 +21,7 @@ BLUE = (100, 100, 255)
 GREEN = (50, 200, 50)
 
 class Ball:
-    def __init__(self, x, y, color, strategy):
+    def __init__(self, x, y, color, strategy, hp=START_HP):
         self.x = x
         self.y = y
         self.color = color
@@ -24,41 +30,33 @@ class Ball:
         self.dy = random.choice([-3, -2, 2, 3])
         
         # --- Battle Stats ---
-        self.hp = 100000
-        self.damage = 1
-        self.strategy = strategy # 'fib' or 'double'
-        
-        # Fibonacci trackers
-        self.fib_prev = 0
-        self.fib_curr = 1
+        self.hp = hp
+        self.strategy = strategy # A name in damage_strategies.STRATEGIES
+        self.damages = STRATEGIES[strategy].damages()
+        self.damage = next(self.damages)
 
     def increase_damage(self):
-        if self.strategy == 'fib':
-            # Sequence: 1, 1, 2, 3, 5, 8...
-            new_fib = self.fib_prev + self.fib_curr
-            self.fib_prev = self.fib_curr
-            self.fib_curr = new_fib
-            self.damage = self.fib_curr
-        elif self.strategy == 'double':
-            # Sequence: 1, 2, 4, 8, 16...
-            self.damage *= 2
+        self.damage = next(self.damages)
 
     def move(self):
         self.x += self.dx
         self.y += self.dy
 
-    def draw(self, screen, font, small_font):
+    def draw(self, screen, font, small_font, pos=None):
+        # pos: where to draw the ball, if not where it is (interpolated)
+        x, y = pos or (self.x, self.y)
+
         # Draw Ball
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.radius)
-        pygame.draw.circle(screen, BLACK, (int(self.x), int(self.y)), self.radius, 3)
+        pygame.draw.circle(screen, self.color, (int(x), int(y)), self.radius)
+        pygame.draw.circle(screen, BLACK, (int(x), int(y)), self.radius, 3)
 
         # Draw Stats Text
-        hp_text = font.render(f"{self.hp}", True, BLACK)
-        dmg_text = small_font.render(f"Dmg: {self.damage}", True, BLACK)
+        hp_text = text_cache.render(font, f"{self.hp}", BLACK)
+        dmg_text = text_cache.render(small_font, f"Dmg: {self.damage}", BLACK)
         
         # Center the text
-        screen.blit(hp_text, (self.x - hp_text.get_width() // 2, self.y - 15))
-        screen.blit(dmg_text, (self.x - dmg_text.get_width() // 2, self.y + 10))
+        screen.blit(hp_text, (x - hp_text.get_width() // 2, y - 15))
+        screen.blit(dmg_text, (x - dmg_text.get_width() // 2, y + 10))
 
     def check_wall_collision(self):
         if self.x - self.radius < 0:
@@ -119,71 +117,112 @@ def check_ball_collision(b1, b2):
         b1.increase_damage()
         b2.increase_damage()
 
-def main():
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Fibonacci vs Doubling Battle")
-    clock = pygame.time.Clock()
-    
-    # Fonts
-    font = pygame.font.SysFont("Arial", 24, bold=True)
-    small_font = pygame.font.SysFont("Arial", 16)
-    game_over_font = pygame.font.SysFont("Arial", 40, bold=True)
-
-    # Create Balls
-    # Ball 1 (Red) = Fibonacci
-    # Ball 2 (Blue) = Doubling
-    ball1 = Ball(100, 200, RED, 'fib')
-    ball2 = Ball(300, 200, BLUE, 'double')
-
-    running = True
-    game_over = False
-    winner_text = ""
-
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            # Restart on click if game over
-            if event.type == pygame.MOUSEBUTTONDOWN and game_over:
-                main() 
-                return
-
-        if not game_over:
-            ball1.move()
-            ball2.move()
-
-            ball1.check_wall_collision()
-            ball2.check_wall_collision()
-            check_ball_collision(ball1, ball2)
-
-            # Check for death
-            if ball1.hp <= 0 or ball2.hp <= 0:
-                game_over = True
-                if ball1.hp > ball2.hp:
-                    winner_text = "RED (Fibonacci) WINS!"
-                elif ball2.hp > ball1.hp:
-                    winner_text = "BLUE (Double) WINS!"
-                else:
-                    winner_text = "DRAW!"
-
-        # Drawing
+class Battle(Simulation):
+    # One fight between two balls, one tick per step(). reset() starts a new
+    # one in place.
+    def __init__(self, strategies=('fib', 'double'), hps=(START_HP, START_HP)):
+        self.strategies = strategies
+        self.hps = hps
+        self.fonts = None # Made on the first render, so headless battles need no fonts
+        self.reset()
+
+    def reset(self):
+        # Ball 1 (Red) on the left, Ball 2 (Blue) on the right
+        self.ball1 = Ball(100, 200, RED, self.strategies[0], self.hps[0])
+        self.ball2 = Ball(300, 200, BLUE, self.strategies[1], self.hps[1])
+        self.state = "PLAYING"
+        self.winner = None # 1, 2, or 0 for a draw
+        self.frame = 0
+        self.collisions = 0
+
+    def step(self):
+        if self.state != "PLAYING":
+            return
+        ball1, ball2 = self.ball1, self.ball2
+        self.frame += 1
+        ball1.move()
+        ball2.move()
+
+        ball1.check_wall_collision()
+        ball2.check_wall_collision()
+        hp = ball1.hp
+        check_ball_collision(ball1, ball2)
+        if ball1.hp != hp:
+            self.collisions += 1
+
+        # Check for death
+        if ball1.hp <= 0 or ball2.hp <= 0:
+            self.state = "GAME_OVER"
+            if ball1.hp > ball2.hp:
+                self.winner = 1
+            elif ball2.hp > ball1.hp:
+                self.winner = 2
+            else:
+                self.winner = 0
+
+    def winner_text(self):
+        if not self.winner:
+            return "DRAW!"
+        ball = self.ball1 if self.winner == 1 else self.ball2
+        color = "RED" if self.winner == 1 else "BLUE"
+        return f"{color} ({STRATEGIES[ball.strategy].label}) WINS!"
+
+    # --- Simulation interface (engine.py) ---
+
+    @property
+    def done(self):
+        return self.state == "GAME_OVER"
+
+    def render_state(self):
+        return (self.ball1.x, self.ball1.y, self.ball2.x, self.ball2.y)
+
+    def handle_event(self, event):
+        # Restart on click if game over
+        if event.type == pygame.MOUSEBUTTONDOWN and self.state == "GAME_OVER":
+            self.reset()
+            return True
+        return False
+
+    def render(self, screen, previous, alpha):
+        if self.fonts is None:
+            self.fonts = (pygame.font.SysFont("Arial", 24, bold=True),
+                          pygame.font.SysFont("Arial", 16),
+                          pygame.font.SysFont("Arial", 40, bold=True))
+        font, small_font, game_over_font = self.fonts
+        x1, y1, x2, y2 = [lerp(a, b, alpha) for a, b in zip(previous, self.render_state())]
+
         screen.fill(WHITE)
         
-        ball1.draw(screen, font, small_font)
-        ball2.draw(screen, font, small_font)
+        self.ball1.draw(screen, font, small_font, (x1, y1))
+        self.ball2.draw(screen, font, small_font, (x2, y2))
 
-        if game_over:
-            text_surf = game_over_font.render(winner_text, True, BLACK)
+        if self.state == "GAME_OVER":
+            text_surf = text_cache.render(game_over_font, self.winner_text(), BLACK)
             screen.blit(text_surf, (WIDTH//2 - text_surf.get_width()//2, HEIGHT//2))
             
-            sub_text = small_font.render("Click to Restart", True, BLACK)
+            sub_text = text_cache.render(small_font, "Click to Restart", BLACK)
             screen.blit(sub_text, (WIDTH//2 - sub_text.get_width()//2, HEIGHT//2 + 40))
 
-        pygame.display.flip()
-        clock.tick(FPS)
+def main(max_fps=FPS, render_skip=False, profile_path=None):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Fibonacci vs Doubling Battle")
+
+    # Ball 1 (Red) = Fibonacci
+    # Ball 2 (Blue) = Doubling
+    battle = Battle(('fib', 'double'))
+
+    # Physics runs at FPS ticks per second whatever the frame rate
+    Engine(battle, FPS, max_fps, render_skip, profile_path=profile_path).run(screen)
 
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fibonacci vs Doubling Battle")
+    parser.add_argument("--fps", type=int, default=FPS, help="Frame rate cap (0 for none)")
+    parser.add_argument("--render-skip", action="store_true",
+                        help="Skip drawing frames while the physics is behind")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Record frame phase timings to PATH (.csv, or .json for a Chrome trace)")
+    args = parser.parse_args()
+    main(args.fps, args.render_skip, args.profile)
@@ -0,0 +1,236 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+
+from face_detection import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    detect_faces,
+    load_face_detector,
+)
+
+# Offline face detection over video files and image folders.
+#
+# Every input is cut into ranges of frames (or images), and the ranges run on
+# a process pool. Each worker loads its own detector once and keeps OpenCV to
+# one thread, so the processes, not OpenCV's internal threads, use the cores.
+# Nothing is displayed. A worker returns the detections of its range, and
+# the main process writes them as ranges finish: JSONL with one line per
+# frame, or CSV with one row per face.
+#
+# After writing a range, its key and the output's size are appended to
+# <output>.checkpoint. With --resume, finished ranges are skipped, and the
+# output is cut back to the last checkpointed size, dropping whatever a
+# crash left half-written.
+#
+# Video ranges start with a seek, which is frame-accurate for the usual
+# codecs but not every container; frames are numbered from the seek target.
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+CHUNK_FRAMES = 300
+
+detector = None  # This worker process's detector
+
+
+def list_images(folder):
+    return sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+
+
+def plan(inputs, chunk=CHUNK_FRAMES):
+    # Jobs of (source, start, end), end exclusive
+    jobs = []
+    for source in inputs:
+        if os.path.isdir(source):
+            count = len(list_images(source))
+        else:
+            video = cv2.VideoCapture(source)
+            if not video.isOpened():
+                raise RuntimeError(f"Could not open video: {source}")
+            count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            video.release()
+        for start in range(0, count, chunk):
+            jobs.append((source, start, min(start + chunk, count)))
+    return jobs
+
+
+def init_worker(backend=DEFAULT_BACKEND):
+    global detector
+    cv2.setNumThreads(1)
+    detector = load_face_detector(backend)
+
+
+def frames_of(source, start, end):
+    # (frame index, timestamp in seconds or None, image) for the range
+    if os.path.isdir(source):
+        for index, path in enumerate(list_images(source)[start:end], start):
+            image = cv2.imread(path)
+            if image is not None:
+                yield index, None, image
+        return
+
+    video = cv2.VideoCapture(source)
+    fps = video.get(cv2.CAP_PROP_FPS) or 0
+    video.set(cv2.CAP_PROP_POS_FRAMES, start)
+    try:
+        for index in range(start, end):
+            success, frame = video.read()
+            if not success:
+                break
+            yield index, index / fps if fps else None, frame
+    finally:
+        video.release()
+
+
+def process_range(source, start, end):
+    records = []
+    for index, timestamp, frame in frames_of(source, start, end):
+        faces = detect_faces(detector, frame)
+        records.append((index, timestamp, [[int(v) for v in box] for box in faces]))
+    return (source, start, end), records
+
+
+class ResultWriter:
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.checkpoint_path = path + ".checkpoint"
+        self.done = set()
+        offset = 0
+        if resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.done.add(tuple(entry["range"]))
+                    offset = entry["offset"]
+        else:
+            open(self.checkpoint_path, "w").close()
+
+        self.csv = not path.endswith(".jsonl")
+        self.output = open(path, "a+" if resume else "w", newline="")
+        self.output.truncate(offset)
+        self.output.seek(offset)
+        if self.csv:
+            self.writer = csv.writer(self.output)
+            if offset == 0:
+                self.writer.writerow(
+                    ["source", "frame", "timestamp", "x", "y", "width", "height"]
+                )
+        self.checkpoint = open(self.checkpoint_path, "a")
+
+    def write(self, key, records):
+        source = key[0]
+        for index, timestamp, faces in records:
+            if self.csv:
+                for face in faces:
+                    self.writer.writerow([source, index, timestamp, *face])
+            else:
+                line = {
+                    "source": source,
+                    "frame": index,
+                    "timestamp": timestamp,
+                    "faces": faces,
+                }
+                self.output.write(json.dumps(line) + "\n")
+        self.output.flush()
+        os.fsync(self.output.fileno())
+        entry = {"range": list(key), "offset": self.output.tell()}
+        self.checkpoint.write(json.dumps(entry) + "\n")
+        self.checkpoint.flush()
+        self.done.add(key)
+
+    def close(self):
+        self.output.close()
+        self.checkpoint.close()
+
+
+def run_batch(
+    inputs,
+    output,
+    workers=None,
+    chunk=CHUNK_FRAMES,
+    resume=False,
+    backend=DEFAULT_BACKEND,
+):
+    writer = ResultWriter(output, resume)
+    jobs = [job for job in plan(inputs, chunk) if tuple(job) not in writer.done]
+    workers = workers or os.cpu_count() or 1
+    frames = 0
+    start = time.perf_counter()
+    pending = set()
+    todo = iter(jobs)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=(backend,)
+        ) as pool:
+            while True:
+                while len(pending) < 2 * workers:
+                    job = next(todo, None)
+                    if job is None:
+                        break
+                    pending.add(pool.submit(process_range, *job))
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key, records = future.result()
+                    writer.write(key, records)
+                    frames += len(records)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"\r  {len(writer.done)} ranges, {frames} frames, "
+                    f"{frames / elapsed:.1f} FPS",
+                    end="",
+                    flush=True,
+                )
+    finally:
+        writer.close()
+    print()
+    return frames, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Detect faces in video files and image folders, without a display"
+    )
+    parser.add_argument("inputs", nargs="+", help="Video files and image folders")
+    parser.add_argument(
+        "--output",
+        default="faces.jsonl",
+        help="Results file: .jsonl (one line per frame) or .csv (one row per face)",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--chunk", type=int, default=CHUNK_FRAMES, help="Frames per job"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip the ranges recorded in the output's checkpoint",
+    )
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    args = parser.parse_args()
+
+    frames, elapsed = run_batch(
+        args.inputs,
+        args.output,
+        args.workers,
+        args.chunk,
+        args.resume,
+        args.backend,
+    )
+    print(
+        f"{frames} frames in {elapsed:.1f} s ({frames / max(elapsed, 1e-9):.1f} FPS) "
+        f"with {args.workers} workers -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import time
+from functools import partial
+
+import cv2
+import numpy as np
+
+from face_detection import BACKENDS, detect_faces, load_face_detector
+from face_roi import RoiDetector
+from face_tracking import EVAL_IOU, read_clip, score
+
+# Speed and accuracy of the detector backends.
+#
+# Every backend runs over the same clip, one frame at a time. The frames are
+# decoded up front so decoding is not timed, and the first frame is detected
+# once untimed so model setup is not counted. Each detect_faces() call is timed
+# for the latency percentiles, and FPS is frames over the summed time. With
+# --detect-width or --roi-margin, the frames go through face_roi.RoiDetector
+# instead, so the downscaled and ROI paths are measured too.
+#
+# Accuracy is scored on the annotated frames only, against a JSONL file in
+# face_batch.py's output format with one line per annotated frame:
+#
+#     {"frame": 12, "faces": [[x, y, w, h], ...]}
+#
+# Unlisted frames are not scored, and a listed frame with no faces counts
+# every detection on it as a false positive. A few dozen hand-checked frames
+# are enough to separate the backends. A face_batch.py run with the most
+# accurate backend, corrected by hand, is a quick way to make the file.
+#
+# A backend that cannot load (e.g. its model file is not downloaded) is
+# skipped with the reason.
+#
+# No test data ships with the repo: there is no bundled clip, annotation file
+# or LBP/DNN model. Bring your own clip (with faces in it) and annotations,
+# and fetch the models once with face_detection.py --backend NAME --download.
+# Without them only the Haar backends run and no accuracy is reported.
+
+PERCENTILES = (50, 95, 99)
+
+
+def read_annotations(path):
+    annotations = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                annotations[entry["frame"]] = [tuple(box) for box in entry["faces"]]
+    return annotations
+
+
+def bench_backend(
+    face_detector,
+    frames,
+    annotations=None,
+    threshold=EVAL_IOU,
+    detect_width=None,
+    roi_margin=None,
+):
+    detect_faces(face_detector, frames[0])
+    detect = partial(detect_faces, face_detector)
+    if detect_width or roi_margin is not None:
+        detect = RoiDetector(face_detector, detect_width, roi_margin).detect
+    latencies = []
+    boxes = []
+    for frame in frames:
+        start = time.perf_counter()
+        faces = detect(frame)
+        latencies.append(time.perf_counter() - start)
+        boxes.append([tuple(int(v) for v in box) for box in faces])
+
+    latencies = np.array(latencies)
+    row = {"fps": len(frames) / latencies.sum(), "precision": None, "recall": None}
+    for q in PERCENTILES:
+        row[f"p{q}"] = 1000 * np.percentile(latencies, q)
+    if annotations:
+        scored = [i for i in sorted(annotations) if i < len(frames)]
+        row["precision"], row["recall"] = score(
+            [boxes[i] for i in scored], [annotations[i] for i in scored], threshold
+        )
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latency, FPS and precision/recall of each detector backend"
+    )
+    parser.add_argument("clip", help="Video file every backend runs over")
+    parser.add_argument("--annotations", help="JSONL of annotated frames")
+    parser.add_argument(
+        "--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS)
+    )
+    parser.add_argument("--frames", type=int, default=300, help="Frames per backend")
+    parser.add_argument(
+        "--iou", type=float, default=EVAL_IOU, help="Overlap for a detection to count"
+    )
+    parser.add_argument(
+        "--detect-width",
+        type=int,
+        help="Detect on a copy of the frame scaled down to this width",
+    )
+    parser.add_argument(
+        "--roi-margin",
+        type=float,
+        help="Search around the last faces, widened by this fraction of their size",
+    )
+    args = parser.parse_args()
+
+    frames = list(read_clip(args.clip, args.frames))
+    if not frames:
+        raise RuntimeError(f"No frames in clip: {args.clip}")
+    annotations = read_annotations(args.annotations) if args.annotations else None
+    scored = sum(i < len(frames) for i in annotations) if annotations else 0
+    print(
+        f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, "
+        f"{scored} annotated"
+    )
+    print(
+        f"{'Backend':<14} | "
+        + " ".join(f"{f'p{q} ms':>7}" for q in PERCENTILES)
+        + f" {'FPS':>7} | {'Precision':>9} {'Recall':>7}"
+    )
+    for backend in args.backends:
+        try:
+            face_detector = load_face_detector(backend)
+        except (RuntimeError, cv2.error) as error:
+            print(f"{backend:<14} | skipped: {error}")
+            continue
+        row = bench_backend(
+            face_detector,
+            frames,
+            annotations,
+            args.iou,
+            args.detect_width,
+            args.roi_margin,
+        )
+        accuracy = ""
+        if row["precision"] is not None:
+            accuracy = f"{row['precision']:>9.1%} {row['recall']:>7.1%}"
+        print(
+            f"{backend:<14} | "
+            + " ".join(f"{row[f'p{q}']:>7.2f}" for q in PERCENTILES)
+            + f" {row['fps']:>7.1f} | {accuracy}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,106 @@
+import argparse
+import os
+import urllib.request
+
 import cv2
+import numpy as np
+
+# Detector backends.
+#
+# Every detector has CascadeClassifier's detectMultiScale(image, scaleFactor,
+# minNeighbors, minSize) and returns (x, y, w, h) boxes, so the live,
+# pipelined, tracking, ROI and batch modes work with any backend. The Haar
+# cascades ship with opencv-python. The LBP cascades and the DNN models are
+# not bundled: they are read from models/ next to this file, and --download
+# fetches the chosen backend's files from MODEL_URLS. The DNN detectors run
+# on the CPU, take the color frame when there is one, and ignore scaleFactor
+# and minNeighbors. res10 is a Caffe model, which OpenCV 5 no longer reads,
+# so choosing it there fails up front with that reason.
+#
+# detect_faces() takes a BGR frame and gives the detector grayscale or color
+# as it wants; run_detector() takes an image already in the detector's format
+# (e.g. a crop or a downscaled copy).
+
+OPENCV_MAJOR = int(cv2.__version__.split(".")[0])
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+DEFAULT_BACKEND = "haar"
+
+BACKENDS = {
+    "haar": ("haar", "haarcascade_frontalface_default.xml"),
+    "haar-alt": ("haar", "haarcascade_frontalface_alt.xml"),
+    "haar-alt2": ("haar", "haarcascade_frontalface_alt2.xml"),
+    "haar-alt-tree": ("haar", "haarcascade_frontalface_alt_tree.xml"),
+    "lbp": ("lbp", "lbpcascade_frontalface.xml"),
+    "lbp-improved": ("lbp", "lbpcascade_frontalface_improved.xml"),
+    "yunet": ("yunet", "face_detection_yunet_2023mar.onnx"),
+    "res10": (
+        "res10",
+        "deploy.prototxt",
+        "res10_300x300_ssd_iter_140000.caffemodel",
+    ),
+}
+
+OPENCV_RAW = "https://raw.githubusercontent.com/opencv"
+MODEL_URLS = {
+    "lbpcascade_frontalface.xml": (
+        f"{OPENCV_RAW}/opencv/4.x/data/lbpcascades/lbpcascade_frontalface.xml"
+    ),
+    "lbpcascade_frontalface_improved.xml": (
+        f"{OPENCV_RAW}/opencv/4.x/data/lbpcascades/"
+        "lbpcascade_frontalface_improved.xml"
+    ),
+    "face_detection_yunet_2023mar.onnx": (
+        "https://github.com/opencv/opencv_zoo/raw/main/models/"
+        "face_detection_yunet/face_detection_yunet_2023mar.onnx"
+    ),
+    "deploy.prototxt": (
+        f"{OPENCV_RAW}/opencv/4.x/samples/dnn/face_detector/deploy.prototxt"
+    ),
+    "res10_300x300_ssd_iter_140000.caffemodel": (
+        f"{OPENCV_RAW}/opencv_3rdparty/dnn_samples_face_detector_20170830/"
+        "res10_300x300_ssd_iter_140000.caffemodel"
+    ),
+}
+
+
+def model_path(name, backend):
+    path = os.path.join(MODEL_DIR, name)
+    if not os.path.exists(path):
+        raise RuntimeError(
+            f"Missing model file {path}. Download it from {MODEL_URLS[name]} "
+            f"or run: python face_detection.py --backend {backend} --download"
+        )
+    return path
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown detector backend {backend!r}, expected one of: "
+            + ", ".join(BACKENDS)
+        )
+    if BACKENDS[backend][0] == "res10" and OPENCV_MAJOR >= 5:
+        raise RuntimeError(
+            f"The {backend} backend is a Caffe model, which OpenCV "
+            f"{cv2.__version__} cannot read (OpenCV 5 removed the Caffe "
+            "importer). Use yunet, or OpenCV 4."
+        )
+
 
+def download_models(backend):
+    check_backend(backend)
+    kind, *files = BACKENDS[backend]
+    if kind == "haar":
+        return
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    for name in files:
+        path = os.path.join(MODEL_DIR, name)
+        if not os.path.exists(path):
+            print(f"Downloading {MODEL_URLS[name]}")
+            urllib.request.urlretrieve(MODEL_URLS[name], path)
 
-def load_face_detector():
-    cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+
+def load_cascade(cascade_path):
     face_detector = cv2.CascadeClassifier(cascade_path)
 
     if face_detector.empty():
@@ -11,13 +109,155 @@ def load_face_detector():
     return face_detector
 
 
-def detect_faces_live(camera_index=0):
-    face_detector = load_face_detector()
+def load_face_detector(backend=DEFAULT_BACKEND):
+    check_backend(backend)
+    kind, *files = BACKENDS[backend]
+    if kind == "haar":
+        return load_cascade(cv2.data.haarcascades + files[0])
+
+    paths = [model_path(name, backend) for name in files]
+    if kind == "lbp":
+        return load_cascade(paths[0])
+    if kind == "yunet":
+        return YuNetDetector(*paths)
+    return SsdDetector(*paths)
+
+
+def to_boxes(corners, width, height, min_size):
+    # (x0, y0, x1, y1) rows to (x, y, w, h) boxes inside the image, at least
+    # min_size big
+    limits = [width, height, width, height]
+    corners = np.clip(np.round(corners), 0, limits).astype(np.int32)
+    boxes = np.column_stack([corners[:, :2], corners[:, 2:] - corners[:, :2]])
+    keep = (boxes[:, 2] >= min_size[0]) & (boxes[:, 3] >= min_size[1])
+    return boxes[keep]
+
+
+class YuNetDetector:
+    color = True
+
+    def __init__(self, model, score_threshold=0.9):
+        self.net = cv2.FaceDetectorYN.create(model, "", (320, 320), score_threshold)
+        self.input_size = None
+
+    def detectMultiScale(self, image, scaleFactor=1.1, minNeighbors=5, minSize=(0, 0)):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        height, width = image.shape[:2]
+        if self.input_size != (width, height):
+            self.input_size = (width, height)
+            self.net.setInputSize(self.input_size)
+        _, faces = self.net.detect(image)
+        if faces is None:
+            faces = np.zeros((0, 4), dtype=np.float32)
+        corners = np.column_stack([faces[:, :2], faces[:, :2] + faces[:, 2:4]])
+        return to_boxes(corners, width, height, minSize)
+
+
+class SsdDetector:
+    color = True
+
+    def __init__(self, config, weights, confidence=0.5):
+        self.net = cv2.dnn.readNet(weights, config)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.confidence = confidence
+
+    def detectMultiScale(self, image, scaleFactor=1.1, minNeighbors=5, minSize=(0, 0)):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        height, width = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(
+            image, 1.0, (300, 300), (104.0, 177.0, 123.0), swapRB=False
+        )
+        self.net.setInput(blob)
+        detections = self.net.forward().reshape(-1, 7)
+        detections = detections[detections[:, 2] >= self.confidence]
+        corners = detections[:, 3:7] * np.array([width, height, width, height])
+        return to_boxes(corners, width, height, minSize)
+
+
+def detect_faces(face_detector, frame, scale_factor=1.1):
+    if getattr(face_detector, "color", False):
+        # DNN backends do better on the color frame
+        return run_detector(face_detector, frame, scale_factor)
+    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return run_detector(face_detector, gray_frame, scale_factor)
+
+
+def run_detector(face_detector, image, scale_factor=1.1, min_size=40):
+    # image: grayscale, or BGR for a detector with color set
+    return face_detector.detectMultiScale(
+        image,
+        scaleFactor=scale_factor,
+        minNeighbors=5,
+        minSize=(min_size, min_size),
+    )
+
+
+def draw_faces(frame, faces, labels=None):
+    for i, (x, y, width, height) in enumerate(faces):
+        cv2.rectangle(frame, (x, y), (x + width, y + height), (0, 255, 0), 2)
+        cv2.putText(
+            frame,
+            "Face" if labels is None else labels[i],
+            (x, y - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.7,
+            (0, 255, 0),
+            2,
+        )
+
+
+def open_camera(camera_index):
     camera = cv2.VideoCapture(camera_index)
 
     if not camera.isOpened():
         raise RuntimeError("Could not open the camera.")
 
+    return camera
+
+
+def detect_faces_live(
+    camera_index=0,
+    pipelined=False,
+    workers=None,
+    detect_every=None,
+    detect_width=None,
+    roi_margin=None,
+    scale_factor=1.1,
+    backend=DEFAULT_BACKEND,
+):
+    if pipelined:
+        from face_pipeline import run_pipeline
+
+        if roi_margin is not None:
+            raise ValueError("ROI search needs frames in order, not pipelined")
+        return run_pipeline(
+            camera_index,
+            workers,
+            backend=backend,
+            detect_width=detect_width,
+            scale_factor=scale_factor,
+        )
+    if detect_every:
+        from face_tracking import track_faces_live
+
+        return track_faces_live(
+            camera_index, detect_every, backend, detect_width, roi_margin, scale_factor
+        )
+
+    face_detector = load_face_detector(backend)
+    camera = open_camera(camera_index)
+
+    region_detector = None
+    if detect_width or roi_margin is not None:
+        from face_roi import RoiDetector
+
+        region_detector = RoiDetector(
+            face_detector, detect_width, roi_margin, scale_factor
+        )
+
     print("Camera opened. Press 'q' or Esc to quit.")
 
     try:
@@ -27,25 +267,11 @@ def detect_faces_live(camera_index=0):
                 print("Could not read a frame from the camera.")
                 break
 
-            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_detector.detectMultiScale(
-                gray_frame,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(40, 40),
-            )
-
-            for x, y, width, height in faces:
-                cv2.rectangle(frame, (x, y), (x + width, y + height), (0, 255, 0), 2)
-                cv2.putText(
-                    frame,
-                    "Face",
-                    (x, y - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.7,
-                    (0, 255, 0),
-                    2,
-                )
+            if region_detector is None:
+                faces = detect_faces(face_detector, frame, scale_factor)
+            else:
+                faces = region_detector.detect(frame)
+            draw_faces(frame, faces)
 
             cv2.imshow("Live Face Detection", frame)
 
@@ -58,7 +284,60 @@ def detect_faces_live(camera_index=0):
 
 
 def main():
-    detect_faces_live()
+    parser = argparse.ArgumentParser(description="Live face detection")
+    parser.add_argument("--camera", type=int, default=0, help="Camera index")
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Capture, detect and display on separate threads",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Detection threads in pipelined mode"
+    )
+    parser.add_argument(
+        "--detect-every",
+        type=int,
+        metavar="N",
+        help="Detect every N frames and track the faces in between",
+    )
+    parser.add_argument(
+        "--detect-width",
+        type=int,
+        help="Detect on a copy of the frame scaled down to this width",
+    )
+    parser.add_argument(
+        "--roi-margin",
+        type=float,
+        help="Search around the last faces, widened by this fraction of their size",
+    )
+    parser.add_argument("--scale-factor", type=float, default=1.1)
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    parser.add_argument(
+        "--download",
+        action="store_true",
+        help="Fetch the backend's model files into models/ first",
+    )
+    args = parser.parse_args()
+    if args.pipelined and args.detect_every:
+        parser.error("--pipelined and --detect-every cannot be combined")
+    if args.pipelined and args.roi_margin is not None:
+        parser.error("--roi-margin needs frames in order and cannot be --pipelined")
+    try:
+        check_backend(args.backend)
+    except RuntimeError as error:
+        parser.error(str(error))
+    if args.download:
+        download_models(args.backend)
+    detect_faces_live(
+        args.camera,
+        args.pipelined,
+        args.workers,
+        args.detect_every,
+        args.detect_width,
+        args.roi_margin,
+        args.scale_factor,
+        args.backend,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,283 @@
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import deque
+from functools import partial
+
+import cv2
+
+from face_detection import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    detect_faces,
+    draw_faces,
+    load_face_detector,
+    open_camera,
+)
+from face_roi import RoiDetector
+
+# Pipelined live face detection.
+#
+# A capture thread reads frames, a pool of detection threads (each with its
+# own detector, since a cascade is not safe to share) finds the faces, and the
+# calling thread draws and shows the results, which is where OpenCV wants its
+# window calls. The stages are joined by small bounded queues that drop the
+# oldest frame when full, so a slow stage skips frames instead of falling
+# further and further behind the camera. OpenCV releases the GIL inside
+# read(), cvtColor() and detectMultiScale(), so the detection threads run in
+# parallel.
+#
+# With detect_width set, the workers detect on a downscaled copy of each frame
+# (see face_roi.py). ROI search is not offered here: it follows the faces from
+# one frame to the next, and the workers see the frames out of order.
+#
+# Workers can finish out of order; a result older than the last frame shown
+# is dropped too. Every stage records its throughput and latency, and the
+# "total" stage is the time from a frame leaving the camera to it being shown.
+
+QUEUE_FRAMES = 2  # Frames queued per detection worker at most
+LATENCY_WINDOW = 300  # Latencies kept per stage for the percentiles
+OVERLAY_REFRESH = 0.5  # Seconds between updates of the on-screen stats
+STAGES = ("capture", "queue", "detect", "display", "total")
+
+
+class StageStats:
+    def __init__(self, name, window=LATENCY_WINDOW):
+        self.name = name
+        self.count = 0
+        self.dropped = 0
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def add(self, latency):
+        with self.lock:
+            self.count += 1
+            self.latencies.append(latency)
+
+    def drop(self, count=1):
+        with self.lock:
+            self.dropped += count
+
+    def fps(self):
+        return self.count / max(time.perf_counter() - self.started, 1e-9)
+
+    def percentile(self, q):
+        with self.lock:
+            values = sorted(self.latencies)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+    def summary(self):
+        return (
+            f"{self.name:<8} {self.fps():6.1f} FPS  "
+            f"p50 {1000 * self.percentile(50):6.1f} ms  "
+            f"p95 {1000 * self.percentile(95):6.1f} ms  "
+            f"dropped {self.dropped}"
+        )
+
+
+def put_latest(frames, item):
+    # Puts item on a bounded queue, dropping the oldest entries instead of
+    # blocking; returns how many were dropped
+    dropped = 0
+    while True:
+        try:
+            frames.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                frames.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+
+class FacePipeline:
+    def __init__(
+        self,
+        source=0,
+        workers=None,
+        detector_factory=load_face_detector,
+        detect_width=None,
+        scale_factor=1.1,
+    ):
+        self.source = source
+        self.workers = workers or os.cpu_count() or 1
+        self.detector_factory = detector_factory
+        self.detect_width = detect_width
+        self.scale_factor = scale_factor
+        self.to_detect = queue.Queue(maxsize=QUEUE_FRAMES * self.workers)
+        self.to_display = queue.Queue(maxsize=QUEUE_FRAMES * self.workers)
+        self.stop = threading.Event()
+        self.captured_all = threading.Event()
+        self.stats = {name: StageStats(name) for name in STAGES}
+        self.detectors = []
+
+    def capture(self, camera):
+        stats = self.stats["capture"]
+        seq = 0
+        try:
+            while not self.stop.is_set():
+                start = time.perf_counter()
+                success, frame = camera.read()
+                if not success:
+                    break
+                captured = time.perf_counter()
+                stats.add(captured - start)
+                stats.drop(put_latest(self.to_detect, (seq, captured, frame)))
+                seq += 1
+        finally:
+            self.captured_all.set()
+
+    def detect(self):
+        detector = self.detector_factory()
+        region_detector = None
+        if self.detect_width:
+            region_detector = RoiDetector(
+                detector, self.detect_width, scale_factor=self.scale_factor
+            )
+        while not self.stop.is_set():
+            try:
+                seq, captured, frame = self.to_detect.get(timeout=0.05)
+            except queue.Empty:
+                if self.captured_all.is_set():
+                    break
+                continue
+            start = time.perf_counter()
+            self.stats["queue"].add(start - captured)
+            if region_detector is None:
+                faces = detect_faces(detector, frame, self.scale_factor)
+            else:
+                faces = region_detector.detect(frame)
+            self.stats["detect"].add(time.perf_counter() - start)
+            item = (seq, captured, frame, faces)
+            self.stats["detect"].drop(put_latest(self.to_display, item))
+
+    def display(self, show=True):
+        stats = self.stats["display"]
+        last_seq = -1
+        lines = []
+        refreshed = 0.0
+        while not self.stop.is_set():
+            try:
+                seq, captured, frame, faces = self.to_display.get(timeout=0.05)
+            except queue.Empty:
+                if not any(thread.is_alive() for thread in self.detectors):
+                    break
+                continue
+            if seq < last_seq:
+                stats.drop()
+                continue
+            last_seq = seq
+
+            start = time.perf_counter()
+            draw_faces(frame, faces)
+            if show:
+                if start - refreshed > OVERLAY_REFRESH:
+                    lines = [self.stats[name].summary() for name in STAGES]
+                    refreshed = start
+                for i, line in enumerate(lines):
+                    cv2.putText(
+                        frame,
+                        line,
+                        (10, 20 + 18 * i),
+                        cv2.FONT_HERSHEY_PLAIN,
+                        1.0,
+                        (0, 255, 255),
+                        1,
+                    )
+                cv2.imshow("Live Face Detection (pipelined)", frame)
+                key = cv2.waitKey(1) & 0xFF
+                if key in (ord("q"), 27):
+                    self.stop.set()
+            shown = time.perf_counter()
+            stats.add(shown - start)
+            self.stats["total"].add(shown - captured)
+
+    def run(self, show=True):
+        camera = open_camera(self.source)
+        capture = threading.Thread(target=self.capture, args=(camera,), daemon=True)
+        self.detectors = [
+            threading.Thread(target=self.detect, daemon=True)
+            for _ in range(self.workers)
+        ]
+        for thread in [capture] + self.detectors:
+            thread.start()
+
+        try:
+            self.display(show)
+        finally:
+            self.stop.set()
+            for thread in [capture] + self.detectors:
+                thread.join()
+            camera.release()
+            if show:
+                cv2.destroyAllWindows()
+        return self.stats
+
+
+def print_report(stats):
+    for name in STAGES:
+        print(stats[name].summary())
+
+
+def run_pipeline(
+    source=0,
+    workers=None,
+    show=True,
+    backend=DEFAULT_BACKEND,
+    detect_width=None,
+    scale_factor=1.1,
+):
+    pipeline = FacePipeline(
+        source,
+        workers,
+        partial(load_face_detector, backend),
+        detect_width,
+        scale_factor,
+    )
+    if show:
+        print("Camera opened. Press 'q' or Esc to quit.")
+    stats = pipeline.run(show)
+    print_report(stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipelined live face detection")
+    parser.add_argument(
+        "--source", default="0", help="Camera index or video file (default: 0)"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Detection threads (default: one per core)"
+    )
+    parser.add_argument(
+        "--no-display",
+        action="store_true",
+        help="Run without a window and only print the stage report",
+    )
+    parser.add_argument(
+        "--detect-width",
+        type=int,
+        help="Detect on a copy of the frame scaled down to this width",
+    )
+    parser.add_argument("--scale-factor", type=float, default=1.1)
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    args = parser.parse_args()
+    source = int(args.source) if args.source.isdigit() else args.source
+    run_pipeline(
+        source,
+        args.workers,
+        not args.no_display,
+        args.backend,
+        args.detect_width,
+        args.scale_factor,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import time
+
+import cv2
+
+from face_detection import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    load_face_detector,
+    run_detector,
+)
+from face_tracking import read_clip, score
+
+# Downscaled and region-limited face detection.
+#
+# The cascade's cost grows with the pixels it scans, and faces are rarely
+# small, so RoiDetector detects on a copy of the frame shrunk to detect_width
+# (halved with pyrDown while that is still too big, then resized the rest of
+# the way) and maps the boxes back to full resolution. minSize shrinks with
+# the frame, so the smallest face found stays the same in full-resolution
+# pixels until it drops below the cascade's own window.
+#
+# With roi_margin set, a frame after a detection only searches the last
+# faces' boxes, each widened by roi_margin of its size on every side (and
+# overlapping regions merged). If that finds fewer faces than before, the
+# frame falls back to a full-frame search, as does every full_every-th frame
+# so new faces are picked up.
+#
+# Backends that take color (the DNN ones) get the color frame, cropped and
+# shrunk the same way; the others get the grayscale one.
+#
+# main() benchmarks FPS against recall on a clip rescaled to 720p and 1080p,
+# with full-resolution full-frame detection as the reference.
+
+MIN_FACE = 40  # Smallest face searched for, in full-resolution pixels
+FULL_EVERY = 30  # Frames between forced full-frame searches in ROI mode
+
+
+def downscale(image, scale):
+    # Returns the shrunk image and its actual (x, y) scale
+    height, width = image.shape[:2]
+    small = image
+    while small.shape[1] / 2 >= width * scale and small.shape[1] > 1:
+        small = cv2.pyrDown(small)
+    target = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if (small.shape[1], small.shape[0]) != target and scale < 1:
+        small = cv2.resize(small, target, interpolation=cv2.INTER_AREA)
+    return small, (small.shape[1] / width, small.shape[0] / height)
+
+
+def widen(box, margin, width, height):
+    x, y, w, h = box
+    dx, dy = int(w * margin), int(h * margin)
+    x0, y0 = max(0, x - dx), max(0, y - dy)
+    x1, y1 = min(width, x + w + dx), min(height, y + h + dy)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def merge_regions(regions):
+    # Unions overlapping rectangles until none overlap
+    regions = list(regions)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                ax, ay, aw, ah = regions[i]
+                bx, by, bw, bh = regions[j]
+                if ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah:
+                    x0, y0 = min(ax, bx), min(ay, by)
+                    x1, y1 = max(ax + aw, bx + bw), max(ay + ah, by + bh)
+                    regions[i] = (x0, y0, x1 - x0, y1 - y0)
+                    del regions[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return regions
+
+
+class RoiDetector:
+    def __init__(
+        self,
+        face_detector,
+        detect_width=None,
+        roi_margin=None,
+        scale_factor=1.1,
+        full_every=FULL_EVERY,
+    ):
+        self.face_detector = face_detector
+        self.detect_width = detect_width
+        self.roi_margin = roi_margin
+        self.scale_factor = scale_factor
+        self.full_every = full_every
+        self.previous = []
+        self.frame_index = 0
+        self.full_frames = 0
+        self.roi_frames = 0
+
+    def detect(self, frame):
+        if getattr(self.face_detector, "color", False):
+            image = frame
+        else:
+            image = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        height, width = image.shape[:2]
+        scale = 1.0
+        if self.detect_width and self.detect_width < width:
+            scale = self.detect_width / width
+
+        faces = None
+        if (
+            self.roi_margin is not None
+            and self.previous
+            and self.frame_index % self.full_every != 0
+        ):
+            regions = merge_regions(
+                widen(box, self.roi_margin, width, height) for box in self.previous
+            )
+            faces = []
+            for region in regions:
+                faces.extend(self.detect_region(image, region, scale))
+            self.roi_frames += 1
+            if len(faces) < len(self.previous):
+                faces = None
+
+        if faces is None:
+            faces = self.detect_region(image, (0, 0, width, height), scale)
+            self.full_frames += 1
+
+        self.previous = faces
+        self.frame_index += 1
+        return faces
+
+    def detect_region(self, image, region, scale):
+        x, y, w, h = region
+        small, (sx, sy) = downscale(image[y : y + h, x : x + w], scale)
+        min_size = max(1, round(MIN_FACE * min(sx, sy)))
+        boxes = run_detector(
+            self.face_detector, small, self.scale_factor, min_size
+        )
+        return [
+            (
+                x + int(round(bx / sx)),
+                y + int(round(by / sy)),
+                int(round(bw / sx)),
+                int(round(bh / sy)),
+            )
+            for bx, by, bw, bh in boxes
+        ]
+
+
+# --- Benchmark ---
+
+
+def resized_clip(path, height, max_frames=None):
+    for frame in read_clip(path, max_frames):
+        width = round(frame.shape[1] * height / frame.shape[0])
+        yield cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def bench(frames, face_detector, detect_width, roi_margin, scale_factor):
+    detector = RoiDetector(face_detector, detect_width, roi_margin, scale_factor)
+    boxes = []
+    start = time.perf_counter()
+    for frame in frames:
+        boxes.append(detector.detect(frame))
+    elapsed = time.perf_counter() - start
+    return boxes, len(frames) / elapsed, detector
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="FPS versus recall of downscaled and ROI-limited detection"
+    )
+    parser.add_argument("clip", help="Video file, rescaled to each height")
+    parser.add_argument("--heights", type=int, nargs="+", default=[720, 1080])
+    parser.add_argument(
+        "--widths",
+        type=int,
+        nargs="+",
+        default=[0, 960, 640, 480],
+        help="Detection widths (0 for full resolution)",
+    )
+    parser.add_argument(
+        "--margins",
+        nargs="+",
+        default=["none", "0.5"],
+        help="ROI margins ('none' searches the full frame every time)",
+    )
+    parser.add_argument("--scale-factors", type=float, nargs="+", default=[1.1, 1.2])
+    parser.add_argument("--frames", type=int, default=150, help="Frames per run")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    args = parser.parse_args()
+
+    face_detector = load_face_detector(args.backend)
+    margins = [None if m == "none" else float(m) for m in args.margins]
+    for height in args.heights:
+        # Frames are held in memory so decoding is not timed
+        frames = list(resized_clip(args.clip, height, args.frames))
+        reference, base_fps, _ = bench(frames, face_detector, None, None, 1.1)
+        faces = sum(len(boxes) for boxes in reference)
+        print(
+            f"\n{height}p, {len(frames)} frames, {faces} reference faces "
+            f"(full frame, full resolution, scaleFactor 1.1: {base_fps:.1f} FPS)"
+        )
+        print(
+            f"{'Width':>6} {'Margin':>6} {'Scale':>5} | {'FPS':>7} {'Speedup':>8} "
+            f"{'Full frames':>11} | {'Precision':>9} {'Recall':>7}"
+        )
+        for detect_width in args.widths:
+            for margin in margins:
+                for scale_factor in args.scale_factors:
+                    boxes, fps, detector = bench(
+                        frames, face_detector, detect_width, margin, scale_factor
+                    )
+                    precision, recall = score(boxes, reference)
+                    print(
+                        f"{detect_width or 'full':>6} {margin or '-':>6} "
+                        f"{scale_factor:>5.2f} | {fps:>7.1f} {fps / base_fps:>7.1f}x "
+                        f"{detector.full_frames:>11} | "
+                        f"{precision:>9.1%} {recall:>7.1%}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
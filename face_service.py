@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import cv2
+
+from face_detection import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    detect_faces,
+    load_face_detector,
+    open_camera,
+)
+from face_pipeline import StageStats
+
+# Headless face detection for many streams.
+#
+# An asyncio loop runs one reader task per source (camera index or video
+# file) and a pool of detection workers, each with its own detector, that
+# detect on a thread pool. OpenCV releases the GIL while it reads and
+# detects, so the workers, not the number of cameras, decide how many cores
+# are busy.
+#
+# Every stream holds only its newest frame. When a live stream (a camera, or
+# a file paced at its frame rate) gets a new frame before the last one was
+# picked up, the old one is dropped and counted. An unpaced file waits
+# instead, so every one of its frames is processed.
+#
+# A free worker takes a batch of at most one frame per stream, going round
+# the streams from where the last batch stopped, so a busy stream cannot
+# starve the others. Per stream, latency is measured from the frame being
+# read to its faces being found, and is reported with the drop count.
+
+REPORT_EVERY = 5.0  # Seconds between stream reports, 0 for none
+
+
+class Stream:
+    def __init__(self, name, source, live):
+        self.name = name
+        self.source = source
+        self.live = live
+        self.latest = None  # (stream, seq, captured, frame) awaiting detection
+        self.done = False
+        self.stats = StageStats(name)
+
+
+class FaceService:
+    def __init__(
+        self,
+        sources,
+        workers=None,
+        batch_size=None,
+        backend=DEFAULT_BACKEND,
+        pace=True,
+        output=None,
+    ):
+        self.streams = []
+        seen = {}  # Streams so far per name, to number the repeats
+        for source in sources:
+            camera = isinstance(source, int)
+            name = f"cam{source}" if camera else os.path.basename(str(source))
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                name = f"{name}#{seen[name]}"
+            self.streams.append(Stream(name, source, camera or pace))
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size or -(-len(self.streams) // self.workers)
+        self.backend = backend
+        self.output = output
+        self.next_stream = 0
+        self.stopping = False
+        self.changed = None
+
+    async def read(self, stream, capture, executor):
+        loop = asyncio.get_running_loop()
+        fps = 0
+        if stream.live and not isinstance(stream.source, int):
+            # Files are paced like a camera; cameras pace themselves
+            fps = capture.get(cv2.CAP_PROP_FPS) or 0
+        started = time.perf_counter()
+        seq = 0
+        try:
+            while not self.stopping:
+                if fps:
+                    due = started + seq / fps
+                    await asyncio.sleep(max(0, due - time.perf_counter()))
+                success, frame = await loop.run_in_executor(executor, capture.read)
+                if not success:
+                    break
+                item = (stream, seq, time.perf_counter(), frame)
+                async with self.changed:
+                    if not stream.live:
+                        await self.changed.wait_for(
+                            lambda: stream.latest is None or self.stopping
+                        )
+                    elif stream.latest is not None:
+                        stream.stats.drop()
+                    stream.latest = item
+                    self.changed.notify_all()
+                seq += 1
+        finally:
+            async with self.changed:
+                stream.done = True
+                self.changed.notify_all()
+
+    def take_batch(self):
+        # At most one frame per stream, round-robin from where the last batch
+        # stopped
+        batch = []
+        count = len(self.streams)
+        for k in range(count):
+            index = (self.next_stream + k) % count
+            stream = self.streams[index]
+            if stream.latest is not None:
+                batch.append(stream.latest)
+                stream.latest = None
+                if len(batch) == self.batch_size:
+                    self.next_stream = (index + 1) % count
+                    break
+        return batch
+
+    def finished(self):
+        return self.stopping or all(
+            stream.done and stream.latest is None for stream in self.streams
+        )
+
+    async def work(self, executor):
+        loop = asyncio.get_running_loop()
+        load = partial(load_face_detector, self.backend)
+        detector = await loop.run_in_executor(executor, load)
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(
+                    lambda: self.finished()
+                    or any(stream.latest is not None for stream in self.streams)
+                )
+                if self.finished():
+                    return
+                batch = self.take_batch()
+                self.changed.notify_all()
+            faces = await loop.run_in_executor(
+                executor,
+                lambda: [detect_faces(detector, item[3]) for item in batch],
+            )
+            detected = time.perf_counter()
+            for (stream, seq, captured, _), boxes in zip(batch, faces):
+                stream.stats.add(detected - captured)
+                if self.output:
+                    self.write(stream, seq, boxes)
+
+    def write(self, stream, seq, boxes):
+        line = {
+            "stream": stream.name,
+            "frame": seq,
+            "faces": [[int(v) for v in box] for box in boxes],
+        }
+        self.output.write(json.dumps(line) + "\n")
+
+    def report(self):
+        for stream in self.streams:
+            print(stream.stats.summary())
+
+    async def report_every(self, seconds):
+        while True:
+            await asyncio.sleep(seconds)
+            self.report()
+            print()
+
+    async def run(self, duration=None, report_every=REPORT_EVERY):
+        self.changed = asyncio.Condition()
+        captures = [open_camera(stream.source) for stream in self.streams]
+        readers = ThreadPoolExecutor(max_workers=len(self.streams))
+        detectors = ThreadPoolExecutor(max_workers=self.workers)
+        tasks = [
+            asyncio.create_task(self.read(stream, capture, readers))
+            for stream, capture in zip(self.streams, captures)
+        ]
+        workers = [
+            asyncio.create_task(self.work(detectors)) for _ in range(self.workers)
+        ]
+        reporter = None
+        if report_every:
+            reporter = asyncio.create_task(self.report_every(report_every))
+        try:
+            if duration:
+                await asyncio.wait(workers, timeout=duration)
+                async with self.changed:
+                    self.stopping = True
+                    self.changed.notify_all()
+            await asyncio.gather(*workers)
+        finally:
+            self.stopping = True
+            for task in tasks + workers + ([reporter] if reporter else []):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            readers.shutdown()
+            detectors.shutdown()
+            for capture in captures:
+                capture.release()
+        return {stream.name: stream.stats for stream in self.streams}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Headless face detection over many cameras and video files"
+    )
+    parser.add_argument(
+        "sources", nargs="+", help="Camera indexes and video files, one per stream"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Detection threads (default: one per core)"
+    )
+    parser.add_argument(
+        "--batch", type=int, help="Frames per batch (default: streams / workers)"
+    )
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    parser.add_argument(
+        "--no-pace",
+        action="store_true",
+        help="Read files as fast as they are processed instead of at their FPS",
+    )
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument(
+        "--report-every", type=float, default=REPORT_EVERY, help="Seconds, 0 for none"
+    )
+    parser.add_argument("--output", help="JSONL file for the faces of every frame")
+    args = parser.parse_args()
+
+    sources = [int(s) if s.isdigit() else s for s in args.sources]
+    output = open(args.output, "w") if args.output else None
+    service = FaceService(
+        sources, args.workers, args.batch, args.backend, not args.no_pace, output
+    )
+    try:
+        asyncio.run(service.run(args.duration, args.report_every))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output:
+            output.close()
+    service.report()
+
+
+if __name__ == "__main__":
+    main()
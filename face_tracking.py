@@ -0,0 +1,324 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from face_detection import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    draw_faces,
+    load_face_detector,
+    open_camera,
+    run_detector,
+)
+
+# Detect-every-N-frames face tracking.
+#
+# The full cascade runs every detect_every frames, and at once whenever a
+# face is lost. In between, each face is followed with Lucas-Kanade optical
+# flow on a few corner points inside its box: the box moves by the points'
+# median shift and scales with their spread. That costs a small fraction of
+# a detectMultiScale call. A face whose points mostly fail to track counts as
+# lost. Detections are matched to the existing faces by overlap, so a face
+# keeps its ID from one detection to the next. Detection uses scale_factor,
+# or a face_roi.RoiDetector when one is given for downscaled or region-limited
+# search.
+#
+# detect_every trades accuracy for speed: evaluate() replays a recorded clip
+# with full detection on every frame as the reference and reports each
+# setting's throughput and its precision/recall against that reference.
+
+MATCH_IOU = 0.3  # Overlap for a detection to continue an existing face
+EVAL_IOU = 0.5  # Overlap for a tracked box to count as matching the reference
+MAX_POINTS = 30
+MIN_POINTS = 6  # A face tracked by fewer surviving points is lost
+
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+)
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    width = min(ax + aw, bx + bw) - max(ax, bx)
+    height = min(ay + ah, by + bh) - max(ay, by)
+    if width <= 0 or height <= 0:
+        return 0.0
+    overlap = width * height
+    return overlap / (aw * ah + bw * bh - overlap)
+
+
+def match_boxes(boxes_a, boxes_b, threshold):
+    # Greedy one-to-one matching by overlap, best pairs first: [(i, j), ...]
+    pairs = [
+        (iou(a, b), i, j)
+        for i, a in enumerate(boxes_a)
+        for j, b in enumerate(boxes_b)
+    ]
+    pairs.sort(reverse=True)
+    used_a, used_b, matches = set(), set(), []
+    for overlap, i, j in pairs:
+        if overlap < threshold:
+            break
+        if i in used_a or j in used_b:
+            continue
+        used_a.add(i)
+        used_b.add(j)
+        matches.append((i, j))
+    return matches
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = [float(v) for v in box]
+        self.points = None
+
+    def seed_points(self, gray):
+        # Corners inside the box, in frame coordinates
+        x, y, w, h = (int(round(v)) for v in self.box)
+        x, y = max(x, 0), max(y, 0)
+        patch = gray[y : y + h, x : x + w]
+        self.points = None
+        if patch.size == 0:
+            return
+        corners = cv2.goodFeaturesToTrack(
+            patch, maxCorners=MAX_POINTS, qualityLevel=0.01, minDistance=5
+        )
+        if corners is not None:
+            self.points = corners + np.array([x, y], dtype=np.float32)
+
+    def move(self, old, new):
+        # Shift by the median motion, scale by the change in spread
+        shift = np.median(new - old, axis=0)
+        old_spread = np.median(np.linalg.norm(old - np.median(old, axis=0), axis=1))
+        new_spread = np.median(np.linalg.norm(new - np.median(new, axis=0), axis=1))
+        scale = new_spread / old_spread if old_spread > 0 else 1.0
+        x, y, w, h = self.box
+        cx, cy = x + w / 2 + shift[0], y + h / 2 + shift[1]
+        w, h = w * scale, h * scale
+        self.box = [cx - w / 2, cy - h / 2, w, h]
+        self.points = new.reshape(-1, 1, 2)
+
+
+class FaceTracker:
+    def __init__(
+        self, face_detector, detect_every=5, scale_factor=1.1, region_detector=None
+    ):
+        self.face_detector = face_detector
+        self.detect_every = max(1, detect_every)
+        self.scale_factor = scale_factor
+        self.region_detector = region_detector
+        self.tracks = []
+        self.next_id = 1
+        self.prev_gray = None
+        self.frame_index = 0
+        self.detections = 0
+
+    def update(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        due = self.frame_index % self.detect_every == 0 or self.prev_gray is None
+        if due or not self.track(gray):
+            self.detect(frame, gray)
+        self.prev_gray = gray
+        self.frame_index += 1
+        return self.faces()
+
+    def faces(self):
+        return [
+            (track.id, tuple(int(round(v)) for v in track.box)) for track in self.tracks
+        ]
+
+    def detect(self, frame, gray):
+        if self.region_detector is None:
+            image = frame if getattr(self.face_detector, "color", False) else gray
+            boxes = run_detector(self.face_detector, image, self.scale_factor)
+        else:
+            boxes = self.region_detector.detect(frame)
+        self.detections += 1
+        matches = match_boxes([t.box for t in self.tracks], boxes, MATCH_IOU)
+        matched = {j: self.tracks[i] for i, j in matches}
+        tracks = []
+        for j, box in enumerate(boxes):
+            track = matched.get(j)
+            if track is None:
+                track = Track(self.next_id, box)
+                self.next_id += 1
+            else:
+                track.box = [float(v) for v in box]
+            track.seed_points(gray)
+            tracks.append(track)
+        self.tracks = tracks
+
+    def track(self, gray):
+        # Moves every face with optical flow; False if any face was lost
+        tracks = [t for t in self.tracks if t.points is not None]
+        if len(tracks) < len(self.tracks):
+            return False
+        if not tracks:
+            return True
+        old = np.concatenate([t.points for t in tracks])
+        new, status, _ = cv2.calcOpticalFlowPyrLK(
+            self.prev_gray, gray, old, None, **LK_PARAMS
+        )
+        status = status.ravel().astype(bool)
+        start = 0
+        for track in tracks:
+            end = start + len(track.points)
+            good = status[start:end]
+            if good.sum() < MIN_POINTS:
+                return False
+            track.move(
+                old[start:end][good].reshape(-1, 2), new[start:end][good].reshape(-1, 2)
+            )
+            start = end
+        return True
+
+
+def track_faces_live(
+    camera_index=0,
+    detect_every=5,
+    backend=DEFAULT_BACKEND,
+    detect_width=None,
+    roi_margin=None,
+    scale_factor=1.1,
+):
+    face_detector = load_face_detector(backend)
+    region_detector = None
+    if detect_width or roi_margin is not None:
+        from face_roi import RoiDetector
+
+        region_detector = RoiDetector(
+            face_detector, detect_width, roi_margin, scale_factor
+        )
+    tracker = FaceTracker(face_detector, detect_every, scale_factor, region_detector)
+    camera = open_camera(camera_index)
+
+    print("Camera opened. Press 'q' or Esc to quit.")
+
+    try:
+        while True:
+            success, frame = camera.read()
+            if not success:
+                print("Could not read a frame from the camera.")
+                break
+
+            faces = tracker.update(frame)
+            draw_faces(
+                frame,
+                [box for _, box in faces],
+                [f"Face {face_id}" for face_id, _ in faces],
+            )
+
+            cv2.imshow("Live Face Tracking", frame)
+
+            key = cv2.waitKey(1) & 0xFF
+            if key in (ord("q"), 27):
+                break
+    finally:
+        camera.release()
+        cv2.destroyAllWindows()
+
+
+# --- Evaluation on a recorded clip ---
+
+
+def read_clip(path, max_frames=None):
+    clip = cv2.VideoCapture(path)
+    if not clip.isOpened():
+        raise RuntimeError(f"Could not open clip: {path}")
+    try:
+        count = 0
+        while max_frames is None or count < max_frames:
+            success, frame = clip.read()
+            if not success:
+                break
+            yield frame
+            count += 1
+    finally:
+        clip.release()
+
+
+def run_clip(path, face_detector, detect_every, max_frames=None):
+    # Boxes per frame and the seconds spent in the tracker
+    tracker = FaceTracker(face_detector, detect_every)
+    boxes = []
+    elapsed = 0.0
+    for frame in read_clip(path, max_frames):
+        start = time.perf_counter()
+        faces = tracker.update(frame)
+        elapsed += time.perf_counter() - start
+        boxes.append([box for _, box in faces])
+    return boxes, elapsed, tracker.detections
+
+
+def score(boxes, reference, threshold=EVAL_IOU):
+    hits = found = expected = 0
+    for frame_boxes, frame_reference in zip(boxes, reference):
+        hits += len(match_boxes(frame_boxes, frame_reference, threshold))
+        found += len(frame_boxes)
+        expected += len(frame_reference)
+    precision = hits / found if found else 1.0
+    recall = hits / expected if expected else 1.0
+    return precision, recall
+
+
+def evaluate(path, settings, face_detector=None, max_frames=None):
+    face_detector = face_detector or load_face_detector()
+    reference, base_time, _ = run_clip(path, face_detector, 1, max_frames)
+    frames = len(reference)
+    rows = []
+    for detect_every in settings:
+        if detect_every == 1:
+            boxes, elapsed = reference, base_time
+            detections = frames
+        else:
+            boxes, elapsed, detections = run_clip(
+                path, face_detector, detect_every, max_frames
+            )
+        precision, recall = score(boxes, reference)
+        rows.append(
+            {
+                "detect_every": detect_every,
+                "fps": frames / elapsed if elapsed else float("inf"),
+                "speedup": base_time / elapsed if elapsed else float("inf"),
+                "detections": detections,
+                "precision": precision,
+                "recall": recall,
+            }
+        )
+    return frames, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure detect-every-N tracking against full detection on a clip"
+    )
+    parser.add_argument("clip", help="Recorded video file")
+    parser.add_argument(
+        "--every", type=int, nargs="+", default=[1, 2, 3, 5, 10, 20], metavar="N"
+    )
+    parser.add_argument("--frames", type=int, help="Only use the first N frames")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    args = parser.parse_args()
+
+    face_detector = load_face_detector(args.backend)
+    frames, rows = evaluate(args.clip, args.every, face_detector, args.frames)
+    print(f"{frames} frames, reference: full detection on every frame\n")
+    print(
+        f"{'Every':>5} | {'FPS':>8} {'Speedup':>8} {'Detections':>10} | "
+        f"{'Precision':>9} {'Recall':>7}"
+    )
+    for row in rows:
+        print(
+            f"{row['detect_every']:>5} | {row['fps']:>8.1f} {row['speedup']:>7.1f}x "
+            f"{row['detections']:>10} | {row['precision']:>9.1%} {row['recall']:>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
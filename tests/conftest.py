@@ -0,0 +1,12 @@
+import os
+import sys
+
+# The scripts import their siblings by bare name, so put the repo root and
+# ball/ on the path the way running them from their own directory would
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "ball")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
@@ -0,0 +1,32 @@
+import random
+
+import pytest
+
+from battle_solver import advance, collision_frames, fast_forward, frame_stepped, initial_velocities
+
+
+def test_advance_rounds_like_repeated_additions():
+    rng = random.Random(1)
+    for _ in range(2000):
+        # Some velocities land exactly halfway between grid steps
+        x = rng.uniform(1, 900)
+        v = rng.choice([rng.uniform(-6, 6), 0.1, 2.5, -1.375, 3.0])
+        frames = rng.randrange(500)
+        expected = x
+        for _ in range(frames):
+            expected += v
+        assert advance(x, v, frames) == expected
+
+
+@pytest.mark.parametrize("seed", [0, 3, 18])
+@pytest.mark.parametrize("strategies", [("linear", "linear"), ("fib", "double")])
+def test_matches_the_frame_stepped_game(seed, strategies):
+    # Seed 18 has a collision on the frame a ball is clamped to a wall
+    _, collisions, frames, _ = frame_stepped(400, 400, *strategies, seed)
+    result = fast_forward(400, 400, *strategies, initial_velocities(seed))
+    assert (result["collisions"], result["frames"]) == (collisions, frames)
+
+
+def test_balls_that_never_meet():
+    # Side by side, bouncing up and down in step
+    assert collision_frames(((0, 3), (0, 3)), 1) == []
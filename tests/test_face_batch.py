@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+import pytest
+
+import face_batch
+
+FRAMES = 60
+CHUNK = 15
+
+
+class BrightSquares:
+    # Stands in for a cascade: every bright blob is a face
+    def detectMultiScale(self, gray, scaleFactor=1.1, minNeighbors=5, minSize=(0, 0)):
+        count, _, stats, _ = cv2.connectedComponentsWithStats(
+            (gray > 128).astype(np.uint8)
+        )
+        return [tuple(stats[k, :4]) for k in range(1, count) if stats[k, 4] > 100]
+
+
+@pytest.fixture
+def clip(tmp_path):
+    # A square sliding across a dark frame, plus a second one every third frame
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (160, 120))
+    for i in range(FRAMES):
+        frame = np.zeros((120, 160, 3), np.uint8)
+        frame[30:70, 10 + i : 50 + i] = 255
+        if i % 3 == 0:
+            frame[80:110, 110:140] = 255
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+@pytest.fixture(autouse=True)
+def fake_detector(monkeypatch):
+    # Worker processes are forked, so they see the patched loader too
+    monkeypatch.setattr(
+        face_batch, "load_face_detector", lambda backend: BrightSquares()
+    )
+
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_resume_finishes_a_crashed_run(tmp_path, clip, suffix):
+    reference = str(tmp_path / ("reference" + suffix))
+    frames, _ = face_batch.run_batch([clip], reference, workers=2, chunk=CHUNK)
+    assert frames == FRAMES
+
+    # A run that died after two ranges, in the middle of writing a third
+    output = str(tmp_path / ("output" + suffix))
+    face_batch.run_batch([clip], output, workers=2, chunk=CHUNK)
+    checkpoint = read_lines(output + ".checkpoint")
+    with open(output + ".checkpoint", "w") as f:
+        f.write("\n".join(checkpoint[:2]) + "\n")
+    with open(output, "a") as f:
+        f.write("half a line")
+
+    frames, _ = face_batch.run_batch(
+        [clip], output, workers=2, chunk=CHUNK, resume=True
+    )
+    assert frames == FRAMES - 2 * CHUNK
+    assert sorted(read_lines(output)) == sorted(read_lines(reference))
+    assert len(read_lines(output + ".checkpoint")) == FRAMES // CHUNK
+
+
+def test_resume_of_a_finished_run_does_nothing(tmp_path, clip):
+    output = str(tmp_path / "faces.jsonl")
+    face_batch.run_batch([clip], output, workers=1, chunk=CHUNK)
+    before = read_lines(output)
+
+    frames, _ = face_batch.run_batch(
+        [clip], output, workers=1, chunk=CHUNK, resume=True
+    )
+    assert frames == 0
+    assert read_lines(output) == before
+    assert len(before) == FRAMES
+
+
+def test_every_frame_is_detected(tmp_path, clip):
+    output = str(tmp_path / "faces.csv")
+    face_batch.run_batch([clip], output, workers=2, chunk=CHUNK)
+    rows = read_lines(output)[1:]
+    assert len(rows) == FRAMES + FRAMES // 3
+    assert sorted({int(row.split(",")[1]) for row in rows}) == list(range(FRAMES))
@@ -0,0 +1,60 @@
+import sqlite3
+
+import pytest
+
+from race_season import SeasonStore, plan, run_season
+
+NAMES = [f"Racer {i}" for i in range(16)]
+PER_TOURNAMENT = sum(plan(len(NAMES)))
+
+
+def season(store, tournaments, seed=3):
+    # Batches of two tournaments, so runs of any even length line up
+    run_season(store, "test", NAMES, tournaments * PER_TOURNAMENT, 3, 5, seed,
+               workers=1, batch_races=2 * PER_TOURNAMENT)
+
+
+def log(store):
+    return store.db.execute(
+        "SELECT tournament, round, heat, lane, racer, finish_frame, place"
+        " FROM races JOIN results USING (race) ORDER BY race, lane"
+    ).fetchall()
+
+
+def test_rerun_continues_the_season(tmp_path):
+    store = SeasonStore(str(tmp_path / "season.sqlite"))
+    season(store, 4)
+    first = log(store)
+    season(store, 4)
+    both = log(store)
+    store.close()
+
+    assert both[:len(first)] == first
+    assert sorted({row[0] for row in both}) == list(range(8))
+    # The second run raced new tournaments, not the first run again
+    second = both[len(first):]
+    assert [row[1:] for row in second] != [row[1:] for row in first]
+
+
+def test_two_runs_equal_one_run_of_both(tmp_path):
+    split = SeasonStore(str(tmp_path / "split.sqlite"))
+    season(split, 4)
+    season(split, 4)
+    whole = SeasonStore(str(tmp_path / "whole.sqlite"))
+    season(whole, 8)
+
+    assert log(split) == log(whole)
+    assert split.standings("test", 16) == whole.standings("test", 16)
+    assert split.played("test") == whole.played("test") == 8
+    split.close()
+    whole.close()
+
+
+@pytest.mark.parametrize("statement", ["DELETE FROM races", "UPDATE results SET place = 1"])
+def test_the_race_log_is_append_only(tmp_path, statement):
+    store = SeasonStore(str(tmp_path / "season.sqlite"))
+    season(store, 2)
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        with store.db:
+            store.db.execute(statement)
+    store.close()
@@ -0,0 +1,18 @@
+import pytest
+
+import ball
+from tunnel_constants import batch_slots, max_rings
+
+
+@pytest.mark.parametrize("max_radius", [500, 2000, 3000])
+def test_big_tunnels_have_enough_batch_slots(monkeypatch, max_radius):
+    # --max-radius sets the module's MAX_RADIUS; a fixed slot count used to
+    # run out at 2000
+    monkeypatch.setattr(ball, "MAX_RADIUS", max_radius)
+    game = ball.TunnelGame(1)
+    assert game.batches.capacity == batch_slots(max_radius)
+    for frame in range(4000):
+        # Shrinking on and off, so rings both pile up and drain
+        game.step(0.15, 0.08, 3.0 if frame % 1200 < 600 else 0.0, 1.0)
+        assert len(game.rings) <= max_rings(max_radius)
+        assert len({ring.batch_id for ring in game.rings}) <= batch_slots(max_radius)
@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pytest
+
+from ball import CENTER, TunnelGame
+from tunnel_ccd import time_of_impact, times_of_impact
+
+RADIUS = 200
+REACH = 20  # Half the ring thickness plus the ball radius
+CONTACT = RADIUS - REACH
+
+
+def test_ball_flying_at_a_still_ring():
+    # From the centre at 30 px/frame: contact after CONTACT / 30 frames
+    t = time_of_impact(0, 0, 30, 0, RADIUS, 0, REACH, 10)
+    assert t == pytest.approx(CONTACT / 30)
+
+
+def test_diagonal_path_meets_the_ring_at_its_distance():
+    px, py, vx, vy = 50, -40, -12, 9
+    t = time_of_impact(px, py, vx, vy, RADIUS, 0, REACH, 100)
+    assert math.hypot(px + vx * t, py + vy * t) == pytest.approx(CONTACT)
+
+
+def test_shrinking_ring_closes_on_a_resting_ball():
+    t = time_of_impact(100, 0, 0, 0, RADIUS, 4, REACH, 50)
+    assert t == pytest.approx((CONTACT - 100) / 4)
+
+
+def test_fast_ball_cannot_skip_a_ring_within_the_step():
+    # 500 px in one frame ends outside the ring; the contact is on the way
+    t = time_of_impact(0, 0, 500, 0, RADIUS, 0, REACH, 1)
+    assert t == pytest.approx(CONTACT / 500)
+
+
+def test_no_contact_within_the_step():
+    assert time_of_impact(0, 0, 10, 0, RADIUS, 0, REACH, 1) is None
+    assert time_of_impact(0, 0, 0, 0, RADIUS, 0, REACH, 1000) is None
+
+
+def test_touching_and_moving_out_is_an_immediate_contact():
+    assert time_of_impact(CONTACT, 0, 5, 0, RADIUS, 0, REACH, 1) == 0.0
+
+
+def test_array_version_agrees_with_the_scalar_one():
+    rng = np.random.default_rng(3)
+    n = 2000
+    px, py = rng.uniform(-150, 150, (2, n))
+    vx, vy = rng.uniform(-60, 60, (2, n))
+    shrink = rng.uniform(0, 5, n)
+    t_max = 2.0
+
+    times = times_of_impact(px, py, vx, vy, RADIUS, shrink, REACH, t_max)
+    for i in range(n):
+        t = time_of_impact(px[i], py[i], vx[i], vy[i], RADIUS, shrink[i], REACH, t_max)
+        if t is None:
+            assert np.isinf(times[i])
+        else:
+            assert times[i] == pytest.approx(t)
+
+
+def test_ball_stays_inside_the_innermost_ring():
+    # With the gravity and bounciness up, the swept ball still never ends a
+    # frame beyond the ring it is bouncing in
+    game = TunnelGame(5)
+    for _ in range(2000):
+        game.step(0.5, 0.06, 1.5, 1.5)
+        if game.finished or not game.rings:
+            break
+        ring = game.rings[0]
+        distance = math.hypot(game.ball.x - CENTER[0], game.ball.y - CENTER[1])
+        assert distance <= ring.radius - ring.thickness / 2 - game.ball.radius + 1e-6
@@ -0,0 +1,62 @@
+import pytest
+
+from ball import TunnelGame
+from tunnel_replay import Replay, ReplayPlayer, ReplayRecorder
+
+# Slider values (gravity, base spin, shrink speed, bounciness) by the frame
+# they are set on
+SLIDERS = {
+    0: [0.15, 0.06, 1.5, 1.0],
+    600: [0.3, 0.06, 1.5, 1.0],
+    1500: [0.3, 0.1, 2.5, 1.2],
+    2800: [0.1, 0.02, 0.5, 0.8],
+}
+
+
+def play(seed):
+    game = TunnelGame(seed)
+    recorder = ReplayRecorder(seed)
+    values = SLIDERS[0]
+    while not game.finished:
+        values = SLIDERS.get(game.frame, values)
+        recorder.record(game.frame, values)
+        game.step(*values)
+    return game, recorder
+
+
+def test_round_trip_reproduces_the_final_score(tmp_path):
+    game, recorder = play(seed=7)
+    path = tmp_path / "game.tnlr"
+    recorder.save(path)
+
+    replay = Replay.load(path)
+    assert replay.frames == game.frame
+    assert len(replay.events) == 8
+
+    replayed = ReplayPlayer(replay).run()
+    assert game.score > 0
+    assert replayed.score == game.score
+    assert (replayed.ball.x, replayed.ball.y) == (game.ball.x, game.ball.y)
+
+
+def test_seek_matches_playing_to_the_frame():
+    _, recorder = play(seed=11)
+    player = ReplayPlayer(recorder.replay())
+    player.run()
+
+    partial = TunnelGame(11)
+    values = SLIDERS[0]
+    while partial.frame < 2000:
+        values = SLIDERS.get(partial.frame, values)
+        partial.step(*values)
+
+    sought = player.seek(2000)
+    assert sought.score == partial.score
+    assert (sought.ball.x, sought.ball.y) == (partial.ball.x, partial.ball.y)
+
+
+def test_other_versions_are_refused():
+    data = bytearray(ReplayRecorder(1).replay().to_bytes())
+    data[4] += 1
+    with pytest.raises(ValueError, match="version"):
+        Replay.from_bytes(bytes(data))
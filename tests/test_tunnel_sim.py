@@ -0,0 +1,13 @@
+import numpy as np
+
+from tunnel_sim import MAX_DT, simulate
+
+
+def test_longest_steps_keep_the_mean_score():
+    # Steps longer than a frame used to lose the bounces of a ball resting on
+    # a ring and scored 8% low at dt=4
+    games = 200
+    reference = simulate(games, seed=7)
+    scores = simulate(games, seed=7, dt=MAX_DT)
+    noise = np.hypot(reference.std(), scores.std()) / np.sqrt(games)
+    assert abs(scores.mean() - reference.mean()) < 3 * noise